@@ -1,3 +1,6 @@
+-- Baseline: the schema as of the loose init.sql/update.sql files. Every statement is
+-- idempotent, so databases created by those files can adopt it as-is.
+
 -- Player Tables
 CREATE TABLE IF NOT EXISTS players_table (
     player_id VARCHAR(50) PRIMARY KEY,
@@ -7,9 +10,27 @@ CREATE TABLE IF NOT EXISTS players_table (
     vest SMALLINT DEFAULT 0 CHECK (vest >= 0 AND vest <= 127),
     is_vested BOOLEAN DEFAULT FALSE,
     last_worked DATE DEFAULT NULL,
-    last_dead DATE DEFAULT NULL
+    last_dead TIMESTAMPTZ DEFAULT NULL,
+    dead_guild_id BIGINT DEFAULT NULL, -- Guild the player is currently dead in; NULL while alive
+    kills INTEGER DEFAULT 0 CHECK (kills >= 0),
+    revives INTEGER DEFAULT 0 CHECK (revives >= 0)
 );
 
+-- Columns added after players_table's first release
+ALTER TABLE players_table ALTER COLUMN last_dead TYPE TIMESTAMPTZ;
+ALTER TABLE players_table ADD COLUMN IF NOT EXISTS dead_guild_id BIGINT DEFAULT NULL;
+ALTER TABLE players_table ADD COLUMN IF NOT EXISTS kills INTEGER DEFAULT 0 CHECK (kills >= 0);
+ALTER TABLE players_table ADD COLUMN IF NOT EXISTS revives INTEGER DEFAULT 0 CHECK (revives >= 0);
+
+-- Pending death expiries, read back by the expiry scheduler on startup
+CREATE INDEX IF NOT EXISTS idx_players_pending_deaths
+    ON players_table (last_dead) WHERE dead_guild_id IS NOT NULL;
+
+-- Leaderboard rankings
+CREATE INDEX IF NOT EXISTS idx_players_balance_rank ON players_table (balance DESC, player_id);
+CREATE INDEX IF NOT EXISTS idx_players_kills_rank ON players_table (kills DESC, player_id);
+CREATE INDEX IF NOT EXISTS idx_players_revives_rank ON players_table (revives DESC, player_id);
+
 CREATE TABLE IF NOT EXISTS political_roles_table (
     role_id SERIAL PRIMARY KEY,
     player_id VARCHAR(50),
@@ -121,10 +142,96 @@ CREATE TABLE IF NOT EXISTS transactions_table (
     transfer_type VARCHAR(10),
     sender_party_id INTEGER NOT NULL,
     recipient_party_id INTEGER NOT NULL,
-    amount SMALLINT NOT NULL CHECK (amount > 0),
+    amount INTEGER NOT NULL CHECK (amount > 0),
     memo VARCHAR(50) DEFAULT 'n/a',
     FOREIGN KEY (sender_party_id) REFERENCES transfer_parties_table(party_id)
         ON DELETE CASCADE,
     FOREIGN KEY (recipient_party_id) REFERENCES transfer_parties_table(party_id)
         ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+-- Transfers larger than a SMALLINT
+ALTER TABLE transactions_table ALTER COLUMN amount TYPE INTEGER;
+
+-- One party per player/company/building, so the ledger can resolve party IDs with upserts
+CREATE UNIQUE INDEX IF NOT EXISTS uq_transfer_parties_player
+    ON transfer_parties_table (player_id) WHERE party_type = 'player';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_transfer_parties_company
+    ON transfer_parties_table (company_id) WHERE party_type = 'company';
+CREATE UNIQUE INDEX IF NOT EXISTS uq_transfer_parties_building
+    ON transfer_parties_table (building_id) WHERE party_type = 'building';
+
+CREATE INDEX IF NOT EXISTS idx_transactions_sender
+    ON transactions_table (sender_party_id, time_of_transaction);
+CREATE INDEX IF NOT EXISTS idx_transactions_recipient
+    ON transactions_table (recipient_party_id, time_of_transaction);
+
+-- Periodic balance snapshots; a past balance is the latest snapshot plus the transfers after it
+CREATE TABLE IF NOT EXISTS balance_snapshots_table (
+    snapshot_id SERIAL PRIMARY KEY,
+    party_id INTEGER NOT NULL,
+    balance BIGINT NOT NULL,
+    taken_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (party_id) REFERENCES transfer_parties_table(party_id)
+        ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_balance_snapshots_party
+    ON balance_snapshots_table (party_id, taken_at DESC);
+
+-- Guild Settings Table (NULL columns fall back to the bot's .env defaults)
+CREATE TABLE IF NOT EXISTS guild_settings_table (
+    guild_id BIGINT PRIMARY KEY,
+    shot_role_id BIGINT,
+    shot_timeout_seconds INTEGER CHECK (shot_timeout_seconds > 0),
+    shoot_cooldown_seconds INTEGER CHECK (shoot_cooldown_seconds >= 0),
+    start_guns SMALLINT CHECK (start_guns >= 0 AND start_guns <= 127),
+    start_vest SMALLINT CHECK (start_vest >= 0 AND start_vest <= 127),
+    start_medkit SMALLINT CHECK (start_medkit >= 0 AND start_medkit <= 127),
+    start_balance INTEGER CHECK (start_balance >= 0),
+    updated_at TIMESTAMPTZ DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Tell every bot process which guild's settings changed so it can refresh its cache
+CREATE OR REPLACE FUNCTION notify_guild_settings_changed() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        PERFORM pg_notify('guild_settings_changed', OLD.guild_id::text);
+    ELSE
+        PERFORM pg_notify('guild_settings_changed', NEW.guild_id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_guild_settings_changed ON guild_settings_table;
+CREATE TRIGGER trg_guild_settings_changed
+    AFTER INSERT OR UPDATE OR DELETE ON guild_settings_table
+    FOR EACH ROW EXECUTE FUNCTION notify_guild_settings_changed();
+
+-- Player cache invalidation for multi-process deployments. Only sessions that set
+-- wd.notify_players = 'on' (the sharded workers) pay for the notification.
+CREATE OR REPLACE FUNCTION notify_player_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('player_changed', NEW.player_id || ' ' || current_setting('application_name'));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS trg_player_changed ON players_table;
+CREATE TRIGGER trg_player_changed
+    AFTER UPDATE ON players_table
+    FOR EACH ROW
+    WHEN (current_setting('wd.notify_players', true) = 'on')
+    EXECUTE FUNCTION notify_player_changed();
+
+-- Shared token buckets for the app command rate limiter (see scripts/services/rate_limiter.py).
+-- Unlogged: losing the buckets on a crash only resets cooldowns.
+CREATE UNLOGGED TABLE IF NOT EXISTS rate_limit_buckets (
+    bucket_key TEXT PRIMARY KEY,
+    tokens DOUBLE PRECISION NOT NULL,
+    updated_at TIMESTAMPTZ NOT NULL,
+    full_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_rate_limit_buckets_full_at ON rate_limit_buckets (full_at);
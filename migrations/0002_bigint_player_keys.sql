@@ -0,0 +1,66 @@
+-- Store player keys as BIGINT Discord snowflakes instead of VARCHAR(50). The seeded
+-- 'GOVERNMENT' player becomes player 0, which no Discord user can have.
+
+DO $$
+DECLARE
+    bad_ids TEXT;
+BEGIN
+    SELECT string_agg(player_id, ', ') INTO bad_ids
+    FROM players_table
+    WHERE player_id <> 'GOVERNMENT' AND player_id !~ '^[0-9]{1,19}$';
+    IF bad_ids IS NOT NULL THEN
+        RAISE EXCEPTION 'players_table has non-numeric player IDs (%); fix or remove them first', bad_ids;
+    END IF;
+END;
+$$;
+
+-- Foreign keys must be dropped while both sides change type
+ALTER TABLE political_roles_table DROP CONSTRAINT IF EXISTS fk_political_player_id;
+ALTER TABLE shareholders_table DROP CONSTRAINT IF EXISTS fk_shareholder_player_id;
+ALTER TABLE ownerships_table DROP CONSTRAINT IF EXISTS fk_ownership_player_id;
+ALTER TABLE building_employment_table DROP CONSTRAINT IF EXISTS fk_employment_player_id;
+ALTER TABLE transfer_parties_table DROP CONSTRAINT IF EXISTS transfer_parties_table_player_id_fkey;
+
+ALTER TABLE players_table ALTER COLUMN player_id TYPE BIGINT
+    USING CASE WHEN player_id = 'GOVERNMENT' THEN 0 ELSE player_id::bigint END;
+ALTER TABLE political_roles_table ALTER COLUMN player_id TYPE BIGINT
+    USING CASE WHEN player_id = 'GOVERNMENT' THEN 0 ELSE player_id::bigint END;
+ALTER TABLE shareholders_table ALTER COLUMN player_id TYPE BIGINT
+    USING CASE WHEN player_id = 'GOVERNMENT' THEN 0 ELSE player_id::bigint END;
+ALTER TABLE ownerships_table ALTER COLUMN player_id TYPE BIGINT
+    USING CASE WHEN player_id = 'GOVERNMENT' THEN 0 ELSE player_id::bigint END;
+ALTER TABLE building_employment_table ALTER COLUMN player_id TYPE BIGINT
+    USING CASE WHEN player_id = 'GOVERNMENT' THEN 0 ELSE player_id::bigint END;
+ALTER TABLE transfer_parties_table ALTER COLUMN player_id TYPE BIGINT
+    USING CASE WHEN player_id = 'GOVERNMENT' THEN 0 ELSE player_id::bigint END;
+
+ALTER TABLE political_roles_table ADD CONSTRAINT fk_political_player_id
+    FOREIGN KEY (player_id) REFERENCES players_table(player_id) ON DELETE CASCADE;
+ALTER TABLE shareholders_table ADD CONSTRAINT fk_shareholder_player_id
+    FOREIGN KEY (player_id) REFERENCES players_table(player_id);
+ALTER TABLE ownerships_table ADD CONSTRAINT fk_ownership_player_id
+    FOREIGN KEY (player_id) REFERENCES players_table(player_id) ON DELETE CASCADE;
+ALTER TABLE building_employment_table ADD CONSTRAINT fk_employment_player_id
+    FOREIGN KEY (player_id) REFERENCES players_table(player_id) ON DELETE CASCADE;
+ALTER TABLE transfer_parties_table ADD CONSTRAINT transfer_parties_table_player_id_fkey
+    FOREIGN KEY (player_id) REFERENCES players_table(player_id) ON DELETE CASCADE;
+
+-- Foreign keys Postgres doesn't index on its own. Composite primary keys only cover
+-- lookups by their leading column, so the player side of each needs its own index.
+CREATE INDEX IF NOT EXISTS idx_political_roles_player ON political_roles_table (player_id);
+CREATE INDEX IF NOT EXISTS idx_shareholders_player ON shareholders_table (player_id);
+CREATE INDEX IF NOT EXISTS idx_employment_player ON building_employment_table (player_id);
+CREATE INDEX IF NOT EXISTS idx_ownerships_building ON ownerships_table (building_id);
+CREATE INDEX IF NOT EXISTS idx_ownerships_player ON ownerships_table (player_id) WHERE player_id IS NOT NULL;
+CREATE INDEX IF NOT EXISTS idx_ownerships_company ON ownerships_table (company_id) WHERE company_id IS NOT NULL;
+
+-- Most recent deaths first, for death history lookups beyond the pending-expiry index
+CREATE INDEX IF NOT EXISTS idx_players_last_dead ON players_table (last_dead DESC) WHERE last_dead IS NOT NULL;
+
+-- The cache invalidation payload is "<player_id> <application_name>"
+CREATE OR REPLACE FUNCTION notify_player_changed() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('player_changed', NEW.player_id::text || ' ' || current_setting('application_name'));
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
@@ -0,0 +1,37 @@
+-- The government: player 0, the Government company it owns, and the Central Bank building
+-- owned by that company. Skips whatever a previous seed already created.
+
+INSERT INTO players_table (player_id, balance, guns, medkit, vest, is_vested, last_worked, last_dead)
+VALUES (0, 10000, 10, 5, 5, FALSE, CURRENT_DATE, NULL)
+ON CONFLICT (player_id) DO NOTHING;
+
+INSERT INTO companies_table (company_name, company_cash_reserve, founding_date)
+VALUES ('Government', 500000, CURRENT_TIMESTAMP)
+ON CONFLICT (company_name) DO NOTHING;
+
+INSERT INTO shareholders_table (company_id, player_id, shareholder_role, shareholder_wage, joined_at)
+SELECT company_id, 0, 'owner', 0, CURRENT_TIMESTAMP
+FROM companies_table WHERE company_name = 'Government'
+ON CONFLICT (company_id, player_id) DO NOTHING;
+
+DO $$
+DECLARE
+    government_id INTEGER;
+    central_bank_id INTEGER;
+BEGIN
+    IF EXISTS (SELECT 1 FROM building_banks_table WHERE bank_name = 'Central Bank') THEN
+        RETURN;
+    END IF;
+
+    SELECT company_id INTO government_id FROM companies_table WHERE company_name = 'Government';
+
+    INSERT INTO buildings_table (building_cash_reserve) VALUES (1000000)
+    RETURNING building_id INTO central_bank_id;
+
+    INSERT INTO building_banks_table (bank_name, interest_rate, bank_id)
+    VALUES ('Central Bank', 0.05, central_bank_id);
+
+    INSERT INTO ownerships_table (building_id, owner_type, company_id, ownership_date)
+    VALUES (central_bank_id, 'company', government_id, CURRENT_DATE);
+END;
+$$;
@@ -0,0 +1,22 @@
+-- Checkpoints for the economy tick (wages, dividends, interest). A tick is numbered by
+-- its start time divided by the tick interval; each step's row is written in the same
+-- transaction as its payouts, so a step either ran completely or not at all.
+
+CREATE TABLE IF NOT EXISTS economy_ticks (
+    tick_id BIGINT PRIMARY KEY,
+    started_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    finished_at TIMESTAMPTZ
+);
+
+CREATE INDEX IF NOT EXISTS idx_economy_ticks_unfinished
+    ON economy_ticks (tick_id) WHERE finished_at IS NULL;
+
+CREATE TABLE IF NOT EXISTS economy_tick_steps (
+    tick_id BIGINT NOT NULL REFERENCES economy_ticks(tick_id) ON DELETE CASCADE,
+    step TEXT NOT NULL,
+    payments INTEGER NOT NULL DEFAULT 0,
+    amount BIGINT NOT NULL DEFAULT 0,
+    duration_ms REAL,
+    completed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    CONSTRAINT pk_economy_tick_steps PRIMARY KEY (tick_id, step)
+);
@@ -0,0 +1,30 @@
+-- Orders for the /buy and /sell market. Open orders (remaining > 0) are what the bot
+-- rebuilds its in-memory order books from; filled and cancelled orders stay as history.
+-- Player orders escrow their cost or items when placed; factory (building) orders sell
+-- the factory's output.
+
+CREATE TABLE IF NOT EXISTS market_orders (
+    order_id BIGSERIAL PRIMARY KEY,
+    item VARCHAR(10) NOT NULL CHECK (item IN ('guns', 'vest', 'medkit')),
+    side VARCHAR(4) NOT NULL CHECK (side IN ('buy', 'sell')),
+    player_id BIGINT,
+    building_id INTEGER,
+    price INTEGER NOT NULL CHECK (price > 0),
+    quantity INTEGER NOT NULL CHECK (quantity > 0),
+    remaining INTEGER NOT NULL CHECK (remaining >= 0 AND remaining <= quantity),
+    created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+    cancelled_at TIMESTAMPTZ,
+    CONSTRAINT fk_market_order_player_id FOREIGN KEY (player_id) REFERENCES players_table(player_id)
+        ON DELETE CASCADE,
+    CONSTRAINT fk_market_order_building_id FOREIGN KEY (building_id) REFERENCES buildings_table(building_id)
+        ON DELETE CASCADE,
+    CHECK ((player_id IS NULL) <> (building_id IS NULL)),
+    CHECK (side = 'sell' OR player_id IS NOT NULL)
+);
+
+CREATE INDEX IF NOT EXISTS idx_market_orders_open
+    ON market_orders (order_id) WHERE remaining > 0;
+CREATE INDEX IF NOT EXISTS idx_market_orders_player
+    ON market_orders (player_id, item) WHERE remaining > 0;
+CREATE INDEX IF NOT EXISTS idx_market_orders_building
+    ON market_orders (building_id) WHERE building_id IS NOT NULL;
@@ -0,0 +1,74 @@
+-- Append-only log of every shot, vest save and revive, range-partitioned by month so old
+-- history can be dropped (or moved) a partition at a time. The bot creates each month's
+-- partition before writing into it (combat_events_partition). Rows are never updated;
+-- player IDs aren't foreign keys so inserts stay a plain COPY.
+--
+-- combat_totals, combat_weekly and combat_rivals are rollups maintained in the same
+-- transaction as each batch of events, so per-player stats never scan the log.
+
+CREATE TABLE IF NOT EXISTS combat_events (
+    event_id BIGSERIAL,
+    occurred_at TIMESTAMPTZ NOT NULL,
+    guild_id BIGINT,
+    kind VARCHAR(6) NOT NULL CHECK (kind IN ('kill', 'vest', 'revive')),
+    actor_id BIGINT NOT NULL,
+    target_id BIGINT NOT NULL,
+    CONSTRAINT pk_combat_events PRIMARY KEY (occurred_at, event_id)
+) PARTITION BY RANGE (occurred_at);
+
+CREATE INDEX IF NOT EXISTS idx_combat_events_actor ON combat_events (actor_id, occurred_at);
+CREATE INDEX IF NOT EXISTS idx_combat_events_target ON combat_events (target_id, occurred_at);
+
+-- Creates the (UTC) month's partition holding `moment` if it doesn't exist yet
+CREATE OR REPLACE FUNCTION combat_events_partition(moment TIMESTAMPTZ) RETURNS TEXT AS $$
+DECLARE
+    lower_bound TIMESTAMPTZ := date_trunc('month', moment AT TIME ZONE 'UTC') AT TIME ZONE 'UTC';
+    partition_name TEXT := 'combat_events_' || to_char(lower_bound AT TIME ZONE 'UTC', 'YYYY_MM');
+BEGIN
+    EXECUTE format(
+        'CREATE TABLE IF NOT EXISTS %I PARTITION OF combat_events FOR VALUES FROM (%L) TO (%L)',
+        partition_name, lower_bound, lower_bound + INTERVAL '1 month'
+    );
+    RETURN partition_name;
+END;
+$$ LANGUAGE plpgsql;
+
+SELECT combat_events_partition(now());
+SELECT combat_events_partition(now() + INTERVAL '1 month');
+
+-- Per-player counters. kills/deaths: shots that killed; vests_broken/vest_saves: shots a
+-- vest absorbed (fired by / taken by the player); revives_given/revives_received.
+CREATE TABLE IF NOT EXISTS combat_totals (
+    player_id BIGINT PRIMARY KEY,
+    kills INTEGER NOT NULL DEFAULT 0,
+    deaths INTEGER NOT NULL DEFAULT 0,
+    vests_broken INTEGER NOT NULL DEFAULT 0,
+    vest_saves INTEGER NOT NULL DEFAULT 0,
+    revives_given INTEGER NOT NULL DEFAULT 0,
+    revives_received INTEGER NOT NULL DEFAULT 0,
+    last_event_at TIMESTAMPTZ
+);
+
+-- The same counters per UTC week (weeks start on Monday)
+CREATE TABLE IF NOT EXISTS combat_weekly (
+    player_id BIGINT NOT NULL,
+    week DATE NOT NULL,
+    kills INTEGER NOT NULL DEFAULT 0,
+    deaths INTEGER NOT NULL DEFAULT 0,
+    vests_broken INTEGER NOT NULL DEFAULT 0,
+    vest_saves INTEGER NOT NULL DEFAULT 0,
+    revives_given INTEGER NOT NULL DEFAULT 0,
+    revives_received INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT pk_combat_weekly PRIMARY KEY (player_id, week)
+);
+
+-- Kills per (killer, victim) pair: a player's favourite target and their nemesis
+CREATE TABLE IF NOT EXISTS combat_rivals (
+    killer_id BIGINT NOT NULL,
+    victim_id BIGINT NOT NULL,
+    kills INTEGER NOT NULL DEFAULT 0,
+    CONSTRAINT pk_combat_rivals PRIMARY KEY (killer_id, victim_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_combat_rivals_killer ON combat_rivals (killer_id, kills DESC);
+CREATE INDEX IF NOT EXISTS idx_combat_rivals_victim ON combat_rivals (victim_id, kills DESC);
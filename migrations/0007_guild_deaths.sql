@@ -0,0 +1,24 @@
+-- Deaths are per guild: the shot role and timeout belong to the guild the player was shot
+-- in, while players_table is shared by every guild. players_table.dead_guild_id could only
+-- hold one of them, so a death in a second guild overwrote (or a revive there cleared) the
+-- first guild's pending expiry. A row here is a death whose role hasn't expired yet.
+
+CREATE TABLE IF NOT EXISTS player_deaths (
+    guild_id BIGINT NOT NULL,
+    player_id BIGINT NOT NULL REFERENCES players_table(player_id) ON DELETE CASCADE,
+    died_at TIMESTAMPTZ NOT NULL,
+    CONSTRAINT pk_player_deaths PRIMARY KEY (guild_id, player_id)
+);
+
+-- Read back in expiry order by the scheduler on startup
+CREATE INDEX IF NOT EXISTS idx_player_deaths_died_at ON player_deaths (died_at);
+CREATE INDEX IF NOT EXISTS idx_player_deaths_player ON player_deaths (player_id);
+
+INSERT INTO player_deaths (guild_id, player_id, died_at)
+SELECT dead_guild_id, player_id, last_dead
+FROM players_table
+WHERE dead_guild_id IS NOT NULL AND last_dead IS NOT NULL
+ON CONFLICT DO NOTHING;
+
+DROP INDEX IF EXISTS idx_players_pending_deaths;
+ALTER TABLE players_table DROP COLUMN IF EXISTS dead_guild_id;
@@ -0,0 +1,22 @@
+-- The market holds buy orders' escrow between placement and settlement or cancellation.
+-- It gets a transfer party of its own so escrowing, refunding and releasing that money is
+-- logged in transactions_table like every other balance change. There is exactly one
+-- market party and it references nothing; its balance is the escrow of the open buy
+-- orders in market_orders, so it's never snapshotted.
+
+ALTER TABLE transfer_parties_table DROP CONSTRAINT IF EXISTS transfer_parties_table_party_type_check;
+ALTER TABLE transfer_parties_table ADD CONSTRAINT transfer_parties_table_party_type_check
+    CHECK (party_type IN ('player', 'company', 'building', 'market'));
+
+ALTER TABLE transfer_parties_table DROP CONSTRAINT IF EXISTS transfer_parties_table_check;
+ALTER TABLE transfer_parties_table ADD CONSTRAINT transfer_parties_table_check CHECK (
+    (party_type = 'player' AND player_id IS NOT NULL AND company_id IS NULL AND building_id IS NULL) OR
+    (party_type = 'company' AND company_id IS NOT NULL AND player_id IS NULL AND building_id IS NULL) OR
+    (party_type = 'building' AND building_id IS NOT NULL AND player_id IS NULL AND company_id IS NULL) OR
+    (party_type = 'market' AND player_id IS NULL AND company_id IS NULL AND building_id IS NULL)
+);
+
+CREATE UNIQUE INDEX IF NOT EXISTS uq_transfer_parties_market
+    ON transfer_parties_table (party_type) WHERE party_type = 'market';
+
+INSERT INTO transfer_parties_table (party_type) VALUES ('market') ON CONFLICT DO NOTHING;
@@ -0,0 +1,27 @@
+-- A snapshot used to include the transfers stamped before its taken_at. Both are stamped with
+-- their transaction's start time, so a transfer whose transaction started before a snapshot but
+-- committed after it was in neither the snapshot nor the transfers counted after it. A snapshot
+-- now records the last transaction_number of its party it includes. Every transfer is recorded
+-- while its parties' balance rows are locked, as is the snapshot, so a transfer the snapshot
+-- doesn't include always gets a higher transaction_number.
+
+ALTER TABLE balance_snapshots_table ADD COLUMN IF NOT EXISTS last_transaction_number INTEGER;
+
+-- Existing snapshots keep their timestamp order
+UPDATE balance_snapshots_table AS s
+SET last_transaction_number = COALESCE((
+    SELECT MAX(t.transaction_number) FROM transactions_table AS t
+    WHERE (t.sender_party_id = s.party_id OR t.recipient_party_id = s.party_id)
+      AND t.time_of_transaction <= s.taken_at
+), 0)
+WHERE last_transaction_number IS NULL;
+
+ALTER TABLE balance_snapshots_table ALTER COLUMN last_transaction_number SET NOT NULL;
+
+-- Party lookups now range over transaction_number rather than time_of_transaction
+CREATE INDEX IF NOT EXISTS idx_transactions_sender_number
+    ON transactions_table (sender_party_id, transaction_number);
+CREATE INDEX IF NOT EXISTS idx_transactions_recipient_number
+    ON transactions_table (recipient_party_id, transaction_number);
+DROP INDEX IF EXISTS idx_transactions_sender;
+DROP INDEX IF EXISTS idx_transactions_recipient;
@@ -0,0 +1,4 @@
+-- /revive's per-player cooldown becomes a guild setting like /shoot's (NULL keeps the .env default)
+
+ALTER TABLE guild_settings_table ADD COLUMN IF NOT EXISTS revive_cooldown_seconds INTEGER
+    CHECK (revive_cooldown_seconds >= 0);
@@ -0,0 +1,465 @@
+"""
+Offline load test for the game commands.
+
+Drives the real /shoot, /revive and /inventory cog callbacks with fake interactions,
+members and guilds against a local Postgres, and reports throughput, latency
+percentiles and database queries per command.
+
+    python3 scripts/benchmark.py --init --players 1000 --commands 20000 --concurrency 64
+    python3 scripts/benchmark.py --mix shoot=1 --skew 1.2 --edit-latency 0.05
+
+Database settings come from config/.env (DB_USER, DB_PASSWORD, DB_NAME, DB_HOST, DB_PORT).
+Benchmark players use IDs from BENCH_ID_BASE upwards and are deleted before each run.
+Point it at a scratch database: --init applies any pending schema migrations first.
+"""
+import argparse
+import asyncio
+import contextvars
+import logging
+import math
+import os
+import random
+import time
+from pathlib import Path
+
+import asyncpg
+import discord
+from discord import app_commands
+from dotenv import load_dotenv
+
+from services.database import Database, PoolMetrics
+from services.migrations import migrate
+from services.player_store import PlayerStore
+from services.member_mutations import MemberMutationQueue
+from services.death_expiry import DeathExpiryScheduler
+from services.member_cache import MemberCache
+from services.notifications import NotificationListener
+from services.guild_settings import GuildSettings, GuildSettingsCache
+from services.rankings import Rankings
+from services.combat_log import CombatLog
+from services.rate_limiter import RateLimiter
+from services.interactions import InteractionPipeline
+import services.queries  # Registers the named statements
+from cogs.registration import Registration
+from cogs.shoot import ShootCommands
+from cogs.revive import ReviveCommand
+from cogs.inventory import InventoryCommand
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='[%(levelname)s] %(asctime)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+ROOT = Path(__file__).resolve().parent.parent
+ENV_PATH = ROOT / "config" / ".env"
+
+BENCH_ID_BASE = 900_000_000_000_000_000
+BENCH_GUILD_ID = 899_999_999_999_999_999
+SHOT_ROLE_ID = 899_999_999_999_999_998
+
+# Queries issued by the command running in the current task
+QUERY_COUNTER = contextvars.ContextVar("query_counter", default=None)
+
+
+class CountingDatabase(Database):
+    """
+    Database that attributes every named statement to the command that issued it.
+    Raw queries outside the statement registry are not counted.
+    """
+
+    async def _run(self, method, name, args, conn):
+        counter = QUERY_COUNTER.get()
+        if conn is not None and counter is not None:
+            counter[0] += 1
+        return await super()._run(method, name, args, conn)
+
+
+# ---------- Fake Discord objects ----------
+class FakeRole:
+    def __init__(self, role_id: int, name: str):
+        self.id = role_id
+        self.name = name
+        self.mention = f"<@&{role_id}>"
+
+
+class FakePermissions:
+    manage_guild = False
+
+
+class FakeGuild:
+    def __init__(self, guild_id: int, roles: list):
+        self.id = guild_id
+        self.name = "Benchmark"
+        self.default_role = FakeRole(guild_id, "@everyone")
+        self._roles = {role.id: role for role in roles}
+        self.members = []
+        self._by_id = {}
+
+    def get_role(self, role_id: int):
+        return self._roles.get(role_id)
+
+    def get_member(self, member_id: int):
+        # Low-memory mode, like the MemberCache below: discord.py caches no members
+        return None
+
+    async def fetch_member(self, member_id: int):
+        # Stands in for GET /guilds/{guild_id}/members/{user_id}
+        if len(self._by_id) != len(self.members):
+            self._by_id = {member.id: member for member in self.members}
+        return self._by_id[member_id]
+
+
+class FakeMember:
+    def __init__(self, member_id: int, guild: FakeGuild, edit_latency: float):
+        self.id = member_id
+        self.guild = guild
+        self.bot = False
+        self.roles = [guild.default_role]
+        self.timed_out_until = None
+        self.guild_permissions = FakePermissions()
+        self.edit_latency = edit_latency
+        self.edits = 0
+
+    @property
+    def mention(self):
+        return f"<@{self.id}>"
+
+    @property
+    def display_name(self):
+        return f"player-{self.id - BENCH_ID_BASE}"
+
+    def __str__(self):
+        return self.display_name
+
+    @property
+    def timed_out(self):
+        return self.timed_out_until is not None and self.timed_out_until > discord.utils.utcnow()
+
+    def is_dead(self):
+        return any(role.id == SHOT_ROLE_ID for role in self.roles)
+
+    async def edit(self, *, roles=None, timed_out_until=discord.utils.MISSING, reason=None):
+        # Stands in for PATCH /guilds/{guild_id}/members/{user_id}
+        if self.edit_latency:
+            await asyncio.sleep(self.edit_latency)
+        self.edits += 1
+        if roles is not None:
+            self.roles = [self.guild.default_role] + [self.guild.get_role(role.id) for role in roles]
+        if timed_out_until is not discord.utils.MISSING:
+            self.timed_out_until = timed_out_until
+
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+        self.deferred = None  # ephemerality of the deferred placeholder, if any
+
+    def is_done(self):
+        return bool(self.messages) or self.deferred is not None
+
+    async def send_message(self, content=None, *, embed=None, ephemeral=False):
+        self.messages.append((content, embed, ephemeral))
+
+    async def defer(self, *, ephemeral=False, thinking=False):
+        self.deferred = ephemeral
+
+    async def send(self, content=None, *, embed=None, ephemeral=False):
+        self.messages.append((content, embed, ephemeral))
+
+
+class FakeInteraction:
+    def __init__(self, client, command, user: FakeMember):
+        self.client = client
+        self.command = command
+        self.user = user
+        self.guild = user.guild
+        self.guild_id = user.guild.id
+        self.extras = {}
+        self.response = FakeResponse()
+        self.followup = self.response
+
+    async def edit_original_response(self, *, content=None, embed=None):
+        self.response.messages.append((content, embed, self.response.deferred))
+
+    async def delete_original_response(self):
+        pass
+
+
+class BenchBot:
+    """
+    The parts of the bot the cogs and services use, without a gateway connection.
+    """
+
+    def __init__(self):
+        self.cogs = {}
+        self.guilds = []
+
+    def get_cog(self, name: str):
+        return self.cogs.get(name)
+
+    def get_guild(self, guild_id: int):
+        return next((guild for guild in self.guilds if guild.id == guild_id), None)
+
+    def is_ready(self) -> bool:
+        return False
+
+
+# ---------- Setup ----------
+def create_database(pool_size: int) -> CountingDatabase:
+    load_dotenv(dotenv_path=ENV_PATH)
+    return CountingDatabase(
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "5432")),
+        min_size=pool_size,
+        max_size=pool_size,
+        server_settings={"application_name": "wd-benchmark"}
+    )
+
+
+async def prepare_schema(db: Database, args):
+    """
+    Optionally applies the migrations, then removes the previous run's players.
+    """
+    conn = await asyncpg.connect(**db.connect_kwargs)
+    try:
+        if args.init:
+            await migrate(conn)
+        ids = [BENCH_ID_BASE + i for i in range(args.players)]
+        await conn.execute("DELETE FROM players_table WHERE player_id = ANY($1::bigint[])", ids)
+    finally:
+        await conn.close()
+
+
+async def build_bot(args) -> BenchBot:
+    bot = BenchBot()
+    bot.db = create_database(args.pool_size)
+    await prepare_schema(bot.db, args)
+
+    await bot.db.start()
+    bot.notifications = NotificationListener(bot.db)
+    bot.guild_settings = GuildSettingsCache(
+        bot.db,
+        GuildSettings(
+            shot_role_id=SHOT_ROLE_ID, shot_timeout=3600, shoot_cooldown=0,
+            start_guns=127, start_vest=args.vests, start_medkit=127, start_balance=100
+        ),
+        bot.notifications
+    )
+    bot.player_store = PlayerStore(bot, max_size=args.cache_size, ttl=300)
+    bot.rate_limiter = RateLimiter()
+    bot.interactions = InteractionPipeline(args.pool_size * 2, args.concurrency)
+    await bot.interactions.start()
+    bot.member_mutations = MemberMutationQueue()
+    bot.member_cache = MemberCache()
+    bot.death_expiry = DeathExpiryScheduler(
+        bot,
+        shot_role_id=lambda guild_id: SHOT_ROLE_ID,
+        timeout_seconds=lambda guild_id: 3600
+    )
+    bot.combat_log = CombatLog(bot)
+    await bot.combat_log.start()
+    bot.rankings = Rankings(bot)
+    await bot.rankings.refresh()
+
+    guild = FakeGuild(BENCH_GUILD_ID, [FakeRole(SHOT_ROLE_ID, "shot")])
+    guild.members = [FakeMember(BENCH_ID_BASE + i, guild, args.edit_latency) for i in range(args.players)]
+    bot.guilds.append(guild)
+
+    bot.cogs = {
+        "Registration": Registration(bot),
+        "ShootCommands": ShootCommands(bot),
+        "ReviveCommand": ReviveCommand(bot),
+        "InventoryCommand": InventoryCommand(bot),
+    }
+    return bot
+
+
+# ---------- Workload ----------
+class Workload:
+    """
+    Picks commands and their targets. Targets follow a Zipf-like distribution: with
+    skew s, the member ranked k is chosen with weight 1 / k**s (s = 0 is uniform).
+    """
+
+    def __init__(self, bot: BenchBot, mix: dict, skew: float, seed: int):
+        self.bot = bot
+        self.members = bot.guilds[0].members
+        self.random = random.Random(seed)
+        self.names = list(mix)
+        self.weights = list(mix.values())
+        ranks = range(1, len(self.members) + 1)
+        self.cumulative = list(_accumulate(1 / rank ** skew for rank in ranks))
+        self.shoot = bot.cogs["ShootCommands"].assign_role
+        self.revive = bot.cogs["ReviveCommand"].revive_player
+        self.inventory = bot.cogs["InventoryCommand"].check_inventory
+
+    def target(self) -> FakeMember:
+        return self.random.choices(self.members, cum_weights=self.cumulative)[0]
+
+    def next(self):
+        """
+        Returns (command name, app command, cog, interaction, args).
+        """
+        name = self.random.choices(self.names, weights=self.weights)[0]
+        caller = self.random.choice(self.members)
+        if name == "shoot":
+            target = self.target()
+            while target is caller:
+                target = self.target()
+            command, cog, args = self.shoot, self.bot.cogs["ShootCommands"], (target,)
+        elif name == "revive":
+            dead = [member for member in self.random.sample(self.members, min(32, len(self.members)))
+                    if member.is_dead() and member is not caller]
+            target = dead[0] if dead else self.target()
+            command, cog, args = self.revive, self.bot.cogs["ReviveCommand"], (target,)
+        else:
+            command, cog, args = self.inventory, self.bot.cogs["InventoryCommand"], ()
+        return name, command, cog, FakeInteraction(self.bot, command, caller), args
+
+
+def _accumulate(values):
+    total = 0.0
+    for value in values:
+        total += value
+        yield total
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {}
+        self.queries = {}
+        self.ephemeral = {}
+        self.errors = {}
+
+    def record(self, name: str, elapsed: float, queries: int, interaction: FakeInteraction):
+        self.latencies.setdefault(name, []).append(elapsed)
+        self.queries[name] = self.queries.get(name, 0) + queries
+        if any(ephemeral for _, _, ephemeral in interaction.response.messages):
+            self.ephemeral[name] = self.ephemeral.get(name, 0) + 1
+
+    def record_error(self, name: str):
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+
+async def run_command(workload: Workload, results: Results, checks: bool):
+    name, command, cog, interaction, args = workload.next()
+    counter = [0]
+    QUERY_COUNTER.set(counter)
+    started = time.perf_counter()
+    try:
+        if checks:
+            for check in command.checks:
+                await discord.utils.maybe_coroutine(check, interaction)
+        await command.callback(cog, interaction, *args)
+    except app_commands.CommandOnCooldown:
+        pass
+    except Exception as e:
+        results.record_error(name)
+        logging.error("/%s failed: %s", name, e)
+        return
+    results.record(name, time.perf_counter() - started, counter[0], interaction)
+
+
+async def run_phase(workload: Workload, total: int, concurrency: int, checks: bool) -> tuple:
+    results = Results()
+    remaining = total
+
+    async def worker():
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            # Each command gets its own context, so its query count stays separate
+            await asyncio.create_task(run_command(workload, results, checks))
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return results, time.perf_counter() - started
+
+
+# ---------- Report ----------
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # Nearest-rank percentile
+    index = min(len(sorted_values) - 1, max(0, math.ceil(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def report(results: Results, elapsed: float, bot: BenchBot):
+    completed = sum(len(latencies) for latencies in results.latencies.values())
+    print(f"\n{completed} commands in {elapsed:.2f}s: {completed / elapsed:.1f} commands/sec\n")
+    print(f"{'command':<10}{'count':>8}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'max ms':>10}"
+          f"{'queries':>9}{'refused':>9}{'errors':>8}")
+    for name in sorted(results.latencies):
+        latencies = sorted(results.latencies[name])
+        count = len(latencies)
+        print(
+            f"{'/' + name:<10}{count:>8}"
+            f"{percentile(latencies, 0.50) * 1000:>10.2f}"
+            f"{percentile(latencies, 0.90) * 1000:>10.2f}"
+            f"{percentile(latencies, 0.99) * 1000:>10.2f}"
+            f"{latencies[-1] * 1000:>10.2f}"
+            f"{results.queries[name] / count:>9.2f}"
+            f"{results.ephemeral.get(name, 0) / count:>9.1%}"
+            f"{results.errors.get(name, 0):>8}"
+        )
+
+    pool = bot.db.stats()
+    store = bot.player_store.stats()
+    mutations = bot.member_mutations.stats()
+    print(
+        f"\npool: {pool['acquires']} acquires, avg wait {pool['acquire_wait_avg'] * 1000:.2f} ms, "
+        f"max wait {pool['acquire_wait_max'] * 1000:.2f} ms, {pool['acquire_timeouts']} timeouts"
+    )
+    print(f"player store: {store}")
+    print(f"member edits: {mutations}")
+
+
+def parse_mix(value: str) -> dict:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("shoot", "revive", "inventory"):
+            raise argparse.ArgumentTypeError(f"Unknown command {name!r} in --mix.")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Benchmark the game commands against a local Postgres.")
+    parser.add_argument("--players", type=int, default=1000, help="Members in the fake guild")
+    parser.add_argument("--commands", type=int, default=10000, help="Commands to run in the measured phase")
+    parser.add_argument("--warmup", type=int, default=500, help="Commands to run before measuring")
+    parser.add_argument("--concurrency", type=int, default=32, help="Commands in flight at once")
+    parser.add_argument("--mix", type=parse_mix, default=parse_mix("shoot=4,revive=3,inventory=3"),
+                        help="Command weights, e.g. shoot=4,revive=3,inventory=3")
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent for picking targets (0 = uniform)")
+    parser.add_argument("--vests", type=int, default=0, help="Vests every benchmark player starts with")
+    parser.add_argument("--edit-latency", type=float, default=0.0, help="Simulated seconds per member edit")
+    parser.add_argument("--pool-size", type=int, default=10, help="Database pool size")
+    parser.add_argument("--cache-size", type=int, default=10000, help="Player store size")
+    parser.add_argument("--checks", action="store_true", help="Also run the commands' checks (rate limits)")
+    parser.add_argument("--init", action="store_true", help="Apply pending schema migrations first")
+    parser.add_argument("--seed", type=int, default=1, help="Random seed for the workload")
+    args = parser.parse_args()
+
+    bot = await build_bot(args)
+    workload = Workload(bot, args.mix, args.skew, args.seed)
+    try:
+        if args.warmup:
+            await run_phase(workload, args.warmup, args.concurrency, args.checks)
+        bot.db.metrics = PoolMetrics()
+        results, elapsed = await run_phase(workload, args.commands, args.concurrency, args.checks)
+        report(results, elapsed, bot)
+    finally:
+        await bot.member_mutations.close()
+        await bot.combat_log.close()
+        await bot.db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,69 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import logging
+from services.rate_limiter import Limit, rate_limit, USER, GUILD
+from services.interactions import deferred, respond
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 10
+
+CATEGORY_LABELS = {
+    "balance": "Richest Players",
+    "kills": "Top Shooters",
+    "revives": "Top Medics",
+}
+
+class LeaderboardCommand(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="leaderboard", description="Show the top players by balance, kills or revives.")
+    @app_commands.describe(category="What to rank players by", page="Page of the leaderboard to show")
+    @app_commands.choices(category=[
+        app_commands.Choice(name="Balance", value="balance"),
+        app_commands.Choice(name="Kills", value="kills"),
+        app_commands.Choice(name="Revives", value="revives"),
+    ])
+    @rate_limit(Limit(USER, 3, 10), Limit(GUILD, 20, 10))
+    @deferred()
+    async def leaderboard(
+        self,
+        interaction: discord.Interaction,
+        category: app_commands.Choice[str] = None,
+        page: app_commands.Range[int, 1, 100] = 1
+    ):
+        """
+        Displays one page of the cached leaderboard; no query runs unless the ranking needs a reload.
+        """
+        column = category.value if category else "balance"
+        offset = (page - 1) * PAGE_SIZE
+
+        try:
+            entries = await self.bot.rankings.page(column, offset, PAGE_SIZE)
+        except Exception as e:
+            logger.exception("Error fetching the %s leaderboard: %s", column, e)
+            await respond(interaction, "An error occurred while fetching the leaderboard.", ephemeral=True)
+            return
+
+        if not entries:
+            await respond(interaction, "There's nobody on that page of the leaderboard.", ephemeral=True)
+            return
+
+        lines = []
+        for rank, (player_id, score) in enumerate(entries, start=offset + 1):
+            name = f"<@{player_id}>" if player_id else "Government"  # Player 0 is the government
+            value = f"${score}" if column == "balance" else f"{score}"
+            lines.append(f"**#{rank}** {name} — {value}")
+
+        embed = discord.Embed(
+            title=CATEGORY_LABELS[column],
+            description="\n".join(lines),
+            color=discord.Color.gold()
+        )
+        embed.set_footer(text=f"Page {page}")
+        await respond(interaction, embed=embed)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(LeaderboardCommand(bot))
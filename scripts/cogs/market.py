@@ -0,0 +1,138 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import logging
+from services.market import BUY, SELL, OrderRejected
+from services.rate_limiter import Limit, rate_limit, USER
+from services.interactions import deferred, respond
+
+logger = logging.getLogger(__name__)
+
+ITEM_CHOICES = [
+    app_commands.Choice(name="Guns", value="guns"),
+    app_commands.Choice(name="Vests", value="vest"),
+    app_commands.Choice(name="Medkits", value="medkit"),
+]
+
+UNAVAILABLE = "The market is only available when the bot runs as a single process."
+
+class MarketCommands(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    async def place(self, interaction: discord.Interaction, side: str, item: str, quantity: int, price: int):
+        market = getattr(self.bot, "market", None)
+        if market is None:
+            await respond(interaction, UNAVAILABLE, ephemeral=True)
+            return
+
+        # Registers the player if needed
+        await self.bot.player_store.get(interaction.user.id, guild_id=interaction.guild.id)
+        try:
+            order, trades = await market.place(interaction.user.id, side, item, quantity, price)
+        except OrderRejected as e:
+            await respond(interaction, str(e), ephemeral=True)
+            return
+
+        filled = sum(trade.quantity for trade in trades)
+        verb = "Bought" if side == BUY else "Sold"
+        lines = []
+        if filled:
+            average = sum(trade.price * trade.quantity for trade in trades) / filled
+            lines.append(f"{verb} {filled} {item} at an average of ${average:.2f}.")
+        if order.remaining:
+            lines.append(f"Order #{order.order_id}: {order.remaining} {item} waiting on the book at ${price}.")
+        logger.info(
+            "Order %s: %s %s %s at %s, %s filled",
+            order.order_id, side, quantity, item, price, filled,
+            extra={"event": "market_order", "side": side, "item": item, "filled": filled}
+        )
+        await respond(interaction, "\n".join(lines))
+
+    @app_commands.command(name="buy", description="Buy guns, vests or medkits on the market.")
+    @app_commands.describe(item="What to buy", quantity="How many", price="The most you'll pay per item")
+    @app_commands.choices(item=ITEM_CHOICES)
+    @rate_limit(Limit(USER, 5, 10))
+    @deferred()
+    async def buy(
+        self,
+        interaction: discord.Interaction,
+        item: app_commands.Choice[str],
+        quantity: app_commands.Range[int, 1, 127],
+        price: app_commands.Range[int, 1, 1_000_000]
+    ):
+        """
+        Places a buy order; the money is held until it fills or is cancelled.
+        """
+        await self.place(interaction, BUY, item.value, quantity, price)
+
+    @app_commands.command(name="sell", description="Sell guns, vests or medkits on the market.")
+    @app_commands.describe(item="What to sell", quantity="How many", price="The least you'll take per item")
+    @app_commands.choices(item=ITEM_CHOICES)
+    @rate_limit(Limit(USER, 5, 10))
+    @deferred()
+    async def sell(
+        self,
+        interaction: discord.Interaction,
+        item: app_commands.Choice[str],
+        quantity: app_commands.Range[int, 1, 127],
+        price: app_commands.Range[int, 1, 1_000_000]
+    ):
+        """
+        Places a sell order; the items are held until they sell or the order is cancelled.
+        """
+        await self.place(interaction, SELL, item.value, quantity, price)
+
+    @app_commands.command(name="cancel", description="Cancel one of your open market orders.")
+    @app_commands.describe(order="The order number shown when you placed it")
+    @rate_limit(Limit(USER, 5, 10))
+    @deferred(ephemeral=True)
+    async def cancel(self, interaction: discord.Interaction, order: int):
+        """
+        Cancels an open order and returns whatever it still held (money or items).
+        """
+        market = getattr(self.bot, "market", None)
+        if market is None:
+            await respond(interaction, UNAVAILABLE, ephemeral=True)
+            return
+        try:
+            refunded = await market.cancel(interaction.user.id, order)
+        except OrderRejected as e:
+            await respond(interaction, str(e), ephemeral=True)
+            return
+        await respond(interaction, f"Cancelled order #{order}; what was held for its {refunded} unfilled item(s) was returned.", ephemeral=True)
+
+    @app_commands.command(name="market", description="Show the market's best prices and your open orders.")
+    @rate_limit(Limit(USER, 3, 10))
+    async def market(self, interaction: discord.Interaction):
+        """
+        Shows the top of each item's order book and the caller's open orders.
+        """
+        market = getattr(self.bot, "market", None)
+        if market is None:
+            await respond(interaction, UNAVAILABLE, ephemeral=True)
+            return
+
+        embed = discord.Embed(title="Market", color=discord.Color.green())
+        for choice in ITEM_CHOICES:
+            bids, asks = market.books[choice.value].depth(levels=3)
+            embed.add_field(
+                name=choice.name,
+                value="Buying: " + (", ".join(f"{quantity} @ ${price}" for price, quantity in bids) or "none") +
+                      "\nSelling: " + (", ".join(f"{quantity} @ ${price}" for price, quantity in asks) or "none"),
+                inline=False
+            )
+        orders = market.open_orders(interaction.user.id)
+        if orders:
+            embed.add_field(
+                name="Your Orders",
+                value="\n".join(
+                    f"#{order.order_id}: {order.side} {order.remaining} {order.item} @ ${order.price}"
+                    for order in orders[:10]
+                ),
+                inline=False
+            )
+        await respond(interaction, embed=embed, ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(MarketCommands(bot))
@@ -1,68 +1,184 @@
 import discord
 from discord.ext import commands
-from dotenv import load_dotenv
 import os
-import asyncpg
+import asyncio
 import logging
+from services.queries import PLAYERS_REGISTER, PLAYERS_REGISTER_BATCH, PLAYERS_FETCH_OR_REGISTER
 
 logger = logging.getLogger("discord_bot")
-DEBUG = os.getenv("DEBUG") == "True"  # Set DEBUG to True if the environment variable is "True"
+BACKFILL_BATCH_SIZE = int(os.getenv("BACKFILL_BATCH_SIZE", "5000"))
 
 class Registration(commands.Cog):
-    def __init__(self, bot, db_pool):
+    def __init__(self, bot):
         self.bot = bot
-        self.db_pool = db_pool  # Use the database connection pool
+        # Kept on the bot so reloading this cog doesn't backfill every guild again
+        if not hasattr(bot, "backfilled_guilds"):
+            bot.backfilled_guilds = set()
+        self._backfilled_guilds = bot.backfilled_guilds
+        self._backfill_task = None
+
+    async def cog_load(self):
+        # When loaded after the bot is already connected, on_ready has passed; backfill now instead
+        if self.bot.is_ready():
+            self._backfill_task = asyncio.create_task(self.backfill_all_guilds())
+
+    async def cog_unload(self):
+        if self._backfill_task:
+            self._backfill_task.cancel()
 
     @commands.Cog.listener()
     async def on_ready(self):
-        logger.info(f"Registration cog has been loaded.")
+        logger.info("Registration cog has been loaded.")
+        await self.backfill_all_guilds()
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild):
+        await self.backfill_guild(guild)
+
+    @commands.Cog.listener()
+    async def on_member_join(self, member: discord.Member):
+        if member.bot:
+            return
+        async with self.bot.db.acquire() as conn:
+            await self.create_player_if_not_exists(conn, member.id, member.guild.id)
 
     @commands.command(name='register')
     async def register_player(self, ctx, player_id: str = None):
         """Registers a player if they don't exist in the database.
-        If no player_id is provided, defaults to the author's ID."""
-        player_id = player_id or str(ctx.author.id)  # Use the author's Discord ID if no player_id is given
-        
+        If no player_id is provided, defaults to the author's ID.
+        Use `wd!register --all` (requires Manage Server) to register every member of the guild."""
+        if player_id == "--all":
+            await self.register_all(ctx)
+            return
+
+        if player_id is None:
+            player_id = ctx.author.id  # Use the author's Discord ID if no player_id is given
+        elif player_id.isdigit():
+            player_id = int(player_id)
+        else:
+            await ctx.send("Player IDs are Discord user IDs (numbers).")
+            return
+
         try:
             # Use the database connection pool to get a connection
-            async with self.db_pool.acquire() as conn:
-                await self.create_player_if_not_exists(conn, player_id)
+            async with self.bot.db.acquire() as conn:
+                await self.create_player_if_not_exists(conn, player_id, ctx.guild.id if ctx.guild else None)
                 await ctx.send(f"Player {player_id} has been registered.")
         except Exception as e:
-            logger.error(f"Error registering player {player_id}: {e}")
+            logger.error("Error registering player %s: %s", player_id, e)
             await ctx.send(f"Failed to register player {player_id}.")
 
-    async def create_player_if_not_exists(self, conn, player_id):
-        # Check if player exists
-        result = await conn.fetchrow("SELECT player_id FROM players_table WHERE player_id = $1", player_id)
-
-        if result is None:  # Player doesn't exist
-            # Set default values based on the DEBUG variable
-            if DEBUG:
-                guns = 127
-                vest = 127
-                medkit = 127
-                balance = 101010
-                logger.info(f"Setting default values for player {player_id} in DEBUG mode.")
-            else:
-                guns = 0
-                vest = 0
-                medkit = 0
-                balance = 50
-                logger.info(f"Setting default values for player {player_id} in normal mode.")
-
-            # Insert player with default values
-            await conn.execute(
-                "INSERT INTO players_table (player_id, guns, medkit, vest, balance) VALUES ($1, $2, $3, $4, $5)",
-                player_id, guns, medkit, vest, balance
+    async def register_all(self, ctx):
+        if ctx.guild is None or not ctx.author.guild_permissions.manage_guild:
+            await ctx.send("You must have the **Manage Server** permission to register every member.")
+            return
+
+        try:
+            created = await self.backfill_guild(ctx.guild, force=True)
+            await ctx.send(f"Registered {created} new player(s) from {ctx.guild.name}.")
+        except Exception as e:
+            logger.error("Error registering members of guild %s: %s", ctx.guild.id, e)
+            await ctx.send("Failed to register the guild's members.")
+
+    def starting_loadout(self, guild_id=None):
+        """
+        Returns the guild's (guns, vest, medkit, balance) for newly registered players.
+        """
+        return self.bot.guild_settings.get(guild_id).starting_loadout()
+
+    async def create_player_if_not_exists(self, conn, player_id, guild_id=None):
+        """
+        Inserts the player with the starting loadout; does nothing if they already exist.
+        Returns True if the player was created.
+        """
+        guns, vest, medkit, balance = self.starting_loadout(guild_id)
+        status = await self.bot.db.execute(
+            PLAYERS_REGISTER, player_id, guns, medkit, vest, balance, conn=conn
+        )
+
+        created = status.endswith(" 1")
+        if created:
+            logger.info("Player %s created in the database with the starting loadout of guild %s.", player_id, guild_id)
+        return created
+
+    async def fetch_or_register_players(self, conn, player_ids: list, guild_id=None):
+        """
+        Returns the rows for the given players in one round trip, inserting the missing ones first.
+        """
+        guns, vest, medkit, balance = self.starting_loadout(guild_id)
+        return await self.bot.db.fetch(
+            PLAYERS_FETCH_OR_REGISTER, player_ids, guns, medkit, vest, balance, conn=conn
+        )
+
+    async def register_players(self, conn, player_ids: list, guild_id=None) -> int:
+        """
+        Bulk-registers players in batches of BACKFILL_BATCH_SIZE. Returns how many were created.
+        """
+        guns, vest, medkit, balance = self.starting_loadout(guild_id)
+        created = 0
+        for start in range(0, len(player_ids), BACKFILL_BATCH_SIZE):
+            batch = player_ids[start:start + BACKFILL_BATCH_SIZE]
+            status = await self.bot.db.execute(
+                PLAYERS_REGISTER_BATCH, batch, guns, medkit, vest, balance, conn=conn
             )
-            logger.info(f"Player {player_id} created in the database with default values.")
+            created += int(status.split()[-1])
+        return created
+
+    async def backfill_guild(self, guild: discord.Guild, force: bool = False) -> int:
+        """
+        Registers every (non-bot) member of the guild. Runs once per guild per process unless forced.
+        Guilds that weren't chunked (the low-memory member cache mode) are only backfilled when forced.
+        """
+        if guild.id in self._backfilled_guilds and not force:
+            return 0
+        if not guild.chunked and not force:
+            # Listing an uncached guild costs an API call per 1000 members; players
+            # register on first use or through wd!register --all instead
+            return 0
+        self._backfilled_guilds.add(guild.id)
+
+        if guild.chunked:
+            player_ids = [member.id for member in guild.members if not member.bot]
+            async with self.bot.db.acquire() as conn:
+                created = await self.register_players(conn, player_ids, guild.id)
+            total = len(player_ids)
         else:
-            logger.info(f"Player {player_id} already exists in the database.")
+            created, total = await self.backfill_uncached_guild(guild)
+        logger.info("Backfilled guild %s: %s of %s member(s) newly registered.", guild.id, created, total)
+        return created
+
+    async def backfill_uncached_guild(self, guild: discord.Guild) -> tuple:
+        """
+        Streams the guild's member list from the API, registering it a batch at a time so
+        only one batch of IDs is ever held. Returns (created, total).
+        """
+        created = total = 0
+        batch = []
+        async for member in guild.fetch_members(limit=None):
+            if member.bot:
+                continue
+            batch.append(member.id)
+            if len(batch) >= BACKFILL_BATCH_SIZE:
+                async with self.bot.db.acquire() as conn:
+                    created += await self.register_players(conn, batch, guild.id)
+                total += len(batch)
+                batch = []
+        if batch:
+            async with self.bot.db.acquire() as conn:
+                created += await self.register_players(conn, batch, guild.id)
+            total += len(batch)
+        return created, total
+
+    async def backfill_all_guilds(self):
+        for guild in self.bot.guilds:
+            try:
+                await self.backfill_guild(guild)
+            except Exception as e:
+                self._backfilled_guilds.discard(guild.id)
+                logger.error("Error backfilling guild %s: %s", guild.id, e)
 
 async def setup(bot):
-    db_pool = bot.db_pool  # Use the db_pool from the bot instance
-    await bot.add_cog(Registration(bot, db_pool))
+    await bot.add_cog(Registration(bot))
 
 # When calling this in another cog, use the below line
 # bot.load_extension('registration')
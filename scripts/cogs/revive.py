@@ -1,17 +1,28 @@
 import discord
 from discord import app_commands
 from discord.ext import commands
-import os
 import logging
+from services.queries import REVIVE_USE_MEDKIT
+from services.rate_limiter import Limit, rate_limit, USER, GUILD
+from services.interactions import deferred, respond
+from services.combat_log import REVIVE
 
 logger = logging.getLogger("discord_bot")
 
+def revive_cooldown(interaction: discord.Interaction) -> int:
+    return interaction.client.guild_settings.get(interaction.guild_id).revive_cooldown
+
 class ReviveCommand(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
 
     @app_commands.command(name="revive", description="Revive a player")
     @app_commands.describe(user="The user you want to revive")
+    @rate_limit(
+        Limit(USER, 1, revive_cooldown, shared=True),  # the guild's revive cooldown
+        Limit(GUILD, 30, 10)
+    )
+    @deferred()
     async def revive_player(self, interaction: discord.Interaction, user: discord.Member):
         """
         Allows a user (medic) to revive another user (patient) if they have a medkit.
@@ -19,81 +30,72 @@ class ReviveCommand(commands.Cog):
         medic: discord.Member = interaction.user
         patient: discord.Member = user
 
-        async def create_player(player_id: str):
-            """
-            Ensures the player exists in the database by calling the registration cog.
-            """
-            registration_cog = self.bot.get_cog('Registration')
-            if registration_cog:
-                await registration_cog.create_player_if_not_exists(self.bot.db_pool, player_id)
-            else:
-                logger.error("Registration cog is not loaded. Unable to create player.")
-                raise Exception("Registration cog not found.")
-
-        # Ensure both players are registered
-        await create_player(str(medic.id))
-        await create_player(str(patient.id))
+        # Load both players through the shared store, registering them if needed
+        medic_data, _ = await self.bot.player_store.get_many(
+            medic.id, patient.id, guild_id=interaction.guild.id
+        )
 
-        logger.info(f"{medic.mention} wants to revive {patient.mention}")
+        logger.debug("%s wants to revive %s", medic.id, patient.id)
 
-        shot_role_id = int(os.getenv("SHOT_ROLE"))
-        shot_role = interaction.guild.get_role(shot_role_id)
+        settings = self.bot.guild_settings.get(interaction.guild.id)
+        shot_role = interaction.guild.get_role(settings.shot_role_id) if settings.shot_role_id else None
 
         if not shot_role:
-            await interaction.response.send_message("Shot Role not found.", ephemeral=True)
-            logger.error("Shot role not found. Check SHOT_ROLE environment variable.")
+            await respond(interaction, "Shot Role not found.", ephemeral=True)
+            logger.error("Shot role not found. Check the guild's shot role setting or the SHOT_ROLE environment variable.")
             return
 
         # Check if the patient has the shot role
         has_shot_role = any(role.id == shot_role.id for role in patient.roles)
         if not has_shot_role:
-            await interaction.response.send_message(f"{patient.mention} is not dead.", ephemeral=True)
+            await respond(interaction, f"{patient.mention} is not dead.", ephemeral=True)
             return
 
-        async with self.bot.db_pool.acquire() as conn:
-            try:
-                # Check medic's medkit count
-                result = await conn.fetchrow("""
-                    SELECT medkit FROM players_table WHERE player_id = $1;
-                """, str(medic.id))
-
-                if not result:
-                    await interaction.response.send_message("You are not registered in the game.", ephemeral=True)
-                    logger.warning(f"Medic {medic.id} is not registered in the DB.")
-                    return
-
-                medkit_count = result["medkit"]
-                logger.info(f"{medic.mention} has {medkit_count} medkits.")
-
-                if medkit_count <= 0:
-                    await interaction.response.send_message(f"{medic.mention}, you don't have any medkits!", ephemeral=True)
-                    return
-
-                # Subtract medkit and update patient's status
-                await conn.execute("""
-                    UPDATE players_table
-                    SET medkit = GREATEST(medkit - 1, 0)
-                    WHERE player_id = $1;
-                """, str(medic.id))
-
-                # Remove shot role and timeout
-                await patient.remove_roles(shot_role)
-                await patient.edit(timed_out_until=None)
-
-                await interaction.response.send_message(
-                    f"{patient.mention} has been revived by {medic.mention}!"
-                )
-                logger.info(f"{medic.mention} successfully revived {patient.mention}.")
-
-            except discord.Forbidden:
-                await interaction.response.send_message(
-                    "Missing permissions to modify roles or timeouts. Please check role hierarchy and permissions.",
-                    ephemeral=True
-                )
-                logger.error(f"Permission error while reviving {patient.mention}.")
-            except Exception as e:
-                await interaction.response.send_message(f"An unexpected error occurred: {e}", ephemeral=True)
-                logger.exception(f"Unexpected error while reviving {patient.mention}: {e}")
+        try:
+            # Fast path: the cached row already shows no medkits
+            if medic_data["medkit"] <= 0:
+                await respond(interaction, f"{medic.mention}, you don't have any medkits!", ephemeral=True)
+                return
+
+            # Check and subtract the medkit in one atomic statement; no row means none were left
+            rows = await self.bot.player_store.write(REVIVE_USE_MEDKIT, medic.id, patient.id, interaction.guild.id)
+            used = next((row for row in rows if row["side"] == "medic"), None)
+
+            if used is None:
+                self.bot.player_store.invalidate(medic.id)
+                await respond(interaction, f"{medic.mention}, you don't have any medkits!", ephemeral=True)
+                return
+
+            logger.debug("%s used a medkit, %s left.", medic.id, used['medkit'])
+            self.bot.death_expiry.cancel(patient.id, interaction.guild.id)
+            self.bot.combat_log.record(REVIVE, interaction.guild.id, medic.id, patient.id)
+
+            await self.bot.member_mutations.submit(
+                patient,
+                remove_roles=[shot_role],
+                timed_out_until=None,
+                reason=f"Revived by {medic}"
+            )
+
+            await respond(
+                interaction,
+                f"{patient.mention} has been revived by {medic.mention}!"
+            )
+            logger.info(
+                "%s successfully revived %s.", medic.id, patient.id,
+                extra={"event": "revive", "guild_id": interaction.guild.id}
+            )
+
+        except discord.Forbidden:
+            await respond(
+                interaction,
+                "Missing permissions to modify roles or timeouts. Please check role hierarchy and permissions.",
+                ephemeral=True
+            )
+            logger.error("Permission error while reviving %s.", patient.mention)
+        except Exception as e:
+            await respond(interaction, f"An unexpected error occurred: {e}", ephemeral=True)
+            logger.exception("Unexpected error while reviving %s: %s", patient.mention, e)
 
 async def setup(bot: commands.Bot):
     await bot.add_cog(ReviveCommand(bot))
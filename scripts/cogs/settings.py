@@ -0,0 +1,83 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import logging
+from services.interactions import deferred, respond
+
+logger = logging.getLogger(__name__)
+
+class SettingsCommand(commands.Cog):
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @app_commands.command(name="settings", description="View or change this server's game settings.")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    @app_commands.describe(
+        shot_role="Role given to players who have been shot",
+        shot_timeout="How long a shot player stays timed out, in seconds",
+        shoot_cooldown="Seconds a player must wait between shots",
+        revive_cooldown="Seconds a player must wait between revives",
+        start_guns="Guns given to newly registered players",
+        start_vest="Vests given to newly registered players",
+        start_medkit="Medkits given to newly registered players",
+        start_balance="Balance given to newly registered players"
+    )
+    @deferred(ephemeral=True)
+    async def settings(
+        self,
+        interaction: discord.Interaction,
+        shot_role: discord.Role = None,
+        shot_timeout: app_commands.Range[int, 1, 2419200] = None,
+        shoot_cooldown: app_commands.Range[int, 0, 86400] = None,
+        revive_cooldown: app_commands.Range[int, 0, 86400] = None,
+        start_guns: app_commands.Range[int, 0, 127] = None,
+        start_vest: app_commands.Range[int, 0, 127] = None,
+        start_medkit: app_commands.Range[int, 0, 127] = None,
+        start_balance: app_commands.Range[int, 0, 2147483647] = None
+    ):
+        """
+        Shows the server's settings, updating any that were given first.
+        Requires the 'Manage Server' permission.
+        """
+        changes = {
+            "shot_role_id": shot_role.id if shot_role else None,
+            "shot_timeout": shot_timeout,
+            "shoot_cooldown": shoot_cooldown,
+            "revive_cooldown": revive_cooldown,
+            "start_guns": start_guns,
+            "start_vest": start_vest,
+            "start_medkit": start_medkit,
+            "start_balance": start_balance,
+        }
+        changes = {field: value for field, value in changes.items() if value is not None}
+
+        try:
+            if changes:
+                current = await self.bot.guild_settings.update(interaction.guild.id, **changes)
+                logger.info("%s updated settings for guild %s: %s", interaction.user, interaction.guild.id, changes)
+            else:
+                current = self.bot.guild_settings.get(interaction.guild.id)
+        except Exception as e:
+            logger.exception("Error updating settings for guild %s: %s", interaction.guild.id, e)
+            await respond(interaction, "An error occurred while updating the settings.", ephemeral=True)
+            return
+
+        role = interaction.guild.get_role(current.shot_role_id) if current.shot_role_id else None
+        embed = discord.Embed(
+            title=f"{interaction.guild.name} Settings" + (" (updated)" if changes else ""),
+            color=discord.Color.blurple()
+        )
+        embed.add_field(name="Shot Role", value=role.mention if role else "Not set", inline=False)
+        embed.add_field(name="Shot Timeout", value=f"{current.shot_timeout}s", inline=True)
+        embed.add_field(name="Shoot Cooldown", value=f"{current.shoot_cooldown}s", inline=True)
+        embed.add_field(name="Revive Cooldown", value=f"{current.revive_cooldown}s", inline=True)
+        embed.add_field(
+            name="Starting Loadout",
+            value=f"{current.start_guns} guns, {current.start_vest} vests, "
+                  f"{current.start_medkit} medkits, ${current.start_balance}",
+            inline=False
+        )
+        await respond(interaction, embed=embed, ephemeral=True)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(SettingsCommand(bot))
@@ -0,0 +1,123 @@
+import discord
+from discord import app_commands
+from discord.ext import commands
+import logging
+from services.interactions import deferred, respond
+from services.rate_limiter import Limit, rate_limit, USER
+
+logger = logging.getLogger(__name__)
+
+TOP_SERIES = 8
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1000:.1f}ms"
+
+def summarize(series: dict, label: str, limit: int = TOP_SERIES) -> str:
+    """
+    One line per labelled histogram, busiest (by total time) first: count, p50, p99.
+    """
+    merged = {}
+    for labels, histogram in series.items():
+        name = dict(labels).get(label, "?")
+        merged.setdefault(name, []).append(histogram)
+
+    rows = []
+    for name, histograms in merged.items():
+        busiest = max(histograms, key=lambda histogram: histogram.count)
+        count = sum(histogram.count for histogram in histograms)
+        total = sum(histogram.sum for histogram in histograms)
+        rows.append((total, f"`{name}` ×{count} p50 {format_ms(busiest.quantile(0.5))} p99 {format_ms(busiest.quantile(0.99))}"))
+    rows.sort(reverse=True)
+    return "\n".join(line for _, line in rows[:limit]) or "No data yet"
+
+class StatsCommands(commands.Cog):
+    stats = app_commands.Group(name="stats", description="Bot and player statistics.")
+
+    def __init__(self, bot: commands.Bot):
+        self.bot = bot
+
+    @stats.command(name="bot", description="Show command, database and Discord API timings for this bot process.")
+    @app_commands.checks.has_permissions(manage_guild=True)
+    async def bot_stats(self, interaction: discord.Interaction):
+        """
+        Summarizes the process's metrics so a slow command can be traced to Postgres, the pool or Discord.
+        Requires the 'Manage Server' permission.
+        """
+        metrics = self.bot.metrics
+        embed = discord.Embed(title="Bot Stats", color=discord.Color.blurple())
+        embed.add_field(
+            name="Commands",
+            value=summarize(metrics.histograms("wd_command_seconds"), "command"),
+            inline=False
+        )
+        embed.add_field(
+            name="Database Statements",
+            value=summarize(metrics.histograms("wd_db_query_seconds"), "statement"),
+            inline=False
+        )
+
+        pool = self.bot.db.stats()
+        acquire = next(iter(metrics.histograms("wd_db_pool_acquire_seconds").values()), None)
+        embed.add_field(
+            name="Connection Pool",
+            value=f"{pool['in_use']}/{pool['size']} in use (max {pool['max_size']}), "
+                  f"{pool['acquire_timeouts']} timeouts\n"
+                  f"wait p50 {format_ms(acquire.quantile(0.5) if acquire else 0)} "
+                  f"p99 {format_ms(acquire.quantile(0.99) if acquire else 0)}",
+            inline=False
+        )
+
+        rate_limited = sum(metrics.counters("wd_discord_rest_429_total").values())
+        embed.add_field(
+            name="Discord API",
+            value=f"{int(rate_limited)} responses with 429\n"
+                  + summarize(metrics.histograms("wd_discord_rest_seconds"), "route", limit=5),
+            inline=False
+        )
+
+        mutations = self.bot.member_mutations.stats()
+        embed.add_field(
+            name="Queues",
+            value=f"{mutations['depth']} member edits pending, "
+                  f"{self.bot.death_expiry.pending()} deaths scheduled, "
+                  f"{self.bot.ledger.stats()['buffered']} transfers buffered",
+            inline=False
+        )
+        await respond(interaction, embed=embed, ephemeral=True)
+
+    @stats.command(name="player", description="Show a player's kills, deaths, vest saves and revives.")
+    @app_commands.describe(user="(Optional) The player to look up; defaults to you.")
+    @rate_limit(Limit(USER, 5, 10))
+    @deferred()
+    async def player_stats(self, interaction: discord.Interaction, user: discord.Member = None):
+        """
+        Shows the player's combat record, all time and this week, from the combat log's rollups.
+        """
+        target = user or interaction.user
+        stats = await self.bot.combat_log.player_stats(target.id)
+
+        def record(counters: dict) -> str:
+            deaths = counters["deaths"]
+            ratio = counters["kills"] / deaths if deaths else float(counters["kills"])
+            return (
+                f"Kills: {counters['kills']} · Deaths: {deaths} · K/D: {ratio:.2f}\n"
+                f"Shots stopped by vests: {counters['vests_broken']} · Saved by a vest: {counters['vest_saves']}\n"
+                f"Revives given: {counters['revives_given']} · Revived: {counters['revives_received']}"
+            )
+
+        embed = discord.Embed(title=f"{target.display_name}'s Stats", color=discord.Color.red())
+        embed.add_field(name="All Time", value=record(stats), inline=False)
+        embed.add_field(name="This Week", value=record(stats["week"]), inline=False)
+        if stats["victim"]:
+            victim_id, kills = stats["victim"]
+            embed.add_field(name="Favourite Target", value=f"<@{victim_id}> ({kills} kills)", inline=True)
+        if stats["nemesis"]:
+            killer_id, kills = stats["nemesis"]
+            embed.add_field(name="Nemesis", value=f"<@{killer_id}> ({kills} kills)", inline=True)
+        if stats["last_event_at"]:
+            embed.set_footer(text="Last fight")
+            embed.timestamp = stats["last_event_at"]
+        await respond(interaction, embed=embed)
+
+async def setup(bot: commands.Bot):
+    await bot.add_cog(StatsCommands(bot))
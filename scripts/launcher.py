@@ -0,0 +1,144 @@
+"""
+Runs the bot as several worker processes, each owning a contiguous range of shards.
+
+    python3 scripts/launcher.py --workers 4            # shard count from Discord's recommendation
+    python3 scripts/launcher.py --workers 4 --shards 16
+
+Every worker is a normal scripts/main.py process with SHARD_COUNT, SHARD_IDS, WORKER_ID
+and WORKER_COUNT set. Workers share the database; per-guild state (settings, death
+expiry, member edits) lives in the worker that owns the guild's shard, and player
+caches are kept coherent through players_table notifications.
+"""
+import argparse
+import logging
+import os
+import signal
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import requests
+from dotenv import load_dotenv
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s] %(asctime)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+MAIN_SCRIPT = Path(__file__).resolve().parent / "main.py"
+MIGRATE_SCRIPT = Path(__file__).resolve().parent / "migrate.py"
+ENV_PATH = Path(__file__).resolve().parent.parent / "config" / ".env"
+
+# Discord allows one IDENTIFY per 5 seconds per max_concurrency bucket
+IDENTIFY_INTERVAL = 5.0
+
+
+def recommended_gateway(token: str) -> tuple:
+    response = requests.get(
+        "https://discord.com/api/v10/gateway/bot",
+        headers={"Authorization": f"Bot {token}"},
+        timeout=10
+    )
+    response.raise_for_status()
+    data = response.json()
+    return data["shards"], data["session_start_limit"]["max_concurrency"]
+
+
+def split_shards(shard_count: int, workers: int) -> list:
+    """
+    Splits shard ids 0..shard_count-1 into `workers` contiguous, near-equal ranges.
+    """
+    base, extra = divmod(shard_count, workers)
+    ranges = []
+    start = 0
+    for worker_id in range(workers):
+        size = base + (1 if worker_id < extra else 0)
+        ranges.append(list(range(start, start + size)))
+        start += size
+    return [shard_ids for shard_ids in ranges if shard_ids]
+
+
+class Worker:
+    def __init__(self, worker_id: int, worker_count: int, shard_count: int, shard_ids: list):
+        self.worker_id = worker_id
+        self.env = dict(
+            os.environ,
+            SHARD_COUNT=str(shard_count),
+            SHARD_IDS=",".join(str(shard_id) for shard_id in shard_ids),
+            WORKER_ID=str(worker_id),
+            WORKER_COUNT=str(worker_count),
+        )
+        self.shard_ids = shard_ids
+        self.process = None
+        self.restarts = 0
+
+    def start(self):
+        logging.info("Starting worker %s for shards %s-%s", self.worker_id, self.shard_ids[0], self.shard_ids[-1])
+        self.process = subprocess.Popen([sys.executable, str(MAIN_SCRIPT)], env=self.env)
+
+    def stop(self):
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the bot across several sharded worker processes.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Number of worker processes")
+    parser.add_argument("--shards", type=int, default=None, help="Total shard count (default: Discord's recommendation)")
+    parser.add_argument("--max-restarts", type=int, default=5, help="Restarts allowed per worker before giving up")
+    args = parser.parse_args()
+
+    load_dotenv(dotenv_path=ENV_PATH)
+    max_concurrency = 1
+    shard_count = args.shards
+    if shard_count is None:
+        shard_count, max_concurrency = recommended_gateway(os.getenv("TOKEN"))
+        logging.info("Discord recommends %s shard(s), max_concurrency %s", shard_count, max_concurrency)
+
+    # Migrate once up front; workers refuse to start against an outdated schema
+    subprocess.run([sys.executable, str(MIGRATE_SCRIPT)], check=True)
+
+    ranges = split_shards(shard_count, max(1, args.workers))
+    workers = [Worker(worker_id, len(ranges), shard_count, shard_ids) for worker_id, shard_ids in enumerate(ranges)]
+
+    stopping = False
+
+    def shutdown(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for worker in workers:
+            worker.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+
+    # Stagger start-up so the workers' IDENTIFYs don't collide across processes
+    for worker in workers:
+        if stopping:
+            break
+        worker.start()
+        time.sleep(IDENTIFY_INTERVAL * len(worker.shard_ids) / max_concurrency)
+
+    while not stopping:
+        time.sleep(1)
+        for worker in workers:
+            code = worker.process.poll() if worker.process else None
+            if code is None or stopping:
+                continue
+            if worker.restarts >= args.max_restarts:
+                logging.critical("Worker %s exited with %s too many times; shutting down.", worker.worker_id, code)
+                shutdown(None, None)
+                break
+            worker.restarts += 1
+            logging.error("Worker %s exited with %s; restarting (%s/%s).", worker.worker_id, code, worker.restarts, args.max_restarts)
+            worker.start()
+
+    for worker in workers:
+        if worker.process:
+            worker.process.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,24 +1,51 @@
 import discord
+from discord import app_commands
 from discord.ext import commands
 from dotenv import load_dotenv
 from pathlib import Path
 import os
 import logging
-import asyncpg
-
-# ---------- Logging Setup ----------
-logging.basicConfig(
-    level=logging.DEBUG,
-    format='[%(levelname)s] %(asctime)s - %(message)s',
-    datefmt='%Y-%m-%d %H:%M:%S'
-)
+import asyncio
+import atexit
+from services.database import Database
+from services.migrations import pending_migrations
+from services.player_store import PlayerStore
+from services.member_mutations import MemberMutationQueue
+from services.member_cache import MemberCache
+from services.death_expiry import DeathExpiryScheduler
+from services.notifications import NotificationListener
+from services.guild_settings import GuildSettings, GuildSettingsCache
+from services.ledger import Ledger
+from services.combat_log import CombatLog
+from services.rankings import Rankings
+from services.economy import EconomyTicker
+from services.market import Market
+from services.rate_limiter import RateLimiter
+from services.interactions import InteractionPipeline, respond
+from services.logs import configure_logging, parse_mapping
+from services.metrics import Metrics, MetricsCommandTree, MetricsServer, discord_http_trace, observe_command
+from services.command_sync import CommandSyncState, command_tree_hash
+from services.hot_reload import CogReloader
+import services.queries  # Registers the named statements
 
 # ---------- Environment Setup ----------
 ENV_PATH = os.path.join(os.path.dirname(__file__), '../config/.env')
 load_dotenv(dotenv_path=ENV_PATH)
 
+# ---------- Logging Setup ----------
+# LOG_LEVELS sets per-module levels (e.g. "discord=WARNING,services.database=DEBUG");
+# LOG_SAMPLE keeps a fraction of sub-WARNING records per logger (e.g. "cogs.shoot=0.1")
+LOG_LISTENER = configure_logging(
+    level=os.getenv("LOG_LEVEL", "INFO"),
+    module_levels=parse_mapping(os.getenv("LOG_LEVELS")),
+    json_format=os.getenv("LOG_FORMAT", "text").lower() == "json",
+    sample_rates=parse_mapping(os.getenv("LOG_SAMPLE"), float)
+)
+# Flush queued records on exit, including early exits below
+atexit.register(LOG_LISTENER.stop)
+
 if not Path(ENV_PATH).exists():
-    logging.critical(f"Missing .env file at {ENV_PATH}")
+    logging.critical("Missing .env file at %s", ENV_PATH)
     raise FileNotFoundError("Missing .env file — cannot continue.")
 
 # ---------- Load Environment Variables ----------
@@ -31,6 +58,81 @@ DB_NAME = os.getenv("DB_NAME")
 DB_HOST = os.getenv("DB_HOST", "localhost")  # Default to localhost
 DB_PORT = os.getenv("DB_PORT", "5432")        # Default to 5432
 
+# Pool tuning (asyncpg defaults unless set)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "10"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+DB_ACQUIRE_TIMEOUT = float(os.getenv("DB_ACQUIRE_TIMEOUT", "5"))
+DB_COMMAND_TIMEOUT = float(os.getenv("DB_COMMAND_TIMEOUT")) if os.getenv("DB_COMMAND_TIMEOUT") else None
+DB_MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", "300"))
+DB_MAX_QUERIES = int(os.getenv("DB_MAX_QUERIES", "50000"))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "100"))
+
+# Optional read replica (same credentials and database name) for read-only statements
+DB_REPLICA_HOST = os.getenv("DB_REPLICA_HOST") if os.getenv("DB_REPLICA_HOST", "null").lower() != "null" else None
+DB_REPLICA_PORT = int(os.getenv("DB_REPLICA_PORT", DB_PORT))
+DB_REPLICA_MAX_LAG = float(os.getenv("DB_REPLICA_MAX_LAG", "5"))
+
+# Defaults for guilds without a guild_settings_table row. SHOT_TIMEOUT_IN_HOURS is converted to
+# seconds, as guild settings and /shoot use them.
+DEBUG = os.getenv("DEBUG") == "True"
+SHOT_ROLE = int(os.getenv("SHOT_ROLE")) if os.getenv("SHOT_ROLE", "null").lower() != "null" else None
+SHOT_TIMEOUT_IN_HOURS = float(os.getenv("SHOT_TIMEOUT_IN_HOURS")) if os.getenv("SHOT_TIMEOUT_IN_HOURS", "null").lower() != "null" else 1.0
+SHOT_TIMEOUT = round(SHOT_TIMEOUT_IN_HOURS * 3600)
+SHOOT_COOLDOWN = int(os.getenv("SHOOT_COOLDOWN", "5"))
+REVIVE_COOLDOWN = int(os.getenv("REVIVE_COOLDOWN", "5"))
+
+# Ledger batching: seconds between flushes and between balance snapshots per party
+LEDGER_FLUSH_INTERVAL = float(os.getenv("LEDGER_FLUSH_INTERVAL", "0.25"))
+LEDGER_SNAPSHOT_INTERVAL = float(os.getenv("LEDGER_SNAPSHOT_INTERVAL", "3600"))
+
+# Combat log: seconds between batched writes of shots, vest saves and revives
+COMBAT_LOG_FLUSH_INTERVAL = float(os.getenv("COMBAT_LOG_FLUSH_INTERVAL", "1"))
+
+# Sharding: SHARD_COUNT/SHARD_IDS pick the shards this process runs (see launcher.py)
+AUTO_SHARD = os.getenv("AUTO_SHARD") == "True"
+SHARD_COUNT = int(os.getenv("SHARD_COUNT")) if os.getenv("SHARD_COUNT") else None
+SHARD_IDS = [int(shard_id) for shard_id in os.getenv("SHARD_IDS").split(",")] if os.getenv("SHARD_IDS") else None
+WORKER_ID = int(os.getenv("WORKER_ID", "0"))
+WORKER_COUNT = int(os.getenv("WORKER_COUNT", "1"))
+
+PLAYER_CACHE_SIZE = int(os.getenv("PLAYER_CACHE_SIZE", "10000"))
+PLAYER_CACHE_TTL = float(os.getenv("PLAYER_CACHE_TTL", "300"))
+
+# Low-memory mode for large guilds: setting MEMBER_CACHE_SIZE turns off guild chunking and
+# keeps at most that many members (the ones commands touch), refetched after MEMBER_CACHE_TTL
+MEMBER_CACHE_SIZE = int(os.getenv("MEMBER_CACHE_SIZE")) if os.getenv("MEMBER_CACHE_SIZE") else None
+MEMBER_CACHE_TTL = float(os.getenv("MEMBER_CACHE_TTL", "60"))
+
+# Rate limiting: share cooldown buckets through Postgres (across workers and restarts)
+RATE_LIMIT_SHARED = os.getenv("RATE_LIMIT_SHARED", str(WORKER_COUNT > 1)) == "True"
+# Seconds a shared check may take before a hit falls back to this process's buckets
+RATE_LIMIT_SHARED_TIMEOUT = float(os.getenv("RATE_LIMIT_SHARED_TIMEOUT", "0.5"))
+
+# Prometheus endpoint: unset METRICS_PORT disables it; worker N listens on METRICS_PORT + N
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT")) if os.getenv("METRICS_PORT") else None
+
+# Leaderboards: entries kept per category and seconds between full reloads
+LEADERBOARD_SIZE = int(os.getenv("LEADERBOARD_SIZE", "100"))
+LEADERBOARD_REFRESH_INTERVAL = float(os.getenv("LEADERBOARD_REFRESH_INTERVAL", "300"))
+
+# Economy: seconds between wage, dividend and interest payouts (0 disables them)
+ECONOMY_TICK_INTERVAL = float(os.getenv("ECONOMY_TICK_INTERVAL", "3600"))
+
+# Market: factories produce MARKET_FACTORY_OUTPUT units every MARKET_FACTORY_INTERVAL seconds
+# and list them at MARKET_FACTORY_PRICES (e.g. "guns=50,vest=40,medkit=25")
+MARKET_FACTORY_INTERVAL = float(os.getenv("MARKET_FACTORY_INTERVAL", "600"))
+MARKET_FACTORY_OUTPUT = int(os.getenv("MARKET_FACTORY_OUTPUT", "5"))
+MARKET_FACTORY_PRICES = parse_mapping(os.getenv("MARKET_FACTORY_PRICES", "guns=50,vest=40,medkit=25"), int)
+
+# Deferred commands: bodies running at once, and how many may wait before new ones are turned away
+INTERACTION_WORKERS = int(os.getenv("INTERACTION_WORKERS", str(DB_POOL_MAX_SIZE * 2)))
+INTERACTION_QUEUE_SIZE = int(os.getenv("INTERACTION_QUEUE_SIZE", "500"))
+
+# Hot reload: watch the cog files and reload changed cogs in place, polling every HOT_RELOAD_INTERVAL seconds
+HOT_RELOAD = os.getenv("HOT_RELOAD") == "True"
+HOT_RELOAD_INTERVAL = float(os.getenv("HOT_RELOAD_INTERVAL", "1"))
+
 # ---------- Validation ----------
 missing_keys = {
     "TOKEN": TOKEN,
@@ -43,66 +145,278 @@ missing_keys = {
 
 for key, value in missing_keys.items():
     if not value or value.lower() == "null":
-        logging.critical(f"{key} is missing or set to 'null'. Cannot continue.")
+        logging.critical("%s is missing or set to 'null'. Cannot continue.", key)
         raise EnvironmentError(f"Required environment variable not set or invalid: {key}")
 
+# Discord timeouts last at most 28 days, and a zero timeout would expire deaths at once
+if not 0 < SHOT_TIMEOUT <= 28 * 24 * 3600:
+    logging.critical("SHOT_TIMEOUT_IN_HOURS must be more than 0 and at most 672 (28 days). Cannot continue.")
+    raise EnvironmentError(f"Invalid SHOT_TIMEOUT_IN_HOURS: {SHOT_TIMEOUT_IN_HOURS}")
+
+if SHARD_IDS is not None and SHARD_COUNT is None:
+    logging.critical("SHARD_IDS is set without SHARD_COUNT. Cannot continue.")
+    raise EnvironmentError("SHARD_COUNT is required when SHARD_IDS is set")
+
 # Optional GUILD_ID validation
 if not GUILD_ID or GUILD_ID.lower() == "null":
     logging.warning("GUILD_ID is missing or set to 'null'. This may affect command syncs.")
 else:
     GUILD_ID = int(GUILD_ID)
 
+# Hash of the last synced command tree, so restarts skip unchanged syncs
+COMMAND_SYNC_STATE = CommandSyncState(Path(__file__).resolve().parent.parent / "data" / "command_sync.json")
+
 # ---------- Discord Bot Setup ----------
 intents = discord.Intents.default()
 intents.message_content = True
 intents.members = True
 
-client = commands.Bot(command_prefix="wd!", intents=intents)
+# The members intent stays on either way: joins still register players
+member_cache_options = {}
+if MEMBER_CACHE_SIZE is not None:
+    member_cache_options = {
+        "chunk_guilds_at_startup": False,
+        "member_cache_flags": discord.MemberCacheFlags.none(),
+    }
+
+# Command, database and Discord REST timings for /metrics and /stats
+metrics = Metrics()
+
+if AUTO_SHARD or SHARD_COUNT:
+    client = commands.AutoShardedBot(
+        command_prefix="wd!", intents=intents, shard_count=SHARD_COUNT, shard_ids=SHARD_IDS,
+        tree_cls=MetricsCommandTree, http_trace=discord_http_trace(metrics), **member_cache_options
+    )
+else:
+    client = commands.Bot(
+        command_prefix="wd!", intents=intents,
+        tree_cls=MetricsCommandTree, http_trace=discord_http_trace(metrics), **member_cache_options
+    )
+client.metrics = metrics
+# In full cache mode this only ever falls through to discord.py's own member cache
+client.member_cache = MemberCache(max_size=MEMBER_CACHE_SIZE or 0, ttl=MEMBER_CACHE_TTL)
+
+def owns_guild(guild_id: int) -> bool:
+    """
+    Whether this process runs the shard that receives the guild's events.
+    """
+    if SHARD_IDS is None:
+        return True
+    return (guild_id >> 22) % SHARD_COUNT in SHARD_IDS
 
 # ---------- Database Setup ----------
-async def create_db_pool():
-    return await asyncpg.create_pool(
+def create_database():
+    return Database(
         user=DB_USER,
         password=DB_PASSWORD,
         database=DB_NAME,
         host=DB_HOST,
-        port=int(DB_PORT)
+        port=int(DB_PORT),
+        min_size=DB_POOL_MIN_SIZE,
+        max_size=DB_POOL_MAX_SIZE,
+        acquire_timeout=DB_ACQUIRE_TIMEOUT,
+        command_timeout=DB_COMMAND_TIMEOUT,
+        max_inactive_lifetime=DB_MAX_INACTIVE_LIFETIME,
+        max_queries=DB_MAX_QUERIES,
+        statement_cache_size=DB_STATEMENT_CACHE_SIZE,
+        server_settings=database_server_settings(),
+        registry=metrics,
+        replica_host=DB_REPLICA_HOST,
+        replica_port=DB_REPLICA_PORT,
+        replica_max_lag=DB_REPLICA_MAX_LAG
     )
 
+def database_server_settings():
+    settings = {"application_name": f"wd-bot-{WORKER_ID}"}
+    if WORKER_COUNT > 1:
+        # Other workers cache players too; have players_table updates notify them
+        settings["wd.notify_players"] = "on"
+    return settings
+
+def default_guild_settings():
+    # DEBUG players start fully stocked for testing
+    if DEBUG:
+        guns, vest, medkit, balance = 127, 127, 127, 101010
+    else:
+        guns, vest, medkit, balance = 0, 0, 0, 50
+    return GuildSettings(
+        shot_role_id=SHOT_ROLE,
+        shot_timeout=SHOT_TIMEOUT,
+        shoot_cooldown=SHOOT_COOLDOWN,
+        revive_cooldown=REVIVE_COOLDOWN,
+        start_guns=guns,
+        start_vest=vest,
+        start_medkit=medkit,
+        start_balance=balance
+    )
+
+# ---------- Startup ----------
+@client.event
+async def setup_hook():
+    # Runs once per process, before the gateway connects; reconnects never repeat it
+    logging.info("Starting the database pool")
+    client.db = create_database()
+    # Named statements are written against the latest schema, so it must be current first
+    pending = await pending_migrations(client.db)
+    if pending:
+        logging.critical("Schema migrations %s are pending; run scripts/migrate.py first.", pending)
+        raise RuntimeError("Database schema is out of date.")
+    client.db_pool = await client.db.start()
+    client.notifications = NotificationListener(client.db)
+    client.guild_settings = GuildSettingsCache(client.db, default_guild_settings(), client.notifications)
+    client.player_store = PlayerStore(client, max_size=PLAYER_CACHE_SIZE, ttl=PLAYER_CACHE_TTL)
+    if WORKER_COUNT > 1:
+        client.player_store.listen(client.notifications, origin=f"wd-bot-{WORKER_ID}")
+    await client.notifications.start()
+    await client.guild_settings.reload()
+
+    client.rate_limiter = RateLimiter(
+        client.db if RATE_LIMIT_SHARED else None, shared_timeout=RATE_LIMIT_SHARED_TIMEOUT
+    )
+    await client.rate_limiter.start()
+    client.interactions = InteractionPipeline(INTERACTION_WORKERS, INTERACTION_QUEUE_SIZE, metrics=metrics)
+    await client.interactions.start()
+    client.member_mutations = MemberMutationQueue()
+    client.death_expiry = DeathExpiryScheduler(
+        client,
+        shot_role_id=lambda guild_id: client.guild_settings.get(guild_id).shot_role_id,
+        timeout_seconds=lambda guild_id: client.guild_settings.get(guild_id).shot_timeout,
+        owns_guild=owns_guild
+    )
+    await client.death_expiry.start()
+    client.ledger = Ledger(client, flush_interval=LEDGER_FLUSH_INTERVAL, snapshot_interval=LEDGER_SNAPSHOT_INTERVAL)
+    await client.ledger.start()
+    client.combat_log = CombatLog(client, flush_interval=COMBAT_LOG_FLUSH_INTERVAL)
+    await client.combat_log.start()
+    client.rankings = Rankings(client, size=LEADERBOARD_SIZE, refresh_interval=LEADERBOARD_REFRESH_INTERVAL)
+    await client.rankings.start()
+    # Ticks are checkpointed in Postgres, but one process running them is enough
+    client.economy = EconomyTicker(client, interval=ECONOMY_TICK_INTERVAL)
+    if ECONOMY_TICK_INTERVAL > 0 and WORKER_ID == 0:
+        await client.economy.start()
+    # The order books are in memory, so they can't be split across worker processes
+    client.market = None
+    if WORKER_COUNT == 1:
+        client.market = Market(
+            client,
+            factory_interval=MARKET_FACTORY_INTERVAL,
+            factory_output=MARKET_FACTORY_OUTPUT,
+            factory_prices=MARKET_FACTORY_PRICES
+        )
+        await client.market.start()
+        metrics.collect("wd_market", client.market.stats)
+
+    for prefix, component in (
+        ("wd_db_pool", client.db), ("wd_player_store", client.player_store),
+        ("wd_member_edits", client.member_mutations), ("wd_ledger", client.ledger),
+        ("wd_rate_limiter", client.rate_limiter), ("wd_interactions", client.interactions),
+        ("wd_economy", client.economy), ("wd_member_cache", client.member_cache),
+        ("wd_combat_log", client.combat_log),
+    ):
+        metrics.collect(prefix, component.stats)
+    metrics.collect("wd_death_expiry", lambda: {"pending": client.death_expiry.pending()})
+    if METRICS_PORT is not None:
+        client.metrics_server = MetricsServer(metrics, METRICS_HOST, METRICS_PORT + WORKER_ID)
+        await client.metrics_server.start()
+
+    logging.info("Loading cogs...")
+    await load_cogs()
+    # Every worker runs the same tree; only the first one pushes it to Discord
+    if WORKER_ID == 0:
+        await sync_commands()
+    if HOT_RELOAD:
+        client.cog_reloader = CogReloader(
+            client, COGS_DIR, interval=HOT_RELOAD_INTERVAL,
+            on_commands_changed=sync_commands if WORKER_ID == 0 else None
+        )
+        await client.cog_reloader.start()
+        metrics.collect("wd_hot_reload", client.cog_reloader.stats)
+        logging.info("Hot reload enabled; watching %s", COGS_DIR)
+
 @client.event
 async def on_ready():
-    logging.info(f"Logged in as {client.user}")
+    logging.info("Logged in as %s; bot is ready.", client.user)
+
+@client.event
+async def on_interaction(interaction: discord.Interaction):
+    # The invoking member arrives with the interaction; keep it for role edits later on
+    if isinstance(interaction.user, discord.Member):
+        client.member_cache.remember(interaction.user)
+
+@client.event
+async def on_raw_member_remove(payload: discord.RawMemberRemoveEvent):
+    client.member_cache.forget(payload.guild_id, payload.user.id)
+
+@client.event
+async def on_app_command_completion(interaction: discord.Interaction, command):
+    observe_command(metrics, interaction, "ok")
+
+@client.tree.error
+async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
+    if isinstance(error, app_commands.CommandOnCooldown):
+        observe_command(metrics, interaction, "cooldown")
+        await respond(interaction, f"You're on cooldown! Try again in {error.retry_after:.2f} seconds.", ephemeral=True)
+        return
+    observe_command(metrics, interaction, "error")
+    command = interaction.command.qualified_name if interaction.command else "unknown"
+    logging.error("Unhandled error in /%s: %s", command, error, exc_info=error)
+    # Don't leave a deferred command "thinking" forever
+    try:
+        await respond(interaction, "Something went wrong running that command.", ephemeral=True)
+    except discord.HTTPException:
+        pass
 
+# ---------- Command Sync ----------
+async def sync_commands():
+    """
+    Syncs the command tree only when it differs from what was last pushed to Discord.
+    """
     if client.tree is None:
         logging.warning("client.tree is not initialized.")
         return
 
-    # Clear and sync commands
+    digest = command_tree_hash(client.tree)
+    key = f"{client.application_id}:{GUILD_ID or 'global'}"
+    if COMMAND_SYNC_STATE.is_current(key, digest):
+        logging.info("Command tree unchanged since last sync, skipping sync.")
+        return
+
+    # Clear stale guild commands so they don't shadow the global ones
     if GUILD_ID:
         guild = discord.Object(id=GUILD_ID)
         try:
-            logging.info(f"Clearing commands for guild {GUILD_ID}")
+            logging.info("Clearing commands for guild %s", GUILD_ID)
             client.tree.clear_commands(guild=guild)
             await client.tree.sync(guild=guild)
-            logging.info(f"Commands synced to guild {GUILD_ID}")
+            logging.info("Commands synced to guild %s", GUILD_ID)
         except Exception as e:
-            logging.error(f"Failed to sync commands to guild: {e}")
+            logging.error("Failed to sync commands to guild: %s", e)
+            return
     else:
-        logging.warning("Skipping command sync due to missing GUILD_ID")
-
-    logging.info("Starting the database pool")
-    client.db_pool = await create_db_pool()
+        logging.warning("Skipping guild command sync due to missing GUILD_ID")
 
-    logging.info("Loading cogs...")
-    await load_cogs()
-    await client.tree.sync()
-    logging.info("Bot is ready and commands are synced.")
+    try:
+        await client.tree.sync()
+    except Exception as e:
+        logging.error("Failed to sync global commands: %s", e)
+        return
+    COMMAND_SYNC_STATE.mark(key, digest)
+    logging.info("Commands synced.")
 
 # ---------- Load Cogs ----------
+COGS_DIR = Path(__file__).resolve().parent / "cogs"
+
 async def load_cogs():
-    for filename in os.listdir("./scripts/cogs"):
-        if filename.endswith(".py") and filename != "__init__.py":
-            await client.load_extension(f"cogs.{filename[:-3]}")
+    extensions = [
+        f"cogs.{path.stem}"
+        for path in sorted(COGS_DIR.glob("*.py"))
+        if path.name != "__init__.py"
+    ]
+    results = await asyncio.gather(*(client.load_extension(name) for name in extensions), return_exceptions=True)
+    for name, result in zip(extensions, results):
+        if isinstance(result, Exception):
+            logging.error("Failed to load %s: %s", name, result)
 
 # ---------- Run Bot ----------
-client.run(TOKEN)
+# Logging is already configured; keep discord.py from adding its own synchronous handler
+client.run(TOKEN, log_handler=None)
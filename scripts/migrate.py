@@ -0,0 +1,70 @@
+"""
+Applies the versioned schema migrations in migrations/ to the database in config/.env.
+
+    python3 scripts/migrate.py              # apply everything pending
+    python3 scripts/migrate.py --status     # list applied and pending migrations
+    python3 scripts/migrate.py --target 2   # stop after version 2
+
+Each migration runs once, in its own transaction, and is recorded in schema_migrations.
+"""
+import argparse
+import asyncio
+import logging
+import os
+from pathlib import Path
+
+import asyncpg
+from dotenv import load_dotenv
+
+from services.migrations import MIGRATIONS_DIR, applied, discover, migrate
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='[%(levelname)s] %(asctime)s - %(message)s',
+    datefmt='%Y-%m-%d %H:%M:%S'
+)
+
+ENV_PATH = Path(__file__).resolve().parent.parent / "config" / ".env"
+
+
+async def connect():
+    load_dotenv(dotenv_path=ENV_PATH)
+    return await asyncpg.connect(
+        user=os.getenv("DB_USER"),
+        password=os.getenv("DB_PASSWORD"),
+        database=os.getenv("DB_NAME"),
+        host=os.getenv("DB_HOST", "localhost"),
+        port=int(os.getenv("DB_PORT", "5432")),
+        server_settings={"application_name": "wd-migrate"}
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Apply the schema migrations.")
+    parser.add_argument("--status", action="store_true", help="List migrations without applying any")
+    parser.add_argument("--target", type=int, default=None, help="Highest version to apply")
+    parser.add_argument("--dir", type=Path, default=MIGRATIONS_DIR, help="Migrations directory")
+    args = parser.parse_args()
+
+    conn = await connect()
+    try:
+        if args.status:
+            done = await applied(conn)
+            for migration in discover(args.dir):
+                if migration.version not in done:
+                    state = "pending"
+                elif done[migration.version] != migration.checksum:
+                    state = "applied (file changed since)"
+                else:
+                    state = "applied"
+                print(f"{migration!r:<40} {state}")
+            return
+
+        migrations = await migrate(conn, args.dir, args.target)
+        logging.info("Applied %s migration(s).", len(migrations))
+    finally:
+        await conn.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1 @@
+# services/__init__.py
\ No newline at end of file
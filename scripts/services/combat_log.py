@@ -0,0 +1,187 @@
+import time
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from services.queries import (
+    COMBAT_COUNTERS, COMBAT_EVENT_COLUMNS, COMBAT_PARTITION,
+    COMBAT_TOTALS_ADD, COMBAT_WEEKLY_ADD, COMBAT_RIVALS_ADD,
+    COMBAT_PLAYER_STATS, COMBAT_PLAYER_RIVALS,
+)
+
+logger = logging.getLogger(__name__)
+
+KILL = "kill"
+VEST = "vest"
+REVIVE = "revive"
+
+# kind -> (actor's counter, target's counter)
+COUNTERS = {
+    KILL: ("kills", "deaths"),
+    VEST: ("vests_broken", "vest_saves"),
+    REVIVE: ("revives_given", "revives_received"),
+}
+
+
+def week_of(moment: datetime):
+    """
+    The Monday starting moment's UTC week, as stored in combat_weekly.
+    """
+    day = moment.astimezone(timezone.utc).date()
+    return day - timedelta(days=day.weekday())
+
+
+def month_of(moment: datetime) -> tuple:
+    moment = moment.astimezone(timezone.utc)
+    return moment.year, moment.month
+
+
+class CombatLog:
+    """
+    Batched writer for combat_events and its rollups.
+
+    record() only buffers the event, so commands never wait on it. Every flush_interval
+    seconds (or as soon as max_batch are waiting) a batch is written in one transaction:
+    the events with COPY, then the per-player totals, this week's counters and kills per
+    killer/victim pair as additive upserts. A failed batch is retried on the next flush;
+    while the database stays unreachable, at most max_buffer events are kept and the oldest
+    are dropped. Events are timestamped when recorded, and the month's partition is created
+    before the first event that falls into it is written.
+    """
+
+    def __init__(self, bot, flush_interval: float = 1.0, max_batch: int = 1000, max_buffer: int = 100_000):
+        self.bot = bot
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.max_buffer = max_buffer
+        self._buffer = []  # (occurred_at, guild_id, kind, actor_id, target_id)
+        self._partitions = set()  # (year, month) known to exist
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self.flushed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    async def start(self):
+        now = datetime.now(timezone.utc)
+        await self._ensure_partitions([now, now + timedelta(days=31)])
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        await self.flush()
+
+    def record(self, kind: str, guild_id: int, actor_id: int, target_id: int):
+        """
+        Queues one event: KILL and VEST are shots by actor at target, REVIVE is actor reviving target.
+        """
+        if kind not in COUNTERS:
+            raise ValueError(f"Unknown combat event kind {kind!r}.")
+        self._buffer.append((datetime.now(timezone.utc), guild_id, kind, actor_id, target_id))
+        if len(self._buffer) > self.max_buffer:
+            overflow = len(self._buffer) - self.max_buffer
+            del self._buffer[:overflow]
+            self.dropped += overflow
+            logger.warning("Combat log buffer full; dropped the %s oldest event(s).", overflow)
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Combat log flush failed: %s", e)
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._buffer:
+                batch, self._buffer = self._buffer[:self.max_batch], self._buffer[self.max_batch:]
+                try:
+                    await self._flush_batch(batch)
+                except Exception:
+                    # Nothing was committed; retry the batch ahead of anything recorded since
+                    self._buffer = batch + self._buffer
+                    raise
+
+    async def _ensure_partitions(self, moments: list):
+        for moment in moments:
+            month = month_of(moment)
+            if month not in self._partitions:
+                await self.bot.db.fetchval(COMBAT_PARTITION, moment)
+                self._partitions.add(month)
+
+    async def _flush_batch(self, batch: list):
+        started = time.perf_counter()
+        # Partitions are created outside the batch's transaction: the DDL locks the parent table
+        await self._ensure_partitions([event[0] for event in batch])
+
+        totals = {}  # player_id -> [counters..., last event]
+        weekly = {}  # (player_id, week) -> [counters...]
+        rivals = {}  # (killer_id, victim_id) -> kills
+        for occurred_at, _, kind, actor_id, target_id in batch:
+            week = week_of(occurred_at)
+            for player_id, counter in zip((actor_id, target_id), COUNTERS[kind]):
+                index = COMBAT_COUNTERS.index(counter)
+                total = totals.setdefault(player_id, [0] * len(COMBAT_COUNTERS) + [occurred_at])
+                total[index] += 1
+                total[-1] = max(total[-1], occurred_at)
+                weekly.setdefault((player_id, week), [0] * len(COMBAT_COUNTERS))[index] += 1
+            if kind == KILL:
+                rivals[(actor_id, target_id)] = rivals.get((actor_id, target_id), 0) + 1
+
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                await conn.copy_records_to_table("combat_events", records=batch, columns=COMBAT_EVENT_COLUMNS)
+                keys = sorted(totals)
+                await self.bot.db.execute(
+                    COMBAT_TOTALS_ADD, keys, *map(list, zip(*(totals[key] for key in keys))), conn=conn
+                )
+                keys = sorted(weekly)
+                await self.bot.db.execute(
+                    COMBAT_WEEKLY_ADD, *map(list, zip(*(key + tuple(weekly[key]) for key in keys))), conn=conn
+                )
+                if rivals:
+                    keys = sorted(rivals)
+                    await self.bot.db.execute(
+                        COMBAT_RIVALS_ADD, [killer for killer, _ in keys], [victim for _, victim in keys],
+                        [rivals[key] for key in keys], conn=conn
+                    )
+
+        self.flushed += len(batch)
+        self.batches += 1
+        self.bot.db.metrics.record_query("combat_log.flush", time.perf_counter() - started)
+
+    # ---------- Reads ----------
+    async def player_stats(self, player_id: int) -> dict:
+        """
+        Returns the player's counters ({counter: n} all time, "week": {counter: n} this UTC
+        week), "last_event_at", and their top "victim" and "nemesis" as (player_id, kills) or None.
+        Read from the replica when it's fresh; events still buffered aren't included.
+        """
+        row = await self.bot.db.fetchrow(
+            COMBAT_PLAYER_STATS, player_id, week_of(datetime.now(timezone.utc)),
+            replica=True, session=(player_id,)
+        )
+        rivals = await self.bot.db.fetch(COMBAT_PLAYER_RIVALS, player_id, replica=True, session=(player_id,))
+        stats = {counter: row[counter] for counter in COMBAT_COUNTERS}
+        stats["week"] = {counter: row[f"week_{counter}"] for counter in COMBAT_COUNTERS}
+        stats["last_event_at"] = row["last_event_at"]
+        stats["victim"] = stats["nemesis"] = None
+        for rival in rivals:
+            stats[rival["side"]] = (rival["other_id"], rival["kills"])
+        return stats
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "flushed": self.flushed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
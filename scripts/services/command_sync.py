@@ -0,0 +1,52 @@
+import json
+import hashlib
+import logging
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+def command_payload(tree, guild=None) -> list:
+    """
+    Returns the JSON payload Discord would receive for the tree's commands, in a stable order.
+    """
+    payload = []
+    for command in tree.get_commands(guild=guild):
+        try:
+            payload.append(command.to_dict(tree))  # discord.py >= 2.4
+        except TypeError:
+            payload.append(command.to_dict())
+    payload.sort(key=lambda data: (data.get("type", 1), data["name"]))
+    return payload
+
+
+def command_tree_hash(tree, guild=None) -> str:
+    encoded = json.dumps(command_payload(tree, guild), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+class CommandSyncState:
+    """
+    Remembers the hash of the last command tree pushed to Discord so unchanged trees aren't re-synced.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+
+    def load(self) -> dict:
+        try:
+            return json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save(self, state: dict):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.path.write_text(json.dumps(state))
+
+    def is_current(self, key: str, digest: str) -> bool:
+        return self.load().get(key) == digest
+
+    def mark(self, key: str, digest: str):
+        state = self.load()
+        state[key] = digest
+        self.save(state)
@@ -0,0 +1,300 @@
+import time
+import asyncio
+import logging
+from collections import defaultdict
+from contextlib import asynccontextmanager
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+# Named statement registry: name -> SQL. Populated by services/queries.py.
+STATEMENTS = {}
+# Statements that only read, and so may run on the read replica
+READ_ONLY_STATEMENTS = set()
+
+# Seconds the replica is behind; 0 when it has replayed everything it received (or isn't a standby)
+REPLICA_LAG = """
+    SELECT COALESCE(CASE
+        WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+        ELSE EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp())
+    END, 0)::float8
+"""
+
+# Errors that mean the replica itself is unreachable, rather than the query failing
+REPLICA_UNAVAILABLE = (OSError, asyncio.TimeoutError, asyncpg.PostgresConnectionError, asyncpg.InterfaceError)
+
+
+def register_statement(name: str, sql: str, read_only: bool = False) -> str:
+    """
+    Registers a named statement; asyncpg's per-connection statement cache keeps it prepared.
+    Returns the name, so modules can keep it as a constant.
+    """
+    if name in STATEMENTS and STATEMENTS[name] != sql:
+        raise ValueError(f"Statement {name!r} is already registered with different SQL.")
+    STATEMENTS[name] = sql
+    if read_only:
+        READ_ONLY_STATEMENTS.add(name)
+    return name
+
+
+class PoolMetrics:
+    """
+    Counters for pool acquisition and per-statement timings. With a Metrics registry,
+    every acquire wait and statement time also goes into its histograms.
+    """
+
+    def __init__(self, registry=None):
+        self.registry = registry
+        self.acquires = 0
+        self.acquire_wait_total = 0.0
+        self.acquire_wait_max = 0.0
+        self.acquire_timeouts = 0
+        self.query_count = defaultdict(int)
+        self.query_time = defaultdict(float)
+        self.query_errors = defaultdict(int)
+
+    def record_acquire(self, waited: float):
+        self.acquires += 1
+        self.acquire_wait_total += waited
+        self.acquire_wait_max = max(self.acquire_wait_max, waited)
+        if self.registry is not None:
+            self.registry.observe("wd_db_pool_acquire_seconds", waited, help="Time waited for a pool connection")
+
+    def record_query(self, name: str, elapsed: float, failed: bool = False):
+        self.query_count[name] += 1
+        self.query_time[name] += elapsed
+        if failed:
+            self.query_errors[name] += 1
+        if self.registry is not None:
+            self.registry.observe("wd_db_query_seconds", elapsed, help="Named statement execution time",
+                                  statement=name)
+            if failed:
+                self.registry.inc("wd_db_query_errors_total", help="Named statements that raised", statement=name)
+
+
+class Database:
+    """
+    Configured asyncpg pool plus the named statement registry and pool metrics.
+
+    With replica_host set, a second pool on that (read-only) server runs read-only
+    statements called with replica=True. Reads fall back to the primary while the
+    replica is unreachable or more than replica_max_lag seconds behind, and for any
+    `session` key (a player ID) written within that window, so a player always
+    reads their own writes.
+    """
+
+    def __init__(self, *, user, password, database, host, port,
+                 min_size: int = 10, max_size: int = 10,
+                 acquire_timeout: float = 5.0, command_timeout: float = None,
+                 max_inactive_lifetime: float = 300.0, max_queries: int = 50000,
+                 statement_cache_size: int = 100, server_settings: dict = None, registry=None,
+                 replica_host: str = None, replica_port=None, replica_max_lag: float = 5.0,
+                 replica_check_interval: float = 1.0):
+        self.connect_kwargs = {
+            "user": user,
+            "password": password,
+            "database": database,
+            "host": host,
+            "port": int(port),
+            "server_settings": server_settings or {},
+        }
+        self.min_size = min_size
+        self.max_size = max_size
+        self.acquire_timeout = acquire_timeout
+        self.command_timeout = command_timeout
+        self.max_inactive_lifetime = max_inactive_lifetime
+        self.max_queries = max_queries
+        self.statement_cache_size = statement_cache_size
+        self.metrics = PoolMetrics(registry)
+        self.pool = None
+
+        self.replica_kwargs = None
+        if replica_host:
+            self.replica_kwargs = dict(self.connect_kwargs, host=replica_host, port=int(replica_port or port))
+        self.replica_max_lag = replica_max_lag
+        self.replica_check_interval = replica_check_interval
+        self.replica_pool = None
+        self.replica_lag = None  # None while unknown or unreachable
+        self.replica_reads = 0
+        self.primary_reads = 0
+        self._written = {}  # session key -> monotonic time of its last write
+        self._replica_task = None
+
+    async def _create_pool(self, connect_kwargs: dict):
+        # PreparedStatement objects die with each pool release, so statements run by SQL
+        # text and the connection's statement cache reuses the server-side prepare
+        return await asyncpg.create_pool(
+            **connect_kwargs,
+            min_size=self.min_size,
+            max_size=self.max_size,
+            max_queries=self.max_queries,
+            max_inactive_connection_lifetime=self.max_inactive_lifetime,
+            command_timeout=self.command_timeout,
+            statement_cache_size=self.statement_cache_size,
+        )
+
+    async def start(self):
+        self.pool = await self._create_pool(self.connect_kwargs)
+        logger.info(
+            "Database pool started (min=%d, max=%d, %d named statements)",
+            self.min_size, self.max_size, len(STATEMENTS)
+        )
+        if self.replica_kwargs:
+            self.replica_pool = await self._create_pool(self.replica_kwargs)
+            self._replica_task = asyncio.create_task(self._watch_replica())
+            logger.info(
+                "Read replica pool started on %s:%s (%d read-only statements)",
+                self.replica_kwargs["host"], self.replica_kwargs["port"], len(READ_ONLY_STATEMENTS)
+            )
+        return self.pool
+
+    async def close(self):
+        if self._replica_task is not None:
+            self._replica_task.cancel()
+        if self.replica_pool is not None:
+            await self.replica_pool.close()
+        if self.pool is not None:
+            await self.pool.close()
+
+    @asynccontextmanager
+    async def acquire(self, replica: bool = False):
+        pool = self.replica_pool if replica else self.pool
+        started = time.perf_counter()
+        try:
+            conn = await pool.acquire(timeout=self.acquire_timeout)
+        except asyncio.TimeoutError:
+            self.metrics.acquire_timeouts += 1
+            if self.metrics.registry is not None:
+                self.metrics.registry.inc("wd_db_pool_acquire_timeouts_total", help="Pool acquires that timed out")
+            logger.warning("Timed out waiting %.1fs for a database connection", self.acquire_timeout)
+            raise
+        self.metrics.record_acquire(time.perf_counter() - started)
+        try:
+            yield conn
+        finally:
+            await pool.release(conn)
+
+    # ---------- Read replica ----------
+    @property
+    def _fresh_window(self) -> float:
+        # Lag is sampled, so allow one check interval on top of the largest lag tolerated
+        return self.replica_max_lag + self.replica_check_interval
+
+    def note_write(self, *keys):
+        """
+        Records that the session keys (player IDs) were just written, so their reads stay
+        on the primary until the replica must have caught up.
+        """
+        now = time.monotonic()
+        for key in keys:
+            self._written[key] = now
+
+    def written_since(self, key, since: float) -> bool:
+        written = self._written.get(key)
+        return written is not None and written >= since
+
+    def _use_replica(self, session) -> bool:
+        if self.replica_pool is None or self.replica_lag is None or self.replica_lag > self.replica_max_lag:
+            return False
+        cutoff = time.monotonic() - self._fresh_window
+        for key in session:
+            written = self._written.get(key)
+            if written is not None and written > cutoff:
+                return False
+        return True
+
+    async def _watch_replica(self):
+        while True:
+            try:
+                async with self.replica_pool.acquire(timeout=self.acquire_timeout) as conn:
+                    lag = await conn.fetchval(REPLICA_LAG)
+                if self.replica_lag is None or (lag > self.replica_max_lag) != (self.replica_lag > self.replica_max_lag):
+                    logger.info("Read replica is %.1fs behind", lag)
+                self.replica_lag = lag
+            except Exception as e:
+                if self.replica_lag is not None:
+                    logger.warning("Read replica unavailable, reading from the primary: %s", e)
+                self.replica_lag = None
+
+            cutoff = time.monotonic() - self._fresh_window
+            self._written = {key: written for key, written in self._written.items() if written > cutoff}
+            await asyncio.sleep(self.replica_check_interval)
+
+    # ---------- Named statements ----------
+    async def _run(self, method: str, name: str, args, conn):
+        if conn is None:
+            async with self.acquire() as conn:
+                return await self._run(method, name, args, conn)
+
+        sql = STATEMENTS[name]
+        started = time.perf_counter()
+        failed = False
+        try:
+            return await getattr(conn, method)(sql, *args)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self.metrics.record_query(name, time.perf_counter() - started, failed)
+
+    async def _read(self, method: str, name: str, args, session):
+        """
+        Runs a read-only statement on the replica when it's fresh enough for the session,
+        otherwise (or if the replica turns out to be unreachable) on the primary.
+        """
+        if name not in READ_ONLY_STATEMENTS:
+            raise ValueError(f"Statement {name!r} isn't registered as read-only.")
+        if self._use_replica(session):
+            try:
+                async with self.acquire(replica=True) as conn:
+                    result = await self._run(method, name, args, conn)
+                self.replica_reads += 1
+                return result
+            except REPLICA_UNAVAILABLE as e:
+                logger.warning("Read replica failed, reading %s from the primary: %s", name, e)
+                self.replica_lag = None
+        self.primary_reads += 1
+        return await self._run(method, name, args, None)
+
+    async def fetch(self, name: str, *args, conn=None, replica: bool = False, session=()):
+        if replica and conn is None:
+            return await self._read("fetch", name, args, session)
+        return await self._run("fetch", name, args, conn)
+
+    async def fetchrow(self, name: str, *args, conn=None, replica: bool = False, session=()):
+        if replica and conn is None:
+            return await self._read("fetchrow", name, args, session)
+        return await self._run("fetchrow", name, args, conn)
+
+    async def fetchval(self, name: str, *args, conn=None, replica: bool = False, session=()):
+        if replica and conn is None:
+            return await self._read("fetchval", name, args, session)
+        return await self._run("fetchval", name, args, conn)
+
+    async def execute(self, name: str, *args, conn=None) -> str:
+        return await self._run("execute", name, args, conn)
+
+    def stats(self) -> dict:
+        metrics = self.metrics
+        size = self.pool.get_size() if self.pool else 0
+        idle = self.pool.get_idle_size() if self.pool else 0
+        return {
+            "size": size,
+            "in_use": size - idle,
+            "max_size": self.max_size,
+            "acquires": metrics.acquires,
+            "acquire_wait_avg": metrics.acquire_wait_total / metrics.acquires if metrics.acquires else 0.0,
+            "acquire_wait_max": metrics.acquire_wait_max,
+            "acquire_timeouts": metrics.acquire_timeouts,
+            "replica_lag": self.replica_lag if self.replica_lag is not None else -1.0,
+            "replica_reads": self.replica_reads,
+            "primary_reads": self.primary_reads,
+            "queries": {
+                name: {
+                    "count": count,
+                    "avg": metrics.query_time[name] / count,
+                    "errors": metrics.query_errors[name],
+                }
+                for name, count in metrics.query_count.items()
+            },
+        }
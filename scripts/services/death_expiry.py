@@ -0,0 +1,123 @@
+import heapq
+import time
+import asyncio
+import logging
+import discord
+from services.queries import DEATHS_PENDING, DEATHS_EXPIRE
+
+logger = logging.getLogger(__name__)
+
+
+class DeathExpiryScheduler:
+    """
+    Removes the shot role when a death's timeout ends.
+
+    Pending deaths live in a single min-heap ordered by expiry time, driven by one
+    background task that sleeps until the earliest expiry (or until an earlier one is
+    scheduled). Deaths are per guild, since the shot role is: a player can be dead in
+    several guilds at once, each with its own expiry. Revived or re-killed players are
+    dropped lazily: a popped entry only fires if it still matches the player's current
+    death in that guild. On startup the heap is rebuilt from player_deaths.
+
+    With several processes, each one only tracks deaths in the guilds its shards own.
+    """
+
+    def __init__(self, bot, shot_role_id, timeout_seconds, owns_guild=None, batch_size: int = 500):
+        self.bot = bot
+        self.owns_guild = owns_guild or (lambda guild_id: True)  # callable(guild_id) -> bool
+        self.shot_role_id = shot_role_id  # callable(guild_id) -> role id
+        self.timeout_seconds = timeout_seconds  # callable(guild_id) -> seconds
+        self.batch_size = batch_size
+        self._heap = []
+        self._deaths = {}  # (guild_id, player_id) -> died_at of the current death
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.expired = 0
+
+    async def start(self):
+        rows = await self.bot.db.fetch(DEATHS_PENDING)
+        for row in rows:
+            if self.owns_guild(row["guild_id"]):
+                self.schedule(row["player_id"], row["guild_id"], row["died_at"])
+        logger.info("Death expiry scheduler rebuilt with %s pending death(s).", self.pending())
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+
+    def schedule(self, player_id: int, guild_id: int, died_at):
+        expires_at = died_at.timestamp() + self.timeout_seconds(guild_id)
+        self._deaths[(guild_id, player_id)] = died_at
+        if not self._heap or expires_at < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (expires_at, guild_id, player_id, died_at))
+
+    def cancel(self, player_id: int, guild_id: int):
+        # The heap entry stays behind and is skipped when it comes due
+        self._deaths.pop((guild_id, player_id), None)
+
+    def pending(self) -> int:
+        return len(self._deaths)
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            delay = self._heap[0][0] - time.time() if self._heap else None
+            if delay is None or delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            due = []
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                _, guild_id, player_id, died_at = heapq.heappop(self._heap)
+                if self._deaths.get((guild_id, player_id)) == died_at:
+                    del self._deaths[(guild_id, player_id)]
+                    due.append((guild_id, player_id, died_at))
+
+            if due:
+                try:
+                    await self._expire(due)
+                except Exception as e:
+                    logger.exception("Failed to expire %s death(s): %s", len(due), e)
+
+    async def _expire(self, due: list):
+        rows = await self.bot.db.fetch(
+            DEATHS_EXPIRE,
+            [guild_id for guild_id, _, _ in due],
+            [player_id for _, player_id, _ in due],
+            [died_at for _, _, died_at in due]
+        )
+        cleared = {(row["guild_id"], row["player_id"]) for row in rows}
+        self.expired += len(cleared)
+
+        for guild_id, player_id, _ in due:
+            if (guild_id, player_id) in cleared:
+                await self._remove_role(guild_id, player_id)
+
+    async def _remove_role(self, guild_id: int, member_id: int):
+        guild = self.bot.get_guild(guild_id)
+        if guild is None:
+            return
+        role = guild.get_role(self.shot_role_id(guild_id))
+        if role is None:
+            return
+
+        try:
+            member = await self.bot.member_cache.fetch(guild, member_id)
+        except discord.NotFound:
+            return
+
+        if any(r.id == role.id for r in member.roles):
+            # Don't hold up the expiry loop on the edit; the queue logs failures itself
+            future = self.bot.member_mutations.submit(member, remove_roles=[role], reason="Death expired")
+            future.add_done_callback(_ignore_result)
+
+
+def _ignore_result(future: asyncio.Future):
+    if not future.cancelled():
+        future.exception()
@@ -0,0 +1,117 @@
+import time
+import asyncio
+import logging
+from services.ledger import PLAYER, COMPANY, BUILDING
+from services.queries import (
+    ECONOMY_WAGES, ECONOMY_DIVIDENDS, ECONOMY_INTEREST,
+    ECONOMY_TICK_START, ECONOMY_TICK_FINISH, ECONOMY_TICK_FINISHED, ECONOMY_TICKS_UNFINISHED,
+    ECONOMY_STEP_CLAIM, ECONOMY_STEP_RECORD,
+)
+
+logger = logging.getLogger(__name__)
+
+
+class EconomyTicker:
+    """
+    Pays wages, dividends and bank interest once per tick.
+
+    Each step is a single set-based statement over every employee, shareholder or bank,
+    run in its own transaction together with its economy_tick_steps checkpoint and the
+    ledger's record of the payments. A step
+    that already has a checkpoint is skipped, so re-running a tick (after a crash, or
+    from a second process) never pays twice; ticks left unfinished are resumed on the
+    next run. Ticks missed while no process was running are not paid retroactively.
+    """
+
+    def __init__(self, bot, interval: float = 3600.0, retry_delay: float = 60.0):
+        self.bot = bot
+        self.interval = interval
+        self.retry_delay = retry_delay
+        # (step, statement, arguments, payer type, payee type, transfer type)
+        self.steps = (
+            ("wages", ECONOMY_WAGES, (), BUILDING, PLAYER, "wage"),
+            ("dividends", ECONOMY_DIVIDENDS, (), COMPANY, PLAYER, "dividend"),
+            ("interest", ECONOMY_INTEREST, (interval / 86400,), PLAYER, BUILDING, "interest"),
+        )
+        self._task = None
+        self.ticks = 0
+        self.last_tick = {}
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            tick_id = int(time.time() // self.interval)
+            try:
+                for row in await self.bot.db.fetch(ECONOMY_TICKS_UNFINISHED, tick_id):
+                    logger.warning("Resuming unfinished economy tick %s", row["tick_id"])
+                    await self.run_tick(row["tick_id"])
+                if not await self.bot.db.fetchval(ECONOMY_TICK_FINISHED, tick_id):
+                    await self.run_tick(tick_id)
+            except Exception as e:
+                logger.exception("Economy tick %s failed: %s", tick_id, e)
+                await asyncio.sleep(self.retry_delay)
+                continue
+            await asyncio.sleep(max((tick_id + 1) * self.interval - time.time(), 0))
+
+    async def run_tick(self, tick_id: int) -> dict:
+        """
+        Runs every step of the tick that hasn't run yet. Returns
+        {step: (payments, amount, seconds)} for the steps it ran.
+        """
+        started = time.perf_counter()
+        await self.bot.db.execute(ECONOMY_TICK_START, tick_id)
+
+        results = {}
+        memo = f"economy tick {tick_id}"
+        for step, statement, args, payer, payee, transfer_type in self.steps:
+            step_started = time.perf_counter()
+            async with self.bot.db.acquire() as conn:
+                async with conn.transaction():
+                    if await self.bot.db.fetchval(ECONOMY_STEP_CLAIM, tick_id, step, conn=conn) is None:
+                        continue
+                    rows = await self.bot.db.fetch(statement, *args, conn=conn)
+                    await self.bot.ledger.record(conn, [
+                        ((payer, row["payer"]), (payee, row["payee"]), row["amount"], transfer_type, memo)
+                        for row in rows
+                    ])
+                    payments = len(rows)
+                    amount = sum(row["amount"] for row in rows)
+                    elapsed = time.perf_counter() - step_started
+                    await self.bot.db.execute(
+                        ECONOMY_STEP_RECORD, tick_id, step, payments, amount, elapsed * 1000, conn=conn
+                    )
+            # Only committed balances reach the cache
+            self.bot.player_store.refresh(rows)
+            results[step] = (payments, amount, elapsed)
+
+        await self.bot.db.execute(ECONOMY_TICK_FINISH, tick_id)
+        elapsed = time.perf_counter() - started
+        self.bot.db.metrics.record_query("economy.tick", elapsed)
+        if results:
+            self.ticks += 1
+            self.last_tick = {"tick_id": tick_id, "seconds": elapsed, "steps": results}
+            logger.info(
+                "Economy tick %s paid %s in %.1fms",
+                tick_id,
+                ", ".join(
+                    f"{step} {payments}x ${amount} ({seconds * 1000:.1f}ms)"
+                    for step, (payments, amount, seconds) in results.items()
+                ),
+                elapsed * 1000,
+                extra={"event": "economy_tick", "tick_id": tick_id, "duration_ms": round(elapsed * 1000, 1)}
+            )
+        return results
+
+    def stats(self) -> dict:
+        steps = self.last_tick.get("steps", {})
+        return {
+            "ticks": self.ticks,
+            "last_tick_seconds": self.last_tick.get("seconds", 0.0),
+            "last_tick_payments": sum(payments for payments, _, _ in steps.values()),
+        }
@@ -0,0 +1,106 @@
+import asyncio
+import logging
+from services.queries import GUILD_SETTINGS_ALL, GUILD_SETTINGS_ONE, GUILD_SETTINGS_UPSERT
+
+logger = logging.getLogger(__name__)
+
+NOTIFY_CHANNEL = "guild_settings_changed"
+
+# guild_settings_table column -> GuildSettings attribute
+COLUMN_FIELDS = {
+    "shot_role_id": "shot_role_id",
+    "shot_timeout_seconds": "shot_timeout",
+    "shoot_cooldown_seconds": "shoot_cooldown",
+    "revive_cooldown_seconds": "revive_cooldown",
+    "start_guns": "start_guns",
+    "start_vest": "start_vest",
+    "start_medkit": "start_medkit",
+    "start_balance": "start_balance",
+}
+
+
+class GuildSettings:
+    """
+    Effective settings for one guild. Timeouts and cooldowns are in seconds.
+    """
+
+    __slots__ = tuple(COLUMN_FIELDS.values())
+
+    def __init__(self, shot_role_id=None, shot_timeout=3600, shoot_cooldown=5, revive_cooldown=5,
+                 start_guns=0, start_vest=0, start_medkit=0, start_balance=50):
+        self.shot_role_id = shot_role_id
+        self.shot_timeout = shot_timeout
+        self.shoot_cooldown = shoot_cooldown
+        self.revive_cooldown = revive_cooldown
+        self.start_guns = start_guns
+        self.start_vest = start_vest
+        self.start_medkit = start_medkit
+        self.start_balance = start_balance
+
+    def merged(self, row) -> "GuildSettings":
+        """
+        Returns a copy with every non-NULL column of the row applied on top.
+        """
+        settings = GuildSettings(**{field: getattr(self, field) for field in self.__slots__})
+        for column, field in COLUMN_FIELDS.items():
+            if row[column] is not None:
+                setattr(settings, field, row[column])
+        return settings
+
+    def starting_loadout(self):
+        return self.start_guns, self.start_vest, self.start_medkit, self.start_balance
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+
+class GuildSettingsCache:
+    """
+    In-memory view of guild_settings_table layered over the .env defaults.
+
+    Every row is loaded at startup and kept current through the table's NOTIFY
+    trigger, so commands read settings with a dict lookup and no database access.
+    """
+
+    def __init__(self, db, defaults: GuildSettings, listener):
+        self.db = db
+        self.defaults = defaults
+        self._settings = {}
+        self._refreshes = set()  # Refresh tasks in flight, referenced so they aren't collected
+        listener.subscribe(NOTIFY_CHANNEL, self._on_notify, on_reconnect=self.reload)
+
+    async def reload(self):
+        rows = await self.db.fetch(GUILD_SETTINGS_ALL)
+        self._settings = {row["guild_id"]: self.defaults.merged(row) for row in rows}
+        logger.info("Loaded settings for %s guild(s).", len(rows))
+
+    def get(self, guild_id) -> GuildSettings:
+        if guild_id is None:
+            return self.defaults
+        return self._settings.get(guild_id, self.defaults)
+
+    async def update(self, guild_id: int, **fields) -> GuildSettings:
+        """
+        Stores the given settings (attribute names of GuildSettings) for the guild.
+        Other processes pick the change up through NOTIFY.
+        """
+        values = [fields.get(field) for field in COLUMN_FIELDS.values()]
+        row = await self.db.fetchrow(GUILD_SETTINGS_UPSERT, guild_id, *values)
+        self._settings[guild_id] = self.defaults.merged(row)
+        return self._settings[guild_id]
+
+    def _on_notify(self, payload: str):
+        task = asyncio.create_task(self._refresh(int(payload)))
+        self._refreshes.add(task)
+        task.add_done_callback(self._refreshes.discard)
+
+    async def _refresh(self, guild_id: int):
+        try:
+            row = await self.db.fetchrow(GUILD_SETTINGS_ONE, guild_id)
+        except Exception as e:
+            logger.error("Failed to refresh settings for guild %s: %s", guild_id, e)
+            return
+        if row is None:
+            self._settings.pop(guild_id, None)
+        else:
+            self._settings[guild_id] = self.defaults.merged(row)
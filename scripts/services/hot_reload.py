@@ -0,0 +1,114 @@
+import asyncio
+import logging
+from pathlib import Path
+from discord.ext import commands
+from services.command_sync import command_tree_hash
+
+logger = logging.getLogger(__name__)
+
+
+class CogReloader:
+    """
+    Reloads cogs whose source file changed, without restarting the bot (HOT_RELOAD).
+
+    Every interval seconds the cog files' modification times are compared with the ones
+    last loaded; a file is reloaded once its time has held still for one poll, so a
+    half-written save isn't picked up. Only cog modules are reloaded. Runtime state
+    (player cache, rate limit buckets keyed by command name, death expiry, ledger, ...)
+    lives in the bot's services, which stay in place, so a reload only swaps command code.
+    reload_extension keeps the old version if the new one fails to import or set up, and
+    commands already running finish on the code they started with. on_commands_changed
+    is awaited only when a reload changed the command payload Discord sees.
+    """
+
+    def __init__(self, bot, directory: Path, package: str = "cogs", interval: float = 1.0,
+                 on_commands_changed=None):
+        self.bot = bot
+        self.directory = Path(directory)
+        self.package = package
+        self.interval = interval
+        self.on_commands_changed = on_commands_changed
+        self._loaded = {}  # extension -> mtime it was loaded at
+        self._seen = {}  # extension -> mtime at the previous poll
+        self._task = None
+        self.reloads = 0
+        self.failures = 0
+        self.syncs = 0
+
+    async def start(self):
+        self._loaded = self._scan()
+        self._seen = dict(self._loaded)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+
+    def _scan(self) -> dict:
+        return {
+            f"{self.package}.{path.stem}": path.stat().st_mtime_ns
+            for path in self.directory.glob("*.py")
+            if path.name != "__init__.py"
+        }
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception as e:
+                logger.exception("Hot reload check failed: %s", e)
+
+    async def check(self) -> list:
+        """
+        Reloads (or loads) every cog whose file changed and has settled, and unloads cogs
+        whose file was removed. Returns the extensions reloaded.
+        """
+        current = self._scan()
+        changed = sorted(
+            name for name, mtime in current.items()
+            if mtime != self._loaded.get(name) and mtime == self._seen.get(name)
+        )
+        removed = sorted(name for name in self._loaded if name not in current)
+        self._seen = current
+        if not changed and not removed:
+            return []
+
+        before = command_tree_hash(self.bot.tree)
+        reloaded = []
+        for name in changed:
+            # Recorded even on failure, so a broken file is retried only once it's saved again
+            self._loaded[name] = current[name]
+            try:
+                if name in self.bot.extensions:
+                    await self.bot.reload_extension(name)
+                else:
+                    await self.bot.load_extension(name)
+            except commands.ExtensionError as e:
+                self.failures += 1
+                logger.error("Hot reload of %s failed; the loaded version stays in place: %s", name, e)
+                continue
+            reloaded.append(name)
+        for name in removed:
+            del self._loaded[name]
+            if name in self.bot.extensions:
+                await self.bot.unload_extension(name)
+                logger.info("Unloaded %s; its file was removed.", name)
+
+        self.reloads += len(reloaded)
+        if reloaded:
+            logger.info("Hot reloaded %s", ", ".join(reloaded), extra={"event": "hot_reload"})
+
+        if command_tree_hash(self.bot.tree) != before:
+            logger.info("Command signatures changed on reload.")
+            if self.on_commands_changed is not None:
+                self.syncs += 1
+                await self.on_commands_changed()
+        return reloaded
+
+    def stats(self) -> dict:
+        return {
+            "reloads": self.reloads,
+            "failures": self.failures,
+            "syncs": self.syncs,
+        }
@@ -0,0 +1,145 @@
+import time
+import asyncio
+import logging
+import functools
+import discord
+
+logger = logging.getLogger(__name__)
+
+BUSY_MESSAGE = "The bot is busy right now, please try again in a moment."
+
+
+class PipelineBusy(Exception):
+    pass
+
+
+class InteractionPipeline:
+    """
+    Bounded worker pool for command bodies.
+
+    Commands decorated with deferred() acknowledge the interaction first and then run
+    here, so the 3-second acknowledgement window never depends on Postgres or Discord's
+    REST latency. At most `workers` bodies run at once and at most `max_queue` wait;
+    beyond that new commands are turned away instead of piling up.
+    """
+
+    def __init__(self, workers: int = 32, max_queue: int = 1000, job_timeout: float = 120.0, metrics=None):
+        self.workers = workers
+        self.job_timeout = job_timeout
+        self.metrics = metrics
+        self._queue = asyncio.Queue(maxsize=max_queue)
+        self._tasks = []
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+
+    def saturated(self) -> bool:
+        return self._queue.full()
+
+    async def run(self, coro):
+        """
+        Queues the coroutine and waits for its result. Raises PipelineBusy if the queue is full.
+        """
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((coro, future, time.perf_counter()))
+        except asyncio.QueueFull:
+            coro.close()
+            self.rejected += 1
+            raise PipelineBusy()
+        return await future
+
+    async def _worker(self):
+        while True:
+            coro, future, queued_at = await self._queue.get()
+            if self.metrics is not None:
+                self.metrics.observe("wd_interaction_queue_seconds", time.perf_counter() - queued_at,
+                                     help="Time deferred commands waited for a worker")
+            if future.cancelled():
+                coro.close()
+                continue
+            try:
+                result = await asyncio.wait_for(coro, timeout=self.job_timeout)
+            except Exception as e:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+            else:
+                self.completed += 1
+                if not future.done():
+                    future.set_result(result)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "queued": self._queue.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "rejected": self.rejected,
+        }
+
+
+def deferred(ephemeral: bool = False):
+    """
+    Command decorator: defers the interaction as soon as it arrives, then runs the command
+    body on bot.interactions. Place it directly under @app_commands.command. The body
+    answers through respond(), which fills in the deferred "thinking" message.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, interaction: discord.Interaction, *args, **kwargs):
+            pipeline = interaction.client.interactions
+            if pipeline.saturated():
+                pipeline.rejected += 1
+                await interaction.response.send_message(BUSY_MESSAGE, ephemeral=True)
+                return
+
+            try:
+                await interaction.response.defer(ephemeral=ephemeral, thinking=True)
+            except discord.NotFound:
+                # The interaction expired before we could acknowledge it
+                logger.warning("Interaction for /%s expired before it was deferred", interaction.command.name)
+                return
+            interaction.extras["deferred_ephemeral"] = ephemeral
+
+            try:
+                await pipeline.run(func(self, interaction, *args, **kwargs))
+            except PipelineBusy:
+                await respond(interaction, BUSY_MESSAGE, ephemeral=True)
+
+        return wrapper
+    return decorator
+
+
+async def respond(interaction: discord.Interaction, content: str = None, *, embed: discord.Embed = None,
+                  ephemeral: bool = False):
+    """
+    Sends the command's reply, whether or not the interaction was deferred or already answered.
+    """
+    kwargs = {}
+    if content is not None:
+        kwargs["content"] = content
+    if embed is not None:
+        kwargs["embed"] = embed
+
+    if not interaction.response.is_done():
+        await interaction.response.send_message(**kwargs, ephemeral=ephemeral)
+        return
+
+    deferred_ephemeral = interaction.extras.pop("deferred_ephemeral", None)
+    if deferred_ephemeral is None:
+        # Already answered; anything more is a separate follow-up message
+        await interaction.followup.send(**kwargs, ephemeral=ephemeral)
+    elif deferred_ephemeral == ephemeral:
+        await interaction.edit_original_response(**kwargs)
+    else:
+        # defer() fixed the placeholder's visibility; swap it for a message with the right one
+        await interaction.delete_original_response()
+        await interaction.followup.send(**kwargs, ephemeral=ephemeral)
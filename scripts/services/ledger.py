@@ -0,0 +1,298 @@
+import time
+import asyncio
+import logging
+from services.queries import (
+    LEDGER_PARTIES, LEDGER_PARTIES_SELECT,
+    LEDGER_LOCK_PLAYERS, LEDGER_LOCK_COMPANIES, LEDGER_LOCK_BUILDINGS,
+    LEDGER_APPLY_PLAYERS, LEDGER_APPLY_COMPANIES, LEDGER_APPLY_BUILDINGS,
+    LEDGER_SNAPSHOT, LEDGER_BALANCE_AT,
+)
+
+logger = logging.getLogger(__name__)
+
+PLAYER = "player"
+COMPANY = "company"
+BUILDING = "building"
+MARKET = "market"  # Holds buy orders' escrow; recorded only, never locked or applied
+
+# party_type -> (lock statement, apply statement)
+PARTY_STATEMENTS = {
+    PLAYER: (LEDGER_LOCK_PLAYERS, LEDGER_APPLY_PLAYERS),
+    COMPANY: (LEDGER_LOCK_COMPANIES, LEDGER_APPLY_COMPANIES),
+    BUILDING: (LEDGER_LOCK_BUILDINGS, LEDGER_APPLY_BUILDINGS),
+}
+
+TRANSACTION_COLUMNS = ["transfer_type", "sender_party_id", "recipient_party_id", "amount", "memo"]
+
+
+class InsufficientFunds(Exception):
+    pass
+
+
+class UnknownParty(Exception):
+    pass
+
+
+def player(player_id: int):
+    return (PLAYER, player_id)
+
+
+def company(company_id: int):
+    return (COMPANY, company_id)
+
+
+def building(building_id: int):
+    return (BUILDING, building_id)
+
+
+def market():
+    return (MARKET, None)
+
+
+class Transfer:
+    __slots__ = ("sender", "recipient", "amount", "transfer_type", "memo", "future")
+
+    def __init__(self, sender, recipient, amount, transfer_type, memo, future):
+        self.sender = sender
+        self.recipient = recipient
+        self.amount = amount
+        self.transfer_type = transfer_type
+        self.memo = memo
+        self.future = future
+
+
+class Ledger:
+    """
+    Batched writer for transactions_table, and the only one.
+
+    Transfers are buffered and flushed every flush_interval seconds (or as soon as
+    max_batch are waiting). Each flush is one database transaction: it locks the
+    balances involved, rejects overdrafts in submission order, applies the net
+    change per party and records the accepted transfers.
+
+    Services that move money in their own set-based statements (economy payouts, market
+    settlement) apply the balance changes themselves and call record() in the same
+    transaction. Recording appends the transfers with COPY and snapshots the balances of
+    parties whose last snapshot is older than snapshot_interval. Since every balance change
+    after registration is recorded, a snapshot plus the transfers after it is the balance.
+    Party IDs are cached once they are known to be committed.
+    """
+
+    def __init__(self, bot, flush_interval: float = 0.25, max_batch: int = 1000,
+                 snapshot_interval: float = 3600.0):
+        self.bot = bot
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.snapshot_interval = snapshot_interval
+        self._party_ids = {}  # (party_type, ref) -> party_id
+        self._snapshotted = {}  # party_id -> monotonic time of this process's last snapshot
+        self._buffer = []
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task = None
+        self.flushed = 0
+        self.recorded = 0
+        self.rejected = 0
+        self.batches = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+        await self.flush()
+
+    def transfer(self, sender, recipient, amount: int, transfer_type: str = "transfer",
+                 memo: str = "n/a") -> asyncio.Future:
+        """
+        Queues a transfer between two parties (see player/company/building).
+        The returned future resolves once the transfer is committed, or raises
+        InsufficientFunds if the sender couldn't cover it and UnknownParty if the
+        recipient doesn't exist.
+        """
+        if amount <= 0:
+            raise ValueError("Transfer amount must be positive.")
+        if sender == recipient:
+            raise ValueError("Sender and recipient must differ.")
+        if sender[0] not in PARTY_STATEMENTS or recipient[0] not in PARTY_STATEMENTS:
+            raise ValueError("Only players, companies and buildings can transfer.")
+
+        future = asyncio.get_running_loop().create_future()
+        self._buffer.append(Transfer(sender, recipient, amount, transfer_type[:10], memo[:50], future))
+        if len(self._buffer) >= self.max_batch:
+            self._wakeup.set()
+        return future
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Ledger flush failed: %s", e)
+
+    async def flush(self):
+        async with self._flush_lock:
+            while self._buffer:
+                batch, self._buffer = self._buffer[:self.max_batch], self._buffer[self.max_batch:]
+                try:
+                    await self._flush_batch(batch)
+                except Exception as e:
+                    for transfer in batch:
+                        if not transfer.future.done():
+                            transfer.future.set_exception(e)
+                        # The rolled-back balances may already have been written through
+                        for party_type, ref in (transfer.sender, transfer.recipient):
+                            if party_type == PLAYER:
+                                self.bot.player_store.invalidate(ref)
+                    raise
+
+    async def _flush_batch(self, batch: list):
+        started = time.perf_counter()
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                parties = {party for t in batch for party in (t.sender, t.recipient)}
+                balances = await self._lock_balances(conn, parties)
+
+                accepted = []
+                for transfer in batch:
+                    if transfer.recipient not in balances:
+                        # Applying it would update nothing and fail the whole batch on record()
+                        self.rejected += 1
+                        transfer.future.set_exception(UnknownParty(f"{transfer.recipient} does not exist."))
+                        continue
+                    if balances.get(transfer.sender, 0) < transfer.amount:
+                        self.rejected += 1
+                        transfer.future.set_exception(
+                            InsufficientFunds(f"{transfer.sender} cannot cover {transfer.amount}.")
+                        )
+                        continue
+                    balances[transfer.sender] -= transfer.amount
+                    balances[transfer.recipient] += transfer.amount
+                    accepted.append(transfer)
+
+                if accepted:
+                    await self._apply(conn, accepted)
+                    await self.record(conn, [
+                        (t.sender, t.recipient, t.amount, t.transfer_type, t.memo) for t in accepted
+                    ])
+
+        for transfer in accepted:
+            transfer.future.set_result(None)
+        self.flushed += len(accepted)
+        self.batches += 1
+        self.bot.db.metrics.record_query("ledger.flush", time.perf_counter() - started)
+
+    async def record(self, conn, transfers: list):
+        """
+        Appends transfers whose balance changes the caller has already applied in conn's
+        transaction. transfers are (sender, recipient, amount, transfer_type, memo) tuples
+        with positive amounts.
+        """
+        if not transfers:
+            return
+        party_ids = await self._resolve_parties(conn, {party for t in transfers for party in t[:2]})
+        await conn.copy_records_to_table(
+            "transactions_table",
+            records=[
+                (transfer_type[:10], party_ids[sender], party_ids[recipient], amount, memo[:50])
+                for sender, recipient, amount, transfer_type, memo in transfers
+            ],
+            columns=TRANSACTION_COLUMNS
+        )
+        await self._snapshot(conn, party_ids.values())
+        self.recorded += len(transfers)
+
+    async def _resolve_parties(self, conn, parties: set) -> dict:
+        """
+        Maps parties to party IDs, creating missing parties. Only IDs of parties that
+        already existed are cached: one created here is gone if the transaction rolls back.
+        """
+        resolved = {}
+        missing = {}
+        for party in parties:
+            if party in self._party_ids:
+                resolved[party] = self._party_ids[party]
+            else:
+                missing.setdefault(party[0], []).append(party[1])
+
+        for party_type, refs in missing.items():
+            rows = list(await self.bot.db.fetch(LEDGER_PARTIES[party_type], refs, conn=conn))
+            raced = set(refs) - {row["ref"] for row in rows}
+            if raced:
+                rows += await self.bot.db.fetch(LEDGER_PARTIES_SELECT[party_type], list(raced), conn=conn)
+            for row in rows:
+                resolved[(party_type, row["ref"])] = row["party_id"]
+                if not row["created"]:
+                    self._party_ids[(party_type, row["ref"])] = row["party_id"]
+        return resolved
+
+    async def _lock_balances(self, conn, parties: set) -> dict:
+        by_type = {}
+        for party_type, ref in parties:
+            by_type.setdefault(party_type, []).append(ref)
+
+        balances = {}
+        for party_type, refs in by_type.items():
+            statement = PARTY_STATEMENTS[party_type][0]
+            for row in await self.bot.db.fetch(statement, refs, conn=conn):
+                balances[(party_type, row["ref"])] = row["balance"]
+        return balances
+
+    async def _apply(self, conn, accepted: list):
+        deltas = {}
+        for transfer in accepted:
+            deltas[transfer.sender] = deltas.get(transfer.sender, 0) - transfer.amount
+            deltas[transfer.recipient] = deltas.get(transfer.recipient, 0) + transfer.amount
+
+        by_type = {}
+        for (party_type, ref), delta in deltas.items():
+            if delta:
+                refs, values = by_type.setdefault(party_type, ([], []))
+                refs.append(ref)
+                values.append(delta)
+
+        for party_type, (refs, values) in by_type.items():
+            statement = PARTY_STATEMENTS[party_type][1]
+            if party_type == PLAYER:
+                # Keep the player cache's balances current
+                await self.bot.player_store.write(statement, refs, values, conn=conn)
+            else:
+                await self.bot.db.execute(statement, refs, values, conn=conn)
+
+    async def _snapshot(self, conn, party_ids):
+        # Marked before the commit; a rolled-back snapshot only delays the party's next one
+        now = time.monotonic()
+        due = [
+            party_id for party_id in set(party_ids)
+            if now - self._snapshotted.get(party_id, float("-inf")) >= self.snapshot_interval
+        ]
+        if due:
+            await self.bot.db.execute(LEDGER_SNAPSHOT, due, conn=conn)
+            for party_id in due:
+                self._snapshotted[party_id] = now
+
+    # ---------- Reads ----------
+    async def balance_at(self, party, when):
+        """
+        Returns the party's balance at `when` (a naive timestamp, like time_of_transaction),
+        or None if the party had no snapshot by then.
+        """
+        async with self.bot.db.acquire() as conn:
+            party_id = (await self._resolve_parties(conn, {party}))[party]
+            return await self.bot.db.fetchval(LEDGER_BALANCE_AT, party_id, when, conn=conn)
+
+    def stats(self) -> dict:
+        return {
+            "buffered": len(self._buffer),
+            "flushed": self.flushed,
+            "recorded": self.recorded,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "cached_parties": len(self._party_ids),
+        }
@@ -0,0 +1,117 @@
+import json
+import queue
+import random
+import logging
+import logging.handlers
+from datetime import datetime, timezone
+
+# LogRecord attributes that aren't user-supplied `extra` fields
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+TEXT_FORMAT = '[%(levelname)s] %(asctime)s - %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    One JSON object per line: timestamp, level, logger, message, any `extra` fields
+    and the formatted exception, if any.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps a fraction of the records below WARNING from the given loggers (and their
+    children); warnings and errors always pass.
+    """
+
+    def __init__(self, rates: dict):
+        super().__init__()
+        self.rates = rates
+        self._cache = {}  # logger name -> effective rate
+
+    def _rate(self, name: str) -> float:
+        rate = self._cache.get(name)
+        if rate is None:
+            rate = 1.0
+            prefix = name
+            while prefix:
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+                prefix = prefix.rpartition(".")[0]
+            self._cache[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler that leaves message formatting to the listener thread.
+
+    The stock QueueHandler formats each record before enqueuing it, which would keep
+    the %-formatting on the event loop. Records are enqueued as they are instead, so
+    log arguments must stay safe to format later (values, not objects mutated afterwards).
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+
+def parse_mapping(value: str, convert=str) -> dict:
+    """
+    Parses "name=value,name=value" (as used by LOG_LEVELS and LOG_SAMPLE).
+    """
+    mapping = {}
+    for part in (value or "").split(","):
+        name, _, setting = part.strip().partition("=")
+        if name and setting:
+            mapping[name] = convert(setting)
+    return mapping
+
+
+def configure_logging(level: str = "INFO", module_levels: dict = None, json_format: bool = False,
+                      sample_rates: dict = None) -> logging.handlers.QueueListener:
+    """
+    Routes every record through a queue to a listener thread that formats and writes it,
+    so the event loop only pays for a level check and an enqueue. Returns the started
+    listener; stop it on shutdown to flush what's left.
+    """
+    stream = logging.StreamHandler()
+    stream.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT, DATE_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    handler = DeferredQueueHandler(log_queue)
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level.upper())
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    listener = logging.handlers.QueueListener(log_queue, stream, respect_handler_level=True)
+    listener.start()
+    return listener
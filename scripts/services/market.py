@@ -0,0 +1,397 @@
+import heapq
+import itertools
+import time
+import asyncio
+import logging
+from services.queries import (
+    MARKET_ITEMS, MARKET_ORDERS_OPEN, MARKET_PLACE, MARKET_CANCEL, MARKET_FACTORY_LIST,
+    MARKET_LOCK_PLAYERS, MARKET_SETTLE_ORDERS, MARKET_SETTLE_PLAYERS, MARKET_SETTLE_BUILDINGS, MARKET_RELIST,
+)
+from services import ledger
+
+logger = logging.getLogger(__name__)
+
+BUY = "buy"
+SELL = "sell"
+
+PLAYER = "player"
+BUILDING = "building"
+
+
+class OrderRejected(Exception):
+    pass
+
+
+class Order:
+    __slots__ = ("order_id", "item", "side", "owner", "price", "remaining")
+
+    def __init__(self, order_id: int, item: str, side: str, owner: tuple, price: int, remaining: int):
+        self.order_id = order_id
+        self.item = item
+        self.side = side
+        self.owner = owner  # (PLAYER, player_id) or (BUILDING, building_id), as a ledger party
+        self.price = price
+        self.remaining = remaining
+
+    @classmethod
+    def from_row(cls, row):
+        owner = (PLAYER, row["player_id"]) if row["player_id"] is not None else (BUILDING, row["building_id"])
+        return cls(row["order_id"], row["item"], row["side"], owner, row["price"], row["remaining"])
+
+
+class Trade:
+    __slots__ = ("buy", "sell", "price", "quantity", "buy_left", "sell_left")
+
+    def __init__(self, buy: Order, sell: Order, price: int, quantity: int):
+        self.buy = buy
+        self.sell = sell
+        self.price = price
+        self.quantity = quantity
+        # What each order had left right after this trade, for settling it in order
+        self.buy_left = buy.remaining
+        self.sell_left = sell.remaining
+
+
+class OrderBook:
+    """
+    Price-time priority book for one item.
+
+    Bids and asks are heaps keyed by (price, order_id), so the best price and, within a
+    price, the oldest order come first; a sequence number breaks any remaining tie, so
+    orders themselves are never compared. Filled or cancelled orders are dropped lazily
+    when they reach the top.
+    """
+
+    def __init__(self, item: str):
+        self.item = item
+        self._bids = []  # (-price, order_id, seq, order)
+        self._asks = []  # (price, order_id, seq, order)
+        self._queued = set()  # order_ids with an entry in either heap
+        self._seq = itertools.count()
+
+    def _push(self, order: Order):
+        if order.side == BUY:
+            heapq.heappush(self._bids, (-order.price, order.order_id, next(self._seq), order))
+        else:
+            heapq.heappush(self._asks, (order.price, order.order_id, next(self._seq), order))
+        self._queued.add(order.order_id)
+
+    def _pop(self, side: list):
+        self._queued.discard(heapq.heappop(side)[-1].order_id)
+
+    def submit(self, order: Order) -> list:
+        """
+        Matches the order against the other side at the resting orders' prices, then rests
+        whatever is left. Returns the trades, in execution order.
+        """
+        trades = []
+        if order.side == BUY:
+            opposite, crosses = self._asks, lambda resting: resting.price <= order.price
+        else:
+            opposite, crosses = self._bids, lambda resting: resting.price >= order.price
+
+        while order.remaining and opposite:
+            resting = opposite[0][-1]
+            if resting.remaining == 0:
+                self._pop(opposite)
+                continue
+            if not crosses(resting):
+                break
+            quantity = min(order.remaining, resting.remaining)
+            order.remaining -= quantity
+            resting.remaining -= quantity
+            buy, sell = (order, resting) if order.side == BUY else (resting, order)
+            trades.append(Trade(buy, sell, resting.price, quantity))
+            if resting.remaining == 0:
+                self._pop(opposite)
+
+        if order.remaining:
+            self._push(order)
+        return trades
+
+    def restore(self, order: Order, remaining: int):
+        """
+        Puts a resting order whose remaining was zeroed (e.g. for a cancel that failed) back
+        with `remaining` left, at its original time priority.
+        """
+        order.remaining = remaining
+        if remaining and order.order_id not in self._queued:
+            self._push(order)
+
+    def _best(self, side: list):
+        while side and side[0][-1].remaining == 0:
+            self._pop(side)
+        return side[0][-1] if side else None
+
+    def best_bid(self):
+        return self._best(self._bids)
+
+    def best_ask(self):
+        return self._best(self._asks)
+
+    def depth(self, levels: int = 5) -> tuple:
+        """
+        Returns ([(price, quantity)] bids, [(price, quantity)] asks), best prices first.
+        """
+        def aggregate(entries, sign):
+            quantities = {}
+            for key, _, _, order in entries:
+                if order.remaining:
+                    quantities[key * sign] = quantities.get(key * sign, 0) + order.remaining
+            return sorted(quantities.items(), key=lambda level: level[0] * sign)[:levels]
+
+        return aggregate(self._bids, -1), aggregate(self._asks, 1)
+
+
+class Market:
+    """
+    /buy and /sell market: one in-memory OrderBook per item.
+
+    Placing an order is one statement that escrows its cost or items and records it in
+    market_orders. Matching then happens in memory, and the resulting trades are settled
+    every flush_interval seconds in one transaction: order fills, player balances and
+    items, and factory proceeds. Buys are checked against the 127-item cap when placed and
+    again at settlement; units a buyer can't hold are refunded and listed again. Escrowed money is held by the ledger's market party:
+    placing a buy order, cancelling it and settling its trades are recorded in the same
+    transaction as the balance change. On start the books are
+    rebuilt from the open orders, which also re-matches any trades a crash left
+    unsettled. Every factory_interval seconds each factory produces factory_output units
+    and lists its stock at factory_prices[item].
+
+    The books live in one process, so the market needs a single bot process.
+    """
+
+    def __init__(self, bot, flush_interval: float = 0.25, factory_interval: float = 600.0,
+                 factory_output: int = 5, factory_prices: dict = None):
+        self.bot = bot
+        self.flush_interval = flush_interval
+        self.factory_interval = factory_interval
+        self.factory_output = factory_output
+        self.factory_prices = {item: price for item, price in (factory_prices or {}).items() if item in MARKET_ITEMS}
+        self.books = {item: OrderBook(item) for item in MARKET_ITEMS}
+        self._orders = {}  # order_id -> open Order
+        self._trades = []
+        self._flush_lock = asyncio.Lock()
+        self._tasks = []
+        self.matched = 0
+        self.settled = 0
+        self.batches = 0
+
+    async def start(self):
+        rows = await self.bot.db.fetch(MARKET_ORDERS_OPEN)
+        for row in rows:
+            self._submit(Order.from_row(row))
+        logger.info("Market rebuilt from %s open order(s), %s trade(s) to settle.", len(rows), len(self._trades))
+        self._tasks = [asyncio.create_task(self._run())]
+        if self.factory_prices and self.factory_interval > 0:
+            self._tasks.append(asyncio.create_task(self._run_factories()))
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await self.flush()
+
+    def _submit(self, order: Order) -> list:
+        trades = self.books[order.item].submit(order)
+        if order.remaining:
+            self._orders[order.order_id] = order
+        for trade in trades:
+            for filled in (trade.buy, trade.sell):
+                if filled.remaining == 0:
+                    self._orders.pop(filled.order_id, None)
+        self._trades.extend(trades)
+        self.matched += len(trades)
+        return trades
+
+    # ---------- Orders ----------
+    async def place(self, player_id: int, side: str, item: str, quantity: int, price: int) -> tuple:
+        """
+        Escrows and books an order. Returns (order, trades matched right away); raises
+        OrderRejected if the player can't cover it.
+        """
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                rows = await self.bot.db.fetch(MARKET_PLACE[(side, item)], player_id, quantity, price, conn=conn)
+                if rows and side == BUY:
+                    await self.bot.ledger.record(conn, [(
+                        ledger.player(player_id), ledger.market(), quantity * price,
+                        "escrow", f"order #{rows[0]['order_id']}"
+                    )])
+        if not rows:
+            if side == BUY:
+                raise OrderRejected(f"You can't afford {quantity} {item} at ${price}, or they'd take you past 127.")
+            raise OrderRejected(f"You don't have {quantity} {item} to sell.")
+        self.bot.player_store.refresh(rows)
+        order = Order(rows[0]["order_id"], item, side, (PLAYER, player_id), price, quantity)
+        return order, self._submit(order)
+
+    async def cancel(self, player_id: int, order_id: int) -> int:
+        """
+        Cancels one of the player's open orders and returns its escrow. Returns the
+        quantity that was still open; raises OrderRejected if there's no such order, or
+        if taking a sell order's items back would put the player past 127.
+        """
+        order = self._orders.get(order_id)
+        if order is None or order.owner != (PLAYER, player_id):
+            raise OrderRejected(f"You have no open order #{order_id}.")
+        # Take it off the book, then settle its fills so the database agrees on what's left
+        del self._orders[order_id]
+        left, order.remaining = order.remaining, 0
+        try:
+            await self.flush()
+            async with self.bot.db.acquire() as conn:
+                async with conn.transaction():
+                    rows = await self.bot.db.fetch(MARKET_CANCEL, order_id, player_id, conn=conn)
+                    if rows and rows[0]["fits"] and rows[0]["side"] == BUY:
+                        await self.bot.ledger.record(conn, [(
+                            ledger.market(), ledger.player(player_id), rows[0]["price"] * rows[0]["refunded"],
+                            "refund", f"order #{order_id}"
+                        )])
+        except Exception:
+            self._reopen(order, left)
+            raise
+        if rows and not rows[0]["fits"]:
+            self._reopen(order, left)
+            raise OrderRejected(
+                f"Taking back {left} {order.item} would put you past 127, counting your open buys."
+            )
+        self.bot.player_store.refresh(rows)
+        return rows[0]["refunded"] if rows else 0
+
+    def _reopen(self, order: Order, left: int):
+        # Still open in the database; matching may have dropped its heap entry meanwhile
+        self.books[order.item].restore(order, left)
+        self._orders[order.order_id] = order
+
+    def open_orders(self, player_id: int) -> list:
+        return [order for order in self._orders.values() if order.owner == (PLAYER, player_id)]
+
+    # ---------- Settlement ----------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except Exception as e:
+                logger.exception("Market settlement failed: %s", e)
+
+    async def flush(self):
+        async with self._flush_lock:
+            if not self._trades:
+                return
+            trades, self._trades = self._trades, []
+            try:
+                await self._settle(trades)
+            except Exception:
+                # Nothing was committed; retry these before anything matched since
+                self._trades = trades + self._trades
+                raise
+
+    async def _settle(self, trades: list):
+        started = time.perf_counter()
+        player_ids = {trade.buy.owner[1] for trade in trades}
+        player_ids.update(trade.sell.owner[1] for trade in trades if trade.sell.owner[0] == PLAYER)
+        remaining = {}
+        players = {}  # player_id -> [balance, guns, vest, medkit]
+        buildings = {}
+        transfers = []
+        relists = []  # (item, player_id, building_id, price, quantity)
+        async with self.bot.db.acquire() as conn:
+            async with conn.transaction():
+                held = {
+                    row["player_id"]: {item: row[item] for item in MARKET_ITEMS}
+                    for row in await self.bot.db.fetch(MARKET_LOCK_PLAYERS, sorted(player_ids), conn=conn)
+                }
+                for trade in trades:
+                    remaining[trade.buy.order_id] = trade.buy_left
+                    remaining[trade.sell.order_id] = trade.sell_left
+                    item = trade.buy.item
+                    buyer_id = trade.buy.owner[1]
+                    seller_type, seller_id = trade.sell.owner
+
+                    # Units that would take the buyer past 127 aren't delivered: the buyer keeps
+                    # their escrow for them, and they're listed again for the seller
+                    delivered = min(trade.quantity, 127 - held[buyer_id][item])
+                    held[buyer_id][item] += delivered
+                    cost = trade.price * delivered
+                    escrow = trade.buy.price * trade.quantity
+
+                    buyer = players.setdefault(buyer_id, [0] * (1 + len(MARKET_ITEMS)))
+                    buyer[0] += escrow - cost
+                    buyer[1 + MARKET_ITEMS.index(item)] += delivered
+                    if seller_type == PLAYER:
+                        players.setdefault(seller_id, [0] * (1 + len(MARKET_ITEMS)))[0] += cost
+                    elif cost:
+                        buildings[seller_id] = buildings.get(seller_id, 0) + cost
+
+                    # The market releases the buyer's escrow for these units, and the buyer pays the seller
+                    transfers.append((
+                        ledger.market(), trade.buy.owner, escrow, "release", f"order #{trade.buy.order_id}"
+                    ))
+                    if cost and trade.sell.owner != trade.buy.owner:
+                        transfers.append((
+                            trade.buy.owner, trade.sell.owner, cost,
+                            "market", f"{delivered} {item} @ ${trade.price}"
+                        ))
+
+                    if delivered < trade.quantity:
+                        undelivered = trade.quantity - delivered
+                        logger.warning(
+                            "%s %s from order #%s would take player %s past 127; refunded and listed again.",
+                            undelivered, item, trade.sell.order_id, buyer_id
+                        )
+                        relists.append((
+                            item, seller_id if seller_type == PLAYER else None,
+                            seller_id if seller_type == BUILDING else None, trade.sell.price, undelivered
+                        ))
+
+                await self.bot.db.execute(MARKET_SETTLE_ORDERS, list(remaining), list(remaining.values()), conn=conn)
+                rows = await self.bot.db.fetch(
+                    MARKET_SETTLE_PLAYERS, list(players), *map(list, zip(*players.values())), conn=conn
+                )
+                if buildings:
+                    await self.bot.db.execute(
+                        MARKET_SETTLE_BUILDINGS, list(buildings), list(buildings.values()), conn=conn
+                    )
+                relisted = []
+                if relists:
+                    relisted = await self.bot.db.fetch(MARKET_RELIST, *map(list, zip(*relists)), conn=conn)
+                await self.bot.ledger.record(conn, transfers)
+
+        # Only committed balances reach the cache
+        self.bot.player_store.refresh(rows)
+        for row in relisted:
+            self._submit(Order.from_row(row))
+        self.settled += len(trades)
+        self.batches += 1
+        self.bot.db.metrics.record_query("market.settle", time.perf_counter() - started)
+
+    # ---------- Factories ----------
+    async def _run_factories(self):
+        while True:
+            try:
+                await self.list_factory_output()
+            except Exception as e:
+                logger.exception("Listing factory output failed: %s", e)
+            await asyncio.sleep(self.factory_interval)
+
+    async def list_factory_output(self) -> int:
+        """
+        Runs one round of factory production and books the listings. Returns the orders listed.
+        """
+        items = list(self.factory_prices)
+        rows = await self.bot.db.fetch(
+            MARKET_FACTORY_LIST, self.factory_output, items, [self.factory_prices[item] for item in items]
+        )
+        for row in rows:
+            self._submit(Order.from_row(row))
+        return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "open_orders": len(self._orders),
+            "unsettled": len(self._trades),
+            "matched": self.matched,
+            "settled": self.settled,
+            "batches": self.batches,
+        }
@@ -0,0 +1,87 @@
+import time
+import logging
+from collections import OrderedDict
+import discord
+
+logger = logging.getLogger(__name__)
+
+
+class MemberCache:
+    """
+    Bounded member cache for the low-memory mode (MEMBER_CACHE_SIZE).
+
+    With guild chunking off discord.py keeps no member list, so members a command or
+    background task touches are kept here in an LRU of at most max_size entries. Gateway
+    updates aren't delivered for members Discord hasn't sent us, so entries are treated as
+    stale after ttl seconds and fetched again. When discord.py does cache a member (full
+    cache mode), that copy is always preferred.
+    """
+
+    def __init__(self, max_size: int = 5000, ttl: float = 60.0):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._members: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def remember(self, member: discord.Member):
+        """
+        Stores a member seen in an interaction or fetched from the API.
+        """
+        if self.max_size <= 0:
+            # Full cache mode: discord.py already keeps every member
+            return
+        key = (member.guild.id, member.id)
+        self._members[key] = (time.monotonic(), member)
+        self._members.move_to_end(key)
+        while len(self._members) > self.max_size:
+            self._members.popitem(last=False)
+            self.evictions += 1
+
+    def forget(self, guild_id: int, member_id: int):
+        self._members.pop((guild_id, member_id), None)
+
+    def get(self, guild: discord.Guild, member_id: int):
+        """
+        Returns the member if discord.py or this cache has a fresh copy, otherwise None.
+        """
+        member = guild.get_member(member_id)
+        if member is not None:
+            return member
+
+        key = (guild.id, member_id)
+        entry = self._members.get(key)
+        if entry is None:
+            return None
+        stored_at, member = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._members[key]
+            return None
+        self._members.move_to_end(key)
+        return member
+
+    async def fetch(self, guild: discord.Guild, member_id: int) -> discord.Member:
+        """
+        Returns the member, fetching it from the API on a miss. Raises discord.NotFound if
+        they've left the guild.
+        """
+        member = self.get(guild, member_id)
+        if member is not None:
+            self.hits += 1
+            return member
+        self.misses += 1
+        member = await guild.fetch_member(member_id)
+        self.remember(member)
+        return member
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._members),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,165 @@
+import time
+import asyncio
+import logging
+import discord
+
+logger = logging.getLogger(__name__)
+
+# Sentinel meaning "leave the member's timeout alone"
+UNCHANGED = object()
+
+
+class PendingMutation:
+    """
+    Role and timeout changes waiting to be applied to one member in a single edit.
+    """
+
+    def __init__(self, member: discord.Member):
+        self.member = member
+        self.add_roles = {}
+        self.remove_roles = {}
+        self.timed_out_until = UNCHANGED
+        self.reasons = []
+        self.waiters = []
+        self.queued_at = time.perf_counter()
+
+    def merge(self, add_roles, remove_roles, timed_out_until, reason):
+        for role in add_roles:
+            self.remove_roles.pop(role.id, None)
+            self.add_roles[role.id] = role
+        for role in remove_roles:
+            self.add_roles.pop(role.id, None)
+            self.remove_roles[role.id] = role
+        if timed_out_until is not UNCHANGED:
+            self.timed_out_until = timed_out_until
+        if reason:
+            self.reasons.append(reason)
+
+    @property
+    def reason(self):
+        return "; ".join(self.reasons)[:512] if self.reasons else None
+
+    def edit_kwargs(self, live_member: discord.Member = None) -> dict:
+        """
+        Keyword arguments for Member.edit. The full role list is only included when built
+        from live_member, a copy the gateway keeps current or one fetched just now; a role
+        list built from an older copy would revert role changes other bots or moderators
+        made since.
+        """
+        kwargs = {}
+        if live_member is not None and (self.add_roles or self.remove_roles):
+            # Same role list Member.add_roles/remove_roles would send, minus @everyone
+            current = {role.id: role for role in live_member.roles[1:]}
+            current.update(self.add_roles)
+            for role_id in self.remove_roles:
+                current.pop(role_id, None)
+            kwargs["roles"] = [discord.Object(id=role_id) for role_id in current]
+        if self.timed_out_until is not UNCHANGED:
+            kwargs["timed_out_until"] = self.timed_out_until
+        if self.reasons:
+            kwargs["reason"] = self.reason
+        return kwargs
+
+
+class MemberMutationQueue:
+    """
+    Coalesces role and timeout changes per member into as few member edits as possible.
+
+    Member edits share Discord's PATCH /guilds/{guild_id}/members/{user_id} route, whose
+    rate-limit bucket is keyed by guild, so each guild gets its own worker that applies
+    one member's changes at a time. Changes queued for a member while an earlier edit is
+    in flight are merged into that member's next edit.
+
+    Each member's changes go out as one PATCH with the full role list and the timeout. The
+    role list is built right before the edit from a current copy of the member: the one
+    the gateway keeps when discord.py caches members (full cache mode), or otherwise one
+    fetched from the API, so role changes made by anyone else are never overwritten.
+    """
+
+    def __init__(self):
+        self._pending = {}  # guild_id -> {member_id: PendingMutation}, in arrival order
+        self._workers = {}  # guild_id -> asyncio.Task
+        self.submitted = 0
+        self.coalesced = 0
+        self.applied = 0
+        self.failed = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def submit(self, member: discord.Member, *, add_roles=(), remove_roles=(),
+               timed_out_until=UNCHANGED, reason: str = None) -> asyncio.Future:
+        """
+        Queues changes for the member. Returns a future that resolves once they are applied
+        (or raises the discord.HTTPException the edit failed with).
+        """
+        self.submitted += 1
+        guild_pending = self._pending.setdefault(member.guild.id, {})
+        mutation = guild_pending.get(member.id)
+        if mutation is None:
+            mutation = guild_pending[member.id] = PendingMutation(member)
+        else:
+            self.coalesced += 1
+            mutation.member = member
+        mutation.merge(add_roles, remove_roles, timed_out_until, reason)
+
+        future = asyncio.get_running_loop().create_future()
+        mutation.waiters.append(future)
+
+        worker = self._workers.get(member.guild.id)
+        if worker is None or worker.done():
+            self._workers[member.guild.id] = asyncio.create_task(self._drain(member.guild.id))
+        return future
+
+    async def _drain(self, guild_id: int):
+        guild_pending = self._pending.get(guild_id)
+        while guild_pending:
+            member_id = next(iter(guild_pending))
+            mutation = guild_pending.pop(member_id)
+            await self._apply(mutation)
+        self._pending.pop(guild_id, None)
+        self._workers.pop(guild_id, None)
+
+    async def _apply(self, mutation: PendingMutation):
+        member = mutation.member
+        try:
+            live_member = member.guild.get_member(member.id)
+            if live_member is None and (mutation.add_roles or mutation.remove_roles):
+                # Not cached (low-memory mode); the fetch doesn't share the edit's rate-limit bucket
+                live_member = await member.guild.fetch_member(member.id)
+            kwargs = mutation.edit_kwargs(live_member)
+            if kwargs.keys() - {"reason"}:
+                await (live_member or member).edit(**kwargs)
+        except Exception as e:
+            self.failed += 1
+            logger.warning("Failed to edit member %s: %s", member.id, e)
+            for waiter in mutation.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+
+        self.applied += 1
+        elapsed = time.perf_counter() - mutation.queued_at
+        self.latency_total += elapsed
+        self.latency_max = max(self.latency_max, elapsed)
+        for waiter in mutation.waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    async def close(self):
+        for worker in list(self._workers.values()):
+            worker.cancel()
+
+    def depth(self) -> int:
+        return sum(len(guild_pending) for guild_pending in self._pending.values())
+
+    def stats(self) -> dict:
+        return {
+            "depth": self.depth(),
+            "workers": len(self._workers),
+            "submitted": self.submitted,
+            "coalesced": self.coalesced,
+            "applied": self.applied,
+            "failed": self.failed,
+            "latency_avg": self.latency_total / self.applied if self.applied else 0.0,
+            "latency_max": self.latency_max,
+        }
@@ -0,0 +1,224 @@
+import re
+import time
+import bisect
+import logging
+import aiohttp
+from aiohttp import web
+from discord import app_commands
+
+logger = logging.getLogger(__name__)
+
+# Seconds; covers a cached command (sub-millisecond) up to a slow REST call
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Snowflakes and interaction tokens in REST paths, so routes aggregate
+ROUTE_IDS = re.compile(r"/(\d{15,25}|[A-Za-z0-9_\-\.]{60,})")
+
+
+class Histogram:
+    """
+    Cumulative-bucket histogram, as Prometheus exposes it.
+    """
+
+    __slots__ = ("buckets", "counts", "count", "sum")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """
+        Estimates the q-quantile by interpolating inside its bucket (like histogram_quantile).
+        """
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if seen + bucket_count >= rank and bucket_count:
+                if index == len(self.buckets):
+                    return self.buckets[-1]
+                lower = self.buckets[index - 1] if index else 0.0
+                upper = self.buckets[index]
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+        return self.buckets[-1]
+
+    @property
+    def mean(self) -> float:
+        return self.sum / self.count if self.count else 0.0
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class Metrics:
+    """
+    In-process registry of histograms, counters and collected gauges, rendered in the
+    Prometheus text format. Series are keyed by name plus a sorted tuple of labels.
+    """
+
+    def __init__(self):
+        self._histograms = {}  # name -> {labels: Histogram}
+        self._counters = {}  # name -> {labels: float}
+        self._help = {}
+        self._collectors = []  # (prefix, callable returning a stats dict)
+
+    def observe(self, name: str, value: float, help: str = None, **labels):
+        series = self._histograms.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        histogram = series.get(key)
+        if histogram is None:
+            histogram = series[key] = Histogram()
+        histogram.observe(value)
+        if help:
+            self._help.setdefault(name, help)
+
+    def inc(self, name: str, amount: float = 1, help: str = None, **labels):
+        series = self._counters.setdefault(name, {})
+        key = tuple(sorted(labels.items()))
+        series[key] = series.get(key, 0) + amount
+        if help:
+            self._help.setdefault(name, help)
+
+    def histograms(self, name: str) -> dict:
+        """
+        Returns {labels dict as a tuple: Histogram} for one metric.
+        """
+        return self._histograms.get(name, {})
+
+    def counters(self, name: str) -> dict:
+        return self._counters.get(name, {})
+
+    def collect(self, prefix: str, stats):
+        """
+        Exposes every numeric value of stats() as a gauge named prefix_key at scrape time.
+        """
+        self._collectors.append((prefix, stats))
+
+    def render(self) -> str:
+        lines = []
+        for name, series in sorted(self._counters.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in series.items():
+                lines.append(f"{name}{_labels(labels)} {value}")
+
+        for name, series in sorted(self._histograms.items()):
+            lines.append(f"# HELP {name} {self._help.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, histogram in series.items():
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets + (float("inf"),), histogram.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else repr(bound)
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {histogram.sum}")
+                lines.append(f"{name}_count{_labels(labels)} {histogram.count}")
+
+        for prefix, stats in self._collectors:
+            try:
+                values = stats()
+            except Exception as e:
+                logger.error("Metrics collector %s failed: %s", prefix, e)
+                continue
+            for key, value in values.items():
+                if isinstance(value, (int, float)) and not isinstance(value, bool):
+                    lines.append(f"# TYPE {prefix}_{key} gauge")
+                    lines.append(f"{prefix}_{key} {value}")
+        return "\n".join(lines) + "\n"
+
+
+# ---------- Discord ----------
+class MetricsCommandTree(app_commands.CommandTree):
+    """
+    Command tree that stamps each interaction on arrival, so completion and error
+    handlers can time the whole command (see observe_command).
+    """
+
+    async def interaction_check(self, interaction) -> bool:
+        interaction.extras["started"] = time.perf_counter()
+        return True
+
+
+def observe_command(metrics: Metrics, interaction, outcome: str):
+    started = interaction.extras.get("started")
+    if started is None or interaction.command is None:
+        return
+    metrics.observe(
+        "wd_command_seconds", time.perf_counter() - started,
+        help="App command handling time, from dispatch to return",
+        command=interaction.command.qualified_name, outcome=outcome
+    )
+
+
+def discord_http_trace(metrics: Metrics) -> aiohttp.TraceConfig:
+    """
+    aiohttp trace hooks timing every Discord REST request and counting 429s.
+    """
+    trace = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.started = time.perf_counter()
+
+    async def on_request_end(session, context, params):
+        route = f"{params.method} {ROUTE_IDS.sub('/{id}', params.url.path)}"
+        metrics.observe(
+            "wd_discord_rest_seconds", time.perf_counter() - context.started,
+            help="Discord REST request latency", route=route
+        )
+        if params.response.status == 429:
+            scope = params.response.headers.get("X-RateLimit-Scope", "unknown")
+            metrics.inc("wd_discord_rest_429_total", help="Discord REST responses with status 429",
+                        route=route, scope=scope)
+
+    async def on_request_exception(session, context, params):
+        metrics.inc("wd_discord_rest_errors_total", help="Discord REST requests that raised",
+                    method=params.method)
+
+    trace.on_request_start.append(on_request_start)
+    trace.on_request_end.append(on_request_end)
+    trace.on_request_exception.append(on_request_exception)
+    return trace
+
+
+# ---------- HTTP endpoint ----------
+class MetricsServer:
+    """
+    Serves GET /metrics in the Prometheus text format.
+    """
+
+    def __init__(self, metrics: Metrics, host: str, port: int):
+        self.metrics = metrics
+        self.host = host
+        self.port = port
+        self._runner = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_get("/metrics", self._handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info("Serving metrics on http://%s:%s/metrics", self.host, self.port)
+
+    async def close(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _handle(self, request):
+        return web.Response(text=self.metrics.render(), content_type="text/plain", charset="utf-8")
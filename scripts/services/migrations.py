@@ -0,0 +1,108 @@
+import re
+import hashlib
+import logging
+import asyncpg
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = Path(__file__).resolve().parent.parent.parent / "migrations"
+
+# Files are named <version>_<name>.sql, e.g. 0002_bigint_player_keys.sql
+MIGRATION_FILE = re.compile(r"^(\d+)_(\w+)\.sql$")
+
+# Serializes runners across processes (e.g. several workers starting at once)
+ADVISORY_LOCK_ID = 73_776_869
+
+SCHEMA_MIGRATIONS = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        checksum TEXT NOT NULL,
+        applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+"""
+
+
+class Migration:
+    __slots__ = ("version", "name", "path", "sql", "checksum")
+
+    def __init__(self, version: int, name: str, path: Path):
+        self.version = version
+        self.name = name
+        self.path = path
+        self.sql = path.read_text()
+        self.checksum = hashlib.sha256(self.sql.encode()).hexdigest()
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> list:
+    """
+    Returns the migrations in the directory, ordered by version.
+    """
+    migrations = []
+    for path in directory.iterdir():
+        match = MIGRATION_FILE.match(path.name)
+        if match:
+            migrations.append(Migration(int(match.group(1)), match.group(2), path))
+    migrations.sort(key=lambda migration: migration.version)
+
+    versions = [migration.version for migration in migrations]
+    if len(versions) != len(set(versions)):
+        raise ValueError(f"Duplicate migration versions in {directory}.")
+    return migrations
+
+
+async def applied(conn) -> dict:
+    """
+    Returns {version: checksum} for the migrations recorded in the database.
+    """
+    await conn.execute(SCHEMA_MIGRATIONS)
+    rows = await conn.fetch("SELECT version, checksum FROM schema_migrations")
+    return {row["version"]: row["checksum"] for row in rows}
+
+
+async def pending(conn, directory: Path = MIGRATIONS_DIR) -> list:
+    done = await applied(conn)
+    migrations = discover(directory)
+    for migration in migrations:
+        if migration.version in done and done[migration.version] != migration.checksum:
+            logger.warning("Migration %r changed after it was applied.", migration)
+    return [migration for migration in migrations if migration.version not in done]
+
+
+async def pending_migrations(db, directory: Path = MIGRATIONS_DIR) -> list:
+    """
+    Checks a Database's schema over a one-off connection, before its pool starts.
+    """
+    conn = await asyncpg.connect(**db.connect_kwargs)
+    try:
+        return await pending(conn, directory)
+    finally:
+        await conn.close()
+
+
+async def migrate(conn, directory: Path = MIGRATIONS_DIR, target: int = None) -> list:
+    """
+    Applies every pending migration (up to `target`, if given) in version order, each in
+    its own transaction together with its schema_migrations row. Returns those applied.
+    """
+    await conn.execute("SELECT pg_advisory_lock($1)", ADVISORY_LOCK_ID)
+    try:
+        todo = [
+            migration for migration in await pending(conn, directory)
+            if target is None or migration.version <= target
+        ]
+        for migration in todo:
+            logger.info("Applying migration %r", migration)
+            async with conn.transaction():
+                await conn.execute(migration.sql)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, name, checksum) VALUES ($1, $2, $3)",
+                    migration.version, migration.name, migration.checksum
+                )
+        return todo
+    finally:
+        await conn.execute("SELECT pg_advisory_unlock($1)", ADVISORY_LOCK_ID)
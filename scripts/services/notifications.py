@@ -0,0 +1,70 @@
+import asyncio
+import logging
+import asyncpg
+
+logger = logging.getLogger(__name__)
+
+
+class NotificationListener:
+    """
+    Dedicated LISTEN connection that fans Postgres NOTIFY payloads out to subscribers.
+
+    Notifications sent while the connection is down are lost, so after reconnecting
+    every subscriber's on_reconnect callback runs to let it resynchronise.
+    """
+
+    def __init__(self, db, reconnect_delay: float = 5.0):
+        self.db = db
+        self.reconnect_delay = reconnect_delay
+        self._subscribers = {}  # channel -> [(callback, on_reconnect)]
+        self._conn = None
+        self._reconnect_task = None
+        self._closed = False
+
+    def subscribe(self, channel: str, callback, on_reconnect=None):
+        """
+        Registers callback(payload: str) for the channel. Call before start().
+        on_reconnect is an optional coroutine function run after the connection is re-established.
+        """
+        self._subscribers.setdefault(channel, []).append((callback, on_reconnect))
+
+    async def start(self):
+        self._conn = await asyncpg.connect(**self.db.connect_kwargs)
+        self._conn.add_termination_listener(self._on_terminated)
+        for channel in self._subscribers:
+            await self._conn.add_listener(channel, self._dispatch)
+        logger.info("Listening for notifications on %s", ', '.join(self._subscribers) or 'no channels')
+
+    async def close(self):
+        self._closed = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        if self._conn is not None and not self._conn.is_closed():
+            await self._conn.close()
+
+    def _dispatch(self, conn, pid, channel, payload):
+        for callback, _ in self._subscribers.get(channel, ()):
+            try:
+                callback(payload)
+            except Exception as e:
+                logger.exception("Notification handler for %s failed: %s", channel, e)
+
+    def _on_terminated(self, conn):
+        if self._closed or (self._reconnect_task and not self._reconnect_task.done()):
+            return
+        logger.warning("Notification connection lost; reconnecting.")
+        self._reconnect_task = asyncio.create_task(self._reconnect())
+
+    async def _reconnect(self):
+        while not self._closed:
+            await asyncio.sleep(self.reconnect_delay)
+            try:
+                await self.start()
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("Notification reconnect failed: %s", e)
+                continue
+            for subscribers in self._subscribers.values():
+                for _, on_reconnect in subscribers:
+                    if on_reconnect is not None:
+                        await on_reconnect()
+            return
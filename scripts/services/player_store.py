@@ -0,0 +1,176 @@
+import time
+import logging
+from collections import OrderedDict
+from services.queries import PLAYER_FIELDS, PLAYERS_SELECT
+
+logger = logging.getLogger(__name__)
+
+
+class PlayerStore:
+    """
+    Shared, write-through cache of players_table rows.
+
+    Rows are kept in an LRU bounded by max_size and are considered stale after
+    ttl seconds. Every write made through the store returns the updated row,
+    which replaces the cached copy, so a warm command never re-reads a player.
+    """
+
+    def __init__(self, bot, max_size: int = 10000, ttl: float = 300.0):
+        self.bot = bot
+        self.max_size = max_size
+        self.ttl = ttl
+        self._rows: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._observers = []
+
+    # ---------- Cache bookkeeping ----------
+    def _lookup(self, player_id: int):
+        entry = self._rows.get(player_id)
+        if entry is None:
+            return None
+        stored_at, row = entry
+        if time.monotonic() - stored_at > self.ttl:
+            del self._rows[player_id]
+            return None
+        self._rows.move_to_end(player_id)
+        return row
+
+    def _store(self, row) -> dict:
+        row = {field: row[field] for field in PLAYER_FIELDS}
+        for observer in self._observers:
+            observer(row)
+        player_id = row["player_id"]
+        self._rows[player_id] = (time.monotonic(), row)
+        self._rows.move_to_end(player_id)
+        while len(self._rows) > self.max_size:
+            self._rows.popitem(last=False)
+            self.evictions += 1
+        return row
+
+    def invalidate(self, player_id: int):
+        """
+        Drops a player from the cache so the next read goes to the database.
+        """
+        self._rows.pop(player_id, None)
+        # Whatever changed the row, the replica may not have it yet
+        self.bot.db.note_write(player_id)
+
+    def refresh(self, rows):
+        """
+        Applies rows written outside the store (e.g. bulk payouts) to the players already
+        cached, without pulling the rest into the cache. Observers still see every row.
+        """
+        self.bot.db.note_write(*(row["player_id"] for row in rows))
+        for row in rows:
+            if row["player_id"] in self._rows:
+                self._store(row)
+                continue
+            row = {field: row[field] for field in PLAYER_FIELDS}
+            for observer in self._observers:
+                observer(row)
+
+    def clear(self):
+        self._rows.clear()
+
+    def observe(self, callback):
+        """
+        Calls callback(row) with every row the store loads or writes.
+        """
+        self._observers.append(callback)
+
+    def listen(self, listener, origin: str):
+        """
+        Evicts players updated by other processes. origin is this process's
+        application_name; notifications it sent itself are already written through.
+        """
+        def on_changed(payload: str):
+            player_id, _, sender = payload.partition(" ")
+            if sender != origin:
+                self.invalidate(int(player_id))
+
+        async def on_reconnect():
+            # Changes made while disconnected were missed
+            self.clear()
+
+        listener.subscribe("player_changed", on_changed, on_reconnect=on_reconnect)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._rows),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    # ---------- Reads ----------
+    async def get(self, player_id: int, guild_id=None, replica: bool = False) -> dict:
+        """
+        Returns the player's row, registering the player first if needed.
+        """
+        (row,) = await self.get_many(player_id, guild_id=guild_id, replica=replica)
+        return row
+
+    async def get_many(self, *player_ids: int, guild_id=None, replica: bool = False) -> list:
+        """
+        Returns the rows for the given players in order. Cached rows are served
+        from memory; all misses are loaded (and registered with guild_id's
+        starting loadout) on one connection. With replica=True, misses are read
+        from the read replica first and only unregistered players go to the primary.
+        """
+        found = {}
+        missing = []
+        for player_id in player_ids:
+            row = self._lookup(player_id)
+            if row is not None:
+                self.hits += 1
+                found[player_id] = row
+            elif player_id not in missing:
+                self.misses += 1
+                missing.append(player_id)
+
+        if missing and replica:
+            started = time.monotonic()
+            for row in await self.bot.db.fetch(PLAYERS_SELECT, missing, replica=True, session=missing):
+                # A write that landed while the replica was being read wins; load that player below
+                if not self.bot.db.written_since(row["player_id"], started):
+                    found[row["player_id"]] = self._store(row)
+            missing = [player_id for player_id in missing if player_id not in found]
+
+        if missing:
+            async with self.bot.db.acquire() as conn:
+                for row in await self._load(conn, missing, guild_id):
+                    found[row["player_id"]] = self._store(row)
+
+        return [dict(found[player_id]) for player_id in player_ids]
+
+    async def _load(self, conn, player_ids: list, guild_id=None) -> list:
+        registration_cog = self.bot.get_cog('Registration')
+        if registration_cog is None:
+            logger.error("Registration cog is not loaded. Unable to create player.")
+            raise Exception("Registration cog not found.")
+
+        rows = list(await registration_cog.fetch_or_register_players(conn, player_ids, guild_id))
+
+        # A row inserted concurrently after our snapshot is neither inserted nor visible; read it again
+        raced = set(player_ids) - {row["player_id"] for row in rows}
+        if raced:
+            rows += await self.bot.db.fetch(PLAYERS_SELECT, list(raced), conn=conn)
+        return rows
+
+    # ---------- Writes ----------
+    async def write(self, statement: str, *args, conn=None) -> list:
+        """
+        Runs a named write statement whose result rows include PLAYER_FIELDS and
+        stores every returned row in the cache. Returns the full result rows,
+        including any extra columns the statement selected.
+        """
+        rows = await self.bot.db.fetch(statement, *args, conn=conn)
+        self.bot.db.note_write(*(row["player_id"] for row in rows))
+        for row in rows:
+            self._store(row)
+        return [dict(row) for row in rows]
@@ -0,0 +1,629 @@
+from services.database import register_statement as statement
+
+# Columns every cached player row carries (see services/player_store.py).
+PLAYER_FIELDS = (
+    "player_id", "balance", "guns", "medkit", "vest", "is_vested",
+    "last_worked", "last_dead", "kills", "revives",
+)
+PLAYER_COLUMNS = ", ".join(PLAYER_FIELDS)
+
+# ---------- Players / Registration ----------
+PLAYERS_SELECT = statement("players.select", f"""
+    SELECT {PLAYER_COLUMNS} FROM players_table WHERE player_id = ANY($1::bigint[])
+""", read_only=True)
+
+PLAYERS_REGISTER = statement("players.register", """
+    INSERT INTO players_table (player_id, guns, medkit, vest, balance)
+    VALUES ($1, $2, $3, $4, $5)
+    ON CONFLICT (player_id) DO NOTHING
+""")
+
+PLAYERS_REGISTER_BATCH = statement("players.register_batch", """
+    INSERT INTO players_table (player_id, guns, medkit, vest, balance)
+    SELECT player_id, $2, $3, $4, $5 FROM unnest($1::bigint[]) AS ids(player_id)
+    ON CONFLICT (player_id) DO NOTHING
+""")
+
+# Rows inserted by the CTE are invisible to the outer snapshot, so the UNION never duplicates a player
+PLAYERS_FETCH_OR_REGISTER = statement("players.fetch_or_register", f"""
+    WITH inserted AS (
+        INSERT INTO players_table (player_id, guns, medkit, vest, balance)
+        SELECT player_id, $2, $3, $4, $5 FROM unnest($1::bigint[]) AS ids(player_id)
+        ON CONFLICT (player_id) DO NOTHING
+        RETURNING {PLAYER_COLUMNS}
+    )
+    SELECT {PLAYER_COLUMNS} FROM inserted
+    UNION ALL
+    SELECT {PLAYER_COLUMNS} FROM players_table WHERE player_id = ANY($1::bigint[])
+""")
+
+# ---------- Shoot ----------
+# Locks both players in player_id order (as LEDGER_LOCK_PLAYERS does), so A shooting B while B
+# shoots A can't deadlock. Only a newly inserted death counts as a kill: ON CONFLICT sees a death
+# a concurrent shot committed after this statement's snapshot, so a player is killed once.
+# Sides: "shooter" and "victim" when the shot landed, or "dead" when the victim was already dead
+# in guild $3. No rows means the shooter had no gun.
+SHOOT_RESOLVE = statement("shoot.resolve", f"""
+    WITH locked AS (
+        SELECT {PLAYER_COLUMNS}
+        FROM players_table
+        WHERE player_id = ANY(ARRAY[$1, $2]::bigint[])
+        ORDER BY player_id
+        FOR UPDATE
+    ), target AS (
+        SELECT t.*,
+               EXISTS (SELECT 1 FROM player_deaths AS d WHERE d.guild_id = $3 AND d.player_id = $2) AS is_dead
+        FROM locked AS t
+        WHERE t.player_id = $2 AND EXISTS (SELECT 1 FROM locked AS s WHERE s.player_id = $1 AND s.guns > 0)
+    ), death AS (
+        INSERT INTO player_deaths (guild_id, player_id, died_at)
+        SELECT $3::bigint, player_id, CURRENT_TIMESTAMP FROM target WHERE NOT is_vested AND NOT is_dead
+        ON CONFLICT (guild_id, player_id) DO NOTHING
+        RETURNING player_id
+    ), hit AS (
+        SELECT player_id, is_vested FROM target
+        WHERE (is_vested AND NOT is_dead) OR player_id IN (SELECT player_id FROM death)
+    ), shooter AS (
+        UPDATE players_table
+        SET guns = guns - 1,
+            kills = kills + CASE WHEN (SELECT is_vested FROM hit) THEN 0 ELSE 1 END
+        WHERE player_id = $1 AND EXISTS (SELECT 1 FROM hit)
+        RETURNING *
+    ), victim AS (
+        UPDATE players_table AS p
+        SET is_vested = FALSE,
+            vest = CASE WHEN h.is_vested THEN GREATEST(p.vest - 1, 0) ELSE p.vest END,
+            last_dead = CASE WHEN h.is_vested THEN p.last_dead ELSE CURRENT_TIMESTAMP END
+        FROM hit AS h
+        WHERE p.player_id = h.player_id
+        RETURNING p.*, h.is_vested AS was_vested
+    )
+    SELECT 'shooter' AS side, NULL::boolean AS was_vested, {PLAYER_COLUMNS} FROM shooter
+    UNION ALL
+    SELECT 'victim' AS side, was_vested, {PLAYER_COLUMNS} FROM victim
+    UNION ALL
+    SELECT 'dead' AS side, NULL::boolean, {PLAYER_COLUMNS} FROM target
+    WHERE NOT EXISTS (SELECT 1 FROM hit)
+""")
+
+# ---------- Revive ----------
+# The patient's death in guild $3 is only cleared if the medic actually had a medkit to spend
+REVIVE_USE_MEDKIT = statement("revive.use_medkit", f"""
+    WITH medic AS (
+        UPDATE players_table
+        SET medkit = medkit - 1,
+            revives = revives + CASE WHEN player_id = $2 THEN 0 ELSE 1 END
+        WHERE player_id = $1 AND medkit > 0
+        RETURNING *
+    ), revived AS (
+        DELETE FROM player_deaths
+        WHERE guild_id = $3 AND player_id = $2 AND EXISTS (SELECT 1 FROM medic)
+    )
+    SELECT 'medic' AS side, {PLAYER_COLUMNS} FROM medic
+""")
+
+# ---------- Death Expiry ----------
+DEATHS_PENDING = statement("deaths.pending", """
+    SELECT guild_id, player_id, died_at FROM player_deaths ORDER BY died_at
+""")
+
+# Only clears deaths that weren't revived or replaced by a newer death in the meantime
+DEATHS_EXPIRE = statement("deaths.expire", """
+    DELETE FROM player_deaths AS p
+    USING unnest($1::bigint[], $2::bigint[], $3::timestamptz[]) AS d(guild_id, player_id, died_at)
+    WHERE p.guild_id = d.guild_id AND p.player_id = d.player_id AND p.died_at = d.died_at
+    RETURNING p.guild_id, p.player_id
+""")
+
+# ---------- Guild Settings ----------
+GUILD_SETTINGS_COLUMNS = (
+    "shot_role_id, shot_timeout_seconds, shoot_cooldown_seconds, revive_cooldown_seconds, "
+    "start_guns, start_vest, start_medkit, start_balance"
+)
+
+GUILD_SETTINGS_ALL = statement("guild_settings.all", f"""
+    SELECT guild_id, {GUILD_SETTINGS_COLUMNS} FROM guild_settings_table
+""")
+
+GUILD_SETTINGS_ONE = statement("guild_settings.one", f"""
+    SELECT guild_id, {GUILD_SETTINGS_COLUMNS} FROM guild_settings_table WHERE guild_id = $1
+""")
+
+# NULL arguments keep the stored value
+GUILD_SETTINGS_UPSERT = statement("guild_settings.upsert", f"""
+    INSERT INTO guild_settings_table (guild_id, {GUILD_SETTINGS_COLUMNS})
+    VALUES ($1, $2, $3, $4, $5, $6, $7, $8, $9)
+    ON CONFLICT (guild_id) DO UPDATE SET
+        shot_role_id = COALESCE(EXCLUDED.shot_role_id, guild_settings_table.shot_role_id),
+        shot_timeout_seconds = COALESCE(EXCLUDED.shot_timeout_seconds, guild_settings_table.shot_timeout_seconds),
+        shoot_cooldown_seconds = COALESCE(EXCLUDED.shoot_cooldown_seconds, guild_settings_table.shoot_cooldown_seconds),
+        revive_cooldown_seconds = COALESCE(EXCLUDED.revive_cooldown_seconds, guild_settings_table.revive_cooldown_seconds),
+        start_guns = COALESCE(EXCLUDED.start_guns, guild_settings_table.start_guns),
+        start_vest = COALESCE(EXCLUDED.start_vest, guild_settings_table.start_vest),
+        start_medkit = COALESCE(EXCLUDED.start_medkit, guild_settings_table.start_medkit),
+        start_balance = COALESCE(EXCLUDED.start_balance, guild_settings_table.start_balance),
+        updated_at = CURRENT_TIMESTAMP
+    RETURNING guild_id, {GUILD_SETTINGS_COLUMNS}
+""")
+
+# ---------- Ledger ----------
+# party_type -> (key column in transfer_parties_table, its array type)
+LEDGER_PARTY_KEYS = {
+    "player": ("player_id", "bigint"),
+    "company": ("company_id", "int"),
+    "building": ("building_id", "int"),
+}
+
+# Party resolution: upsert the missing parties and return every requested party's ID.
+# `created` marks parties inserted by this (still uncommitted) transaction.
+LEDGER_PARTIES = {
+    party_type: statement(f"ledger.parties_{party_type}", f"""
+        WITH inserted AS (
+            INSERT INTO transfer_parties_table (party_type, {key})
+            SELECT '{party_type}', ref FROM unnest($1::{ref_type}[]) AS wanted(ref)
+            ON CONFLICT DO NOTHING
+            RETURNING party_id, {key} AS ref
+        )
+        SELECT party_id, ref, TRUE AS created FROM inserted
+        UNION ALL
+        SELECT party_id, {key}, FALSE FROM transfer_parties_table
+        WHERE party_type = '{party_type}' AND {key} = ANY($1::{ref_type}[])
+    """)
+    for party_type, (key, ref_type) in LEDGER_PARTY_KEYS.items()
+}
+
+# The market's escrow party is created once, by its migration
+LEDGER_PARTIES["market"] = statement("ledger.parties_market", """
+    SELECT t.party_id, wanted.ref, FALSE AS created
+    FROM transfer_parties_table AS t, unnest($1::int[]) AS wanted(ref)
+    WHERE t.party_type = 'market'
+""")
+
+# A party inserted concurrently after the upsert's snapshot is neither inserted nor visible
+# to it; this reads it back once that transaction has committed
+LEDGER_PARTIES_SELECT = {
+    party_type: statement(f"ledger.parties_select_{party_type}", f"""
+        SELECT party_id, {key} AS ref, FALSE AS created FROM transfer_parties_table
+        WHERE party_type = '{party_type}' AND {key} = ANY($1::{ref_type}[])
+    """)
+    for party_type, (key, ref_type) in LEDGER_PARTY_KEYS.items()
+}
+
+# Balances are locked in key order so concurrent batches can't deadlock
+LEDGER_LOCK_PLAYERS = statement("ledger.lock_players", """
+    SELECT player_id AS ref, balance FROM players_table
+    WHERE player_id = ANY($1::bigint[]) ORDER BY player_id FOR UPDATE
+""")
+
+LEDGER_LOCK_COMPANIES = statement("ledger.lock_companies", """
+    SELECT company_id AS ref, COALESCE(company_cash_reserve, 0) AS balance FROM companies_table
+    WHERE company_id = ANY($1::int[]) ORDER BY company_id FOR UPDATE
+""")
+
+LEDGER_LOCK_BUILDINGS = statement("ledger.lock_buildings", """
+    SELECT building_id AS ref, COALESCE(building_cash_reserve, 0) AS balance FROM buildings_table
+    WHERE building_id = ANY($1::int[]) ORDER BY building_id FOR UPDATE
+""")
+
+LEDGER_APPLY_PLAYERS = statement("ledger.apply_players", f"""
+    UPDATE players_table AS p
+    SET balance = p.balance + d.delta
+    FROM unnest($1::bigint[], $2::int[]) AS d(ref, delta)
+    WHERE p.player_id = d.ref
+    RETURNING {", ".join("p." + field for field in PLAYER_FIELDS)}
+""")
+
+# Reserves must stay positive or NULL (CHECK > 0), so an emptied reserve becomes NULL
+LEDGER_APPLY_COMPANIES = statement("ledger.apply_companies", """
+    UPDATE companies_table AS c
+    SET company_cash_reserve = NULLIF(COALESCE(c.company_cash_reserve, 0) + d.delta, 0)
+    FROM unnest($1::int[], $2::int[]) AS d(ref, delta)
+    WHERE c.company_id = d.ref
+""")
+
+LEDGER_APPLY_BUILDINGS = statement("ledger.apply_buildings", """
+    UPDATE buildings_table AS b
+    SET building_cash_reserve = NULLIF(COALESCE(b.building_cash_reserve, 0) + d.delta, 0)
+    FROM unnest($1::int[], $2::int[]) AS d(ref, delta)
+    WHERE b.building_id = d.ref
+""")
+
+# Snapshots the parties' current balances, as this transaction sees them, with the last
+# transfer of each party they include. The caller holds the parties' balance rows locked, so
+# every transfer left out is recorded after this commits, with a higher transaction_number.
+# The market's balance is the open buy orders' escrow, so it isn't snapshotted.
+LEDGER_SNAPSHOT = statement("ledger.snapshot", """
+    INSERT INTO balance_snapshots_table (party_id, balance, taken_at, last_transaction_number)
+    SELECT t.party_id, COALESCE(p.balance, c.company_cash_reserve, b.building_cash_reserve, 0),
+           clock_timestamp()::timestamp,
+           GREATEST(
+               (SELECT COALESCE(MAX(transaction_number), 0) FROM transactions_table
+                WHERE sender_party_id = t.party_id),
+               (SELECT COALESCE(MAX(transaction_number), 0) FROM transactions_table
+                WHERE recipient_party_id = t.party_id)
+           )
+    FROM transfer_parties_table AS t
+    LEFT JOIN players_table AS p ON t.party_type = 'player' AND p.player_id = t.player_id
+    LEFT JOIN companies_table AS c ON t.party_type = 'company' AND c.company_id = t.company_id
+    LEFT JOIN buildings_table AS b ON t.party_type = 'building' AND b.building_id = t.building_id
+    WHERE t.party_id = ANY($1::int[]) AND t.party_type <> 'market'
+""")
+
+# The latest snapshot by $2 plus the transfers it doesn't include, told apart by
+# transaction_number: a transfer committed after the snapshot may be stamped before it
+LEDGER_BALANCE_AT = statement("ledger.balance_at", """
+    WITH snapshot AS (
+        SELECT balance, last_transaction_number FROM balance_snapshots_table
+        WHERE party_id = $1 AND taken_at <= $2
+        ORDER BY taken_at DESC
+        LIMIT 1
+    )
+    SELECT s.balance + COALESCE((
+        SELECT SUM(CASE WHEN t.recipient_party_id = $1 THEN t.amount ELSE -t.amount END)
+        FROM transactions_table AS t
+        WHERE (t.sender_party_id = $1 OR t.recipient_party_id = $1)
+          AND t.transaction_number > s.last_transaction_number AND t.time_of_transaction <= $2
+    ), 0) AS balance
+    FROM snapshot AS s
+""")
+
+# ---------- Rankings ----------
+RANKINGS_TOP = {
+    column: statement(f"rankings.{column}", f"""
+        SELECT player_id, {column} AS score FROM players_table
+        WHERE {column} IS NOT NULL
+        ORDER BY {column} DESC, player_id
+        LIMIT $1
+    """, read_only=True)
+    for column in ("balance", "kills", "revives")
+}
+
+# ---------- Rate Limits ----------
+# Takes one token from every bucket, or from none if any bucket is empty. Returns whether
+# the hit was allowed and, if not, how long until every bucket has a token again and the
+# bucket that takes longest to refill.
+RATE_LIMIT_HIT = statement("rate_limits.hit", """
+    WITH input AS (
+        SELECT * FROM unnest($1::text[], $2::float8[], $3::float8[]) AS i(bucket_key, capacity, refill_rate)
+    ),
+    locked AS (
+        SELECT bucket_key, tokens, updated_at FROM rate_limit_buckets
+        WHERE bucket_key = ANY($1::text[])
+        FOR UPDATE
+    ),
+    state AS (
+        SELECT i.bucket_key, i.capacity, i.refill_rate,
+               COALESCE(LEAST(i.capacity, l.tokens + EXTRACT(EPOCH FROM now() - l.updated_at) * i.refill_rate),
+                        i.capacity) AS tokens
+        FROM input i LEFT JOIN locked l ON l.bucket_key = i.bucket_key
+    ),
+    decision AS (
+        SELECT bool_and(tokens >= 1) AS allowed FROM state
+    ),
+    written AS (
+        INSERT INTO rate_limit_buckets (bucket_key, tokens, updated_at, full_at)
+        SELECT s.bucket_key, s.tokens - spent, now(),
+               now() + make_interval(secs => (s.capacity - (s.tokens - spent)) / s.refill_rate)
+        FROM state s, decision d, LATERAL (SELECT CASE WHEN d.allowed THEN 1 ELSE 0 END AS spent) c
+        ON CONFLICT (bucket_key) DO UPDATE SET
+            tokens = EXCLUDED.tokens, updated_at = EXCLUDED.updated_at, full_at = EXCLUDED.full_at
+    )
+    SELECT d.allowed,
+           COALESCE(MAX(CASE WHEN s.tokens < 1 THEN (1 - s.tokens) / s.refill_rate END), 0) AS retry_after,
+           (array_agg(s.bucket_key ORDER BY (1 - s.tokens) / s.refill_rate DESC)
+               FILTER (WHERE s.tokens < 1))[1] AS bucket_key
+    FROM state s, decision d
+    GROUP BY d.allowed
+""")
+
+# Buckets that have refilled completely hold no state worth keeping
+RATE_LIMIT_PRUNE = statement("rate_limits.prune", """
+    DELETE FROM rate_limit_buckets WHERE full_at < now()
+""")
+
+# ---------- Economy ----------
+# party_type -> (table, key column, balance column)
+ECONOMY_ACCOUNTS = {
+    "player": ("players_table", "player_id", "balance"),
+    "company": ("companies_table", "company_id", "company_cash_reserve"),
+    "building": ("buildings_table", "building_id", "building_cash_reserve"),
+}
+
+def _balance_change(party_type: str, sign: str) -> str:
+    _, _, column = ECONOMY_ACCOUNTS[party_type]
+    if party_type == "player":
+        return f"{column} = a.{column} {sign} t.total"
+    # Reserves must stay positive or NULL (CHECK > 0), as in the ledger
+    return f"{column} = NULLIF(COALESCE(a.{column}, 0) {sign} t.total, 0)"
+
+def economy_payout(name: str, payouts: str, payer: str, payee: str, payee_extra: str = "") -> str:
+    """
+    Registers one set-based payout step. `payouts` selects (payer, payee, amount) rows;
+    each payer's rows are paid in payee order for as long as its locked balance covers
+    them and the net changes are applied with one UPDATE per side. Payers, then payees,
+    are locked in key order (as SHOOT_RESOLVE and the ledger lock players) and the UPDATEs
+    only reach rows already locked, so a payout can't deadlock against them. Returns one row per payment (payer, payee, amount) with the changed player's
+    columns, for the ledger to record in the same transaction.
+    """
+    payer_table, payer_key, payer_balance = ECONOMY_ACCOUNTS[payer]
+    payee_table, payee_key, _ = ECONOMY_ACCOUNTS[payee]
+    players, player_side = ("debited", "payer") if payer == "player" else ("credited", "payee")
+    return statement(name, f"""
+        WITH payouts AS ({payouts}),
+        locked AS (
+            SELECT {payer_key} AS ref, COALESCE({payer_balance}, 0) AS available FROM {payer_table}
+            WHERE {payer_key} IN (SELECT payer FROM payouts)
+            ORDER BY {payer_key}
+            FOR UPDATE
+        ), paid AS (
+            SELECT payer, payee, amount FROM (
+                SELECT o.payer, o.payee, o.amount, l.available,
+                       SUM(o.amount) OVER (PARTITION BY o.payer ORDER BY o.payee) AS running
+                FROM payouts AS o JOIN locked AS l ON l.ref = o.payer
+                WHERE o.amount > 0
+            ) AS ranked
+            WHERE running <= available
+        ), payees AS (
+            SELECT {payee_key} AS ref FROM {payee_table}
+            WHERE {payee_key} IN (SELECT payee FROM paid)
+            ORDER BY {payee_key}
+            FOR UPDATE
+        ), debited AS (
+            UPDATE {payer_table} AS a SET {_balance_change(payer, "-")}
+            FROM (SELECT payer AS ref, SUM(amount) AS total FROM paid GROUP BY payer) AS t
+            WHERE a.{payer_key} = t.ref
+            RETURNING a.*
+        ), credited AS (
+            UPDATE {payee_table} AS a SET {_balance_change(payee, "+")}{payee_extra}
+            FROM (
+                SELECT e.ref, SUM(p.amount) AS total FROM paid AS p JOIN payees AS e ON e.ref = p.payee
+                GROUP BY e.ref
+            ) AS t
+            WHERE a.{payee_key} = t.ref
+            RETURNING a.*
+        )
+        SELECT paid.payer, paid.payee, paid.amount, {", ".join("x." + field for field in PLAYER_FIELDS)}
+        FROM paid JOIN {players} AS x ON x.player_id = paid.{player_side}
+    """)
+
+# Buildings pay their employees; being paid counts as having worked that day
+ECONOMY_WAGES = economy_payout("economy.wages", """
+    SELECT building_id AS payer, player_id AS payee, wage AS amount FROM building_employment_table
+""", payer="building", payee="player", payee_extra=", last_worked = CURRENT_DATE")
+
+ECONOMY_DIVIDENDS = economy_payout("economy.dividends", """
+    SELECT company_id AS payer, player_id AS payee, shareholder_wage AS amount FROM shareholders_table
+""", payer="company", payee="player")
+
+# The government (player 0) pays each bank interest on its reserve. interest_rate is per
+# day; $1 is the tick's length in days.
+ECONOMY_INTEREST = economy_payout("economy.interest", """
+    SELECT 0::bigint AS payer, k.bank_id AS payee,
+           FLOOR(COALESCE(b.building_cash_reserve, 0) * k.interest_rate * $1::numeric)::int AS amount
+    FROM building_banks_table AS k
+    JOIN buildings_table AS b ON b.building_id = k.bank_id
+""", payer="player", payee="building")
+
+ECONOMY_TICK_START = statement("economy.tick_start", """
+    INSERT INTO economy_ticks (tick_id) VALUES ($1) ON CONFLICT (tick_id) DO NOTHING
+""")
+
+ECONOMY_TICK_FINISH = statement("economy.tick_finish", """
+    UPDATE economy_ticks SET finished_at = now() WHERE tick_id = $1 AND finished_at IS NULL
+""")
+
+ECONOMY_TICK_FINISHED = statement("economy.tick_finished", """
+    SELECT finished_at IS NOT NULL FROM economy_ticks WHERE tick_id = $1
+""")
+
+# Ticks that started but never finished (e.g. the process crashed mid-tick)
+ECONOMY_TICKS_UNFINISHED = statement("economy.ticks_unfinished", """
+    SELECT tick_id FROM economy_ticks WHERE finished_at IS NULL AND tick_id < $1 ORDER BY tick_id
+""")
+
+# Claims a step inside its payout's transaction; no row back means it already ran
+ECONOMY_STEP_CLAIM = statement("economy.step_claim", """
+    INSERT INTO economy_tick_steps (tick_id, step) VALUES ($1, $2)
+    ON CONFLICT (tick_id, step) DO NOTHING
+    RETURNING tick_id
+""")
+
+ECONOMY_STEP_RECORD = statement("economy.step_record", """
+    UPDATE economy_tick_steps SET payments = $3, amount = $4, duration_ms = $5
+    WHERE tick_id = $1 AND step = $2
+""")
+
+# ---------- Market ----------
+MARKET_ITEMS = ("guns", "vest", "medkit")
+MARKET_ORDER_COLUMNS = "order_id, item, side, player_id, building_id, price, remaining"
+
+MARKET_ORDERS_OPEN = statement("market.orders_open", f"""
+    SELECT {MARKET_ORDER_COLUMNS} FROM market_orders WHERE remaining > 0 ORDER BY order_id
+""")
+
+# Placing an order escrows what it could cost: the full limit price for a buy, the items for
+# a sell. A buy is refused if filling it (and the player's other open buys) would pass the
+# 127-item cap.
+MARKET_PLACE = {}
+for _item in MARKET_ITEMS:
+    MARKET_PLACE[("buy", _item)] = statement(f"market.buy_{_item}", f"""
+        WITH pending AS (
+            SELECT COALESCE(SUM(remaining), 0) AS quantity FROM market_orders
+            WHERE player_id = $1 AND item = '{_item}' AND side = 'buy' AND remaining > 0
+        ), escrow AS (
+            UPDATE players_table
+            SET balance = balance - $2::int * $3::int
+            WHERE player_id = $1 AND balance >= $2::bigint * $3::int
+              AND {_item} + $2::int + (SELECT quantity FROM pending) <= 127
+            RETURNING {PLAYER_COLUMNS}
+        ), placed AS (
+            INSERT INTO market_orders (item, side, player_id, price, quantity, remaining)
+            SELECT '{_item}', 'buy', player_id, $3::int, $2::int, $2::int FROM escrow
+            RETURNING order_id
+        )
+        SELECT placed.order_id, escrow.* FROM escrow, placed
+    """)
+    MARKET_PLACE[("sell", _item)] = statement(f"market.sell_{_item}", f"""
+        WITH escrow AS (
+            UPDATE players_table
+            SET {_item} = {_item} - $2::int
+            WHERE player_id = $1 AND {_item} >= $2::int
+            RETURNING {PLAYER_COLUMNS}
+        ), placed AS (
+            INSERT INTO market_orders (item, side, player_id, price, quantity, remaining)
+            SELECT '{_item}', 'sell', player_id, $3::int, $2::int, $2::int FROM escrow
+            RETURNING order_id
+        )
+        SELECT placed.order_id, escrow.* FROM escrow, placed
+    """)
+del _item
+
+# Returns whatever is still escrowed: the unspent price of a buy, the unsold items of a sell.
+# A sell order isn't cancelled (fits is false) if its items, with the player's open buys of
+# the same item, would take them past the 127-item cap.
+MARKET_CANCEL = statement("market.cancel", f"""
+    WITH target AS (
+        SELECT o.order_id, o.item, o.side, o.price, o.remaining,
+               o.side = 'buy' OR (
+                   CASE o.item {" ".join(f"WHEN '{item}' THEN p.{item}" for item in MARKET_ITEMS)} END
+                   + o.remaining
+                   + (SELECT COALESCE(SUM(b.remaining), 0) FROM market_orders AS b
+                      WHERE b.player_id = $2 AND b.item = o.item AND b.side = 'buy' AND b.remaining > 0)
+               ) <= 127 AS fits
+        FROM market_orders AS o JOIN players_table AS p ON p.player_id = o.player_id
+        WHERE o.order_id = $1 AND o.player_id = $2 AND o.remaining > 0
+        FOR UPDATE OF o, p
+    ), cancelled AS (
+        UPDATE market_orders AS o SET remaining = 0, cancelled_at = now()
+        FROM target AS t WHERE o.order_id = t.order_id AND t.fits
+    ), returned AS (
+        UPDATE players_table AS p
+        SET balance = p.balance + CASE WHEN t.side = 'buy' THEN t.price * t.remaining ELSE 0 END,
+            {", ".join(
+                f"{item} = p.{item} + CASE WHEN t.side = 'sell' AND t.item = '{item}' THEN t.remaining ELSE 0 END"
+                for item in MARKET_ITEMS
+            )}
+        FROM target AS t
+        WHERE p.player_id = $2 AND t.fits
+        RETURNING p.*
+    )
+    SELECT t.fits, t.side, t.price, t.remaining AS refunded, {", ".join("r." + field for field in PLAYER_FIELDS)}
+    FROM target AS t LEFT JOIN returned AS r ON TRUE
+""")
+
+# Every factory produces $1 more units, and its whole stock is listed at its item's price
+MARKET_FACTORY_LIST = statement("market.factory_list", f"""
+    WITH stocked AS (
+        SELECT factory_id, factory_type, LEAST(factory_inventory + $1::int, 32767) AS stock
+        FROM building_factories_table
+        WHERE factory_type = ANY($2::text[])
+        FOR UPDATE
+    ), emptied AS (
+        UPDATE building_factories_table AS f SET factory_inventory = 0
+        FROM stocked AS s WHERE f.factory_id = s.factory_id AND s.stock > 0
+    )
+    INSERT INTO market_orders (item, side, building_id, price, quantity, remaining)
+    SELECT s.factory_type, 'sell', s.factory_id, p.price, s.stock, s.stock
+    FROM stocked AS s
+    JOIN unnest($2::text[], $3::int[]) AS p(item, price) ON p.item = s.factory_type
+    WHERE s.stock > 0
+    RETURNING {MARKET_ORDER_COLUMNS}
+""")
+
+# ---- Settlement (one transaction per batch of trades) ----
+MARKET_SETTLE_ORDERS = statement("market.settle_orders", """
+    UPDATE market_orders AS o
+    SET remaining = d.remaining
+    FROM unnest($1::bigint[], $2::int[]) AS d(order_id, remaining)
+    WHERE o.order_id = d.order_id
+""")
+
+# Locks the players a batch settles, in player_id order, so their items can be checked
+# against the 127-item cap before anything is delivered
+MARKET_LOCK_PLAYERS = statement("market.lock_players", f"""
+    SELECT player_id, {", ".join(MARKET_ITEMS)} FROM players_table
+    WHERE player_id = ANY($1::bigint[]) ORDER BY player_id FOR UPDATE
+""")
+
+# Buyers get their items and any escrow they didn't spend back; player sellers get paid
+MARKET_SETTLE_PLAYERS = statement("market.settle_players", f"""
+    UPDATE players_table AS p
+    SET balance = p.balance + d.balance,
+        {", ".join(f"{item} = p.{item} + d.{item}" for item in MARKET_ITEMS)}
+    FROM unnest($1::bigint[], $2::int[], $3::int[], $4::int[], $5::int[])
+        AS d(player_id, balance, {", ".join(MARKET_ITEMS)})
+    WHERE p.player_id = d.player_id
+    RETURNING {", ".join("p." + field for field in PLAYER_FIELDS)}
+""")
+
+MARKET_SETTLE_BUILDINGS = statement("market.settle_buildings", """
+    UPDATE buildings_table AS b
+    SET building_cash_reserve = COALESCE(b.building_cash_reserve, 0) + d.amount
+    FROM unnest($1::int[], $2::int[]) AS d(building_id, amount)
+    WHERE b.building_id = d.building_id
+""")
+
+# Lists units a buyer couldn't take delivery of again, for the player or factory that sold them
+MARKET_RELIST = statement("market.relist", f"""
+    INSERT INTO market_orders (item, side, player_id, building_id, price, quantity, remaining)
+    SELECT item, 'sell', player_id, building_id, price, quantity, quantity
+    FROM unnest($1::text[], $2::bigint[], $3::int[], $4::int[], $5::int[])
+        AS r(item, player_id, building_id, price, quantity)
+    RETURNING {MARKET_ORDER_COLUMNS}
+""")
+
+# ---------- Combat Log ----------
+# Counters kept per player in combat_totals and combat_weekly (see services/combat_log.py)
+COMBAT_COUNTERS = ("kills", "deaths", "vests_broken", "vest_saves", "revives_given", "revives_received")
+COMBAT_EVENT_COLUMNS = ["occurred_at", "guild_id", "kind", "actor_id", "target_id"]
+
+def _combat_counter_updates(table: str) -> str:
+    return ", ".join(f"{counter} = {table}.{counter} + EXCLUDED.{counter}" for counter in COMBAT_COUNTERS)
+
+def _combat_counter_arrays(first: int) -> str:
+    return ", ".join(f"${first + i}::int[]" for i in range(len(COMBAT_COUNTERS)))
+
+COMBAT_PARTITION = statement("combat.partition", """
+    SELECT combat_events_partition($1)
+""")
+
+# Rows arrive sorted by key so concurrent flushes from several workers lock them in the same order
+COMBAT_TOTALS_ADD = statement("combat.totals_add", f"""
+    INSERT INTO combat_totals (player_id, {", ".join(COMBAT_COUNTERS)}, last_event_at)
+    SELECT * FROM unnest($1::bigint[], {_combat_counter_arrays(2)}, ${2 + len(COMBAT_COUNTERS)}::timestamptz[])
+    ON CONFLICT (player_id) DO UPDATE SET
+        {_combat_counter_updates("combat_totals")},
+        last_event_at = GREATEST(combat_totals.last_event_at, EXCLUDED.last_event_at)
+""")
+
+COMBAT_WEEKLY_ADD = statement("combat.weekly_add", f"""
+    INSERT INTO combat_weekly (player_id, week, {", ".join(COMBAT_COUNTERS)})
+    SELECT * FROM unnest($1::bigint[], $2::date[], {_combat_counter_arrays(3)})
+    ON CONFLICT (player_id, week) DO UPDATE SET
+        {_combat_counter_updates("combat_weekly")}
+""")
+
+COMBAT_RIVALS_ADD = statement("combat.rivals_add", """
+    INSERT INTO combat_rivals (killer_id, victim_id, kills)
+    SELECT * FROM unnest($1::bigint[], $2::bigint[], $3::int[])
+    ON CONFLICT (killer_id, victim_id) DO UPDATE SET kills = combat_rivals.kills + EXCLUDED.kills
+""")
+
+# One player's all-time and this-week ($2) counters: two primary key lookups
+COMBAT_PLAYER_STATS = statement("combat.player_stats", f"""
+    SELECT {", ".join(f"COALESCE(t.{counter}, 0) AS {counter}" for counter in COMBAT_COUNTERS)},
+           {", ".join(f"COALESCE(w.{counter}, 0) AS week_{counter}" for counter in COMBAT_COUNTERS)},
+           t.last_event_at
+    FROM (SELECT $1::bigint AS player_id) AS p
+    LEFT JOIN combat_totals AS t ON t.player_id = p.player_id
+    LEFT JOIN combat_weekly AS w ON w.player_id = p.player_id AND w.week = $2
+""", read_only=True)
+
+# The player's most-killed victim and the player who killed them most, each one index probe
+COMBAT_PLAYER_RIVALS = statement("combat.player_rivals", """
+    (SELECT 'victim' AS side, victim_id AS other_id, kills FROM combat_rivals
+     WHERE killer_id = $1 ORDER BY kills DESC, victim_id LIMIT 1)
+    UNION ALL
+    (SELECT 'nemesis', killer_id, kills FROM combat_rivals
+     WHERE victim_id = $1 ORDER BY kills DESC, killer_id LIMIT 1)
+""", read_only=True)
@@ -0,0 +1,125 @@
+import asyncio
+import bisect
+import logging
+from services.queries import RANKINGS_TOP
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = ("balance", "kills", "revives")
+
+
+class Ranking:
+    """
+    Top-N players for one players_table column.
+
+    Holds up to size + slack players in a sorted list. Invariant: every player
+    scoring strictly above `floor` is tracked, so the tracked entries above the
+    floor are an exact prefix of the global ranking. Updates move players in and
+    out of that prefix without touching the database; only when too few trusted
+    entries are left does the ranking need a reload.
+    """
+
+    def __init__(self, column: str, size: int, slack: int):
+        self.column = column
+        self.size = size
+        self.capacity = size + slack
+        self._scores = {}
+        self._order = []  # sorted (-score, player_id)
+        self.floor = None  # None: every player is tracked
+        self.stale = True
+
+    def load(self, rows):
+        self._scores = {row["player_id"]: row["score"] for row in rows}
+        self._order = sorted((-score, player_id) for player_id, score in self._scores.items())
+        self.floor = -self._order[-1][0] if len(rows) >= self.capacity else None
+        self.stale = False
+
+    def observe(self, player_id, score):
+        if score is None:
+            return
+        old = self._scores.get(player_id)
+        if old == score:
+            return
+        if old is not None:
+            self._order.pop(bisect.bisect_left(self._order, (-old, player_id)))
+            del self._scores[player_id]
+
+        if self.floor is None or score > self.floor:
+            self._scores[player_id] = score
+            bisect.insort(self._order, (-score, player_id))
+            if len(self._order) > self.capacity:
+                lowest, dropped = self._order.pop()
+                del self._scores[dropped]
+                self.floor = -lowest if self.floor is None else max(self.floor, -lowest)
+
+        if self.floor is not None and self.trusted() < self.size:
+            self.stale = True
+
+    def trusted(self) -> int:
+        """
+        Number of leading entries guaranteed to be in their true positions.
+        """
+        if self.floor is None:
+            return len(self._order)
+        return bisect.bisect_left(self._order, (-self.floor,))
+
+    def page(self, offset: int, limit: int) -> list:
+        end = min(offset + limit, self.size, self.trusted())
+        return [(player_id, -negative) for negative, player_id in self._order[offset:end]]
+
+
+class Rankings:
+    """
+    In-memory leaderboards fed by the player store's write-through updates.
+
+    Rankings load once from the rank indexes and then follow every player row the
+    store sees. A periodic refresh picks up changes made outside this process (other
+    shard workers, set-based economy updates).
+    """
+
+    def __init__(self, bot, size: int = 100, slack: int = 100, refresh_interval: float = 300.0):
+        self.bot = bot
+        self.refresh_interval = refresh_interval
+        self.rankings = {column: Ranking(column, size, slack) for column in CATEGORIES}
+        self._task = None
+        self._reloading = {}
+        bot.player_store.observe(self._on_player)
+
+    async def start(self):
+        await self.refresh()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+
+    async def refresh(self, column: str = None):
+        for ranking in ([self.rankings[column]] if column else self.rankings.values()):
+            # A replica a few seconds behind is fine: newer writes reach us through the player store
+            rows = await self.bot.db.fetch(RANKINGS_TOP[ranking.column], ranking.capacity, replica=True)
+            ranking.load(rows)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Failed to refresh rankings: %s", e)
+
+    def _on_player(self, row):
+        for column, ranking in self.rankings.items():
+            ranking.observe(row["player_id"], row[column])
+
+    async def page(self, column: str, offset: int, limit: int) -> list:
+        """
+        Returns [(player_id, score)] for the requested slice of the leaderboard.
+        """
+        ranking = self.rankings[column]
+        if ranking.stale:
+            # Concurrent requests share one reload
+            task = self._reloading.get(column)
+            if task is None or task.done():
+                task = self._reloading[column] = asyncio.create_task(self.refresh(column))
+            await task
+        return ranking.page(offset, limit)
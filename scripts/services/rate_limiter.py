@@ -0,0 +1,190 @@
+import time
+import asyncio
+import logging
+from discord import app_commands
+from services.queries import RATE_LIMIT_HIT, RATE_LIMIT_PRUNE
+
+logger = logging.getLogger(__name__)
+
+USER = "user"
+GUILD = "guild"
+COMMAND = "command"
+
+
+class Limit:
+    """
+    One token bucket per command and scope: `rate` uses every `per` seconds.
+
+    rate and per may be callables taking the interaction, for limits that come from
+    guild settings; a per of 0 disables the limit. Shared limits are also enforced
+    through the database so they hold across workers and restarts.
+    """
+
+    __slots__ = ("scope", "rate", "per", "shared")
+
+    def __init__(self, scope: str, rate, per, shared: bool = False):
+        if scope not in (USER, GUILD, COMMAND):
+            raise ValueError(f"Unknown rate limit scope {scope!r}.")
+        self.scope = scope
+        self.rate = rate
+        self.per = per
+        self.shared = shared
+
+    def resolve(self, interaction):
+        rate = self.rate(interaction) if callable(self.rate) else self.rate
+        per = self.per(interaction) if callable(self.per) else self.per
+        return rate, per
+
+    def key(self, command: str, interaction) -> str:
+        if self.scope == USER:
+            return f"{command}:user:{interaction.user.id}"
+        if self.scope == GUILD:
+            return f"{command}:guild:{interaction.guild_id}"
+        return f"{command}:command"
+
+
+class RateLimiter:
+    """
+    Token bucket rate limiter for app commands.
+
+    Every hit is checked against the in-memory buckets first; since they only count this
+    process's uses, an empty local bucket is always a correct rejection and costs nothing.
+    Hits that pass locally and touch shared limits are then checked against the shared
+    buckets in one statement, when a database is configured. Checks run before the
+    interaction is deferred, so a shared check that takes longer than shared_timeout
+    seconds (or fails) falls back to the local buckets alone. A shared rejection gives
+    back the tokens the hit took locally.
+    """
+
+    def __init__(self, db=None, prune_interval: float = 60.0, shared_timeout: float = 0.5):
+        self.db = db
+        self.prune_interval = prune_interval
+        self.shared_timeout = shared_timeout
+        self._buckets = {}  # key -> [tokens, updated, capacity, refill_rate]
+        self._task = None
+        self.allowed = 0
+        self.rejected_local = 0
+        self.rejected_shared = 0
+        self.shared_fallbacks = 0
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        if self._task:
+            self._task.cancel()
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.prune_interval)
+            self._prune_local()
+            if self.db is not None:
+                try:
+                    await self.db.execute(RATE_LIMIT_PRUNE)
+                except Exception as e:
+                    logger.error("Failed to prune shared rate limit buckets: %s", e)
+
+    def _prune_local(self):
+        now = time.monotonic()
+        full = [
+            key for key, (tokens, updated, capacity, refill_rate) in self._buckets.items()
+            if tokens + (now - updated) * refill_rate >= capacity
+        ]
+        for key in full:
+            del self._buckets[key]
+
+    async def hit(self, command: str, interaction, limits) -> tuple:
+        """
+        Takes one token from each applicable bucket, or none if any is empty.
+        Returns (None, 0.0) when allowed, otherwise (rejecting Cooldown, retry_after).
+        """
+        buckets = []
+        for limit in limits:
+            rate, per = limit.resolve(interaction)
+            if not rate or not per:
+                continue
+            buckets.append((limit.key(command, interaction), rate, per, limit.shared))
+        if not buckets:
+            return None, 0.0
+
+        cooldown, retry_after = self._hit_local(buckets)
+        if cooldown is not None:
+            self.rejected_local += 1
+            return cooldown, retry_after
+
+        shared = [bucket for bucket in buckets if bucket[3]]
+        if shared and self.db is not None:
+            try:
+                row = await asyncio.wait_for(self.db.fetchrow(
+                    RATE_LIMIT_HIT,
+                    [key for key, _, _, _ in shared],
+                    [float(rate) for _, rate, _, _ in shared],
+                    [rate / per for _, rate, per, _ in shared]
+                ), timeout=self.shared_timeout)
+            except asyncio.TimeoutError:
+                self.shared_fallbacks += 1
+                logger.warning("Shared rate limit check took over %.1fs; using local buckets only.", self.shared_timeout)
+                row = None
+            except Exception as e:
+                self.shared_fallbacks += 1
+                logger.warning("Shared rate limit check failed; using local buckets only: %s", e)
+                row = None
+            if row is not None and not row["allowed"]:
+                self.rejected_shared += 1
+                self._refund_local(buckets)
+                _, rate, per, _ = next(bucket for bucket in shared if bucket[0] == row["bucket_key"])
+                return app_commands.Cooldown(rate, per), row["retry_after"]
+
+        self.allowed += 1
+        return None, 0.0
+
+    def _hit_local(self, buckets) -> tuple:
+        now = time.monotonic()
+        states = []
+        cooldown, retry_after = None, 0.0
+        for key, rate, per, _ in buckets:
+            refill_rate = rate / per
+            state = self._buckets.get(key)
+            tokens = rate if state is None else min(rate, state[0] + (now - state[1]) * refill_rate)
+            if tokens < 1:
+                wait = (1 - tokens) / refill_rate
+                if wait > retry_after:
+                    cooldown, retry_after = app_commands.Cooldown(rate, per), wait
+            states.append((key, tokens, rate, refill_rate))
+
+        if cooldown is not None:
+            return cooldown, retry_after
+        for key, tokens, capacity, refill_rate in states:
+            self._buckets[key] = [tokens - 1, now, capacity, refill_rate]
+        return None, 0.0
+
+    def _refund_local(self, buckets):
+        for key, _, _, _ in buckets:
+            state = self._buckets.get(key)
+            if state is not None:
+                state[0] = min(state[2], state[0] + 1)
+
+    def stats(self) -> dict:
+        return {
+            "buckets": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected_local": self.rejected_local,
+            "rejected_shared": self.rejected_shared,
+            "shared_fallbacks": self.shared_fallbacks,
+        }
+
+
+def rate_limit(*limits: Limit):
+    """
+    App command check enforcing the given limits through bot.rate_limiter. Checks run
+    before the command body, so rejected hits never reach the database.
+    Raises app_commands.CommandOnCooldown when a bucket is empty.
+    """
+    async def predicate(interaction) -> bool:
+        command = interaction.command.qualified_name
+        cooldown, retry_after = await interaction.client.rate_limiter.hit(command, interaction, limits)
+        if cooldown is not None:
+            raise app_commands.CommandOnCooldown(cooldown, retry_after)
+        return True
+
+    return app_commands.check(predicate)
@@ -21,14 +21,13 @@ const MAIN_SCRIPT_PATH: &str = "scripts/main.py";
 const CONFIG_PATH: &str = "config";
 const ENV_FILE_PATH: &str = "config/.env";
 
-const INIT_SQL: &str = "migrations/init.sql";
-const SEED_SQL: &str = "migrations/seed.sql";
+const MIGRATE_SCRIPT_PATH: &str = "scripts/migrate.py";
 
 fn main() -> io::Result<()> {
     println!("Current working directory: {}", env::current_dir()?.display());
 
     create_env_file_if_missing()?;
-    run_sql_db()?;
+    run_migrations()?;
     run_python_script()?;
 
     println!("All setup steps completed successfully.");
@@ -64,61 +63,26 @@ fn create_env_file_if_missing() -> io::Result<()> {
     Ok(())
 }
 
-fn run_sql_db() -> io::Result<()> {
-    dotenv::from_filename(ENV_FILE_PATH).expect("Failed to load .env file from config/");
-
-    let db_user = env::var("DB_USER").expect("DB_USER not set in .env");
-    let db_password = env::var("DB_PASSWORD").expect("DB_PASSWORD not set in .env");
-    let db_name = env::var("DB_NAME").expect("DB_NAME not set in .env");
-    let db_host = env::var("DB_HOST").unwrap_or_else(|_| "localhost".to_string());
-    let db_port = env::var("DB_PORT").unwrap_or_else(|_| "5432".to_string());
-
+fn run_migrations() -> io::Result<()> {
     if !Path::new("data").exists() {
         println!("Creating data directory...");
         fs::create_dir_all("data")?;
     }
 
-    println!("Connecting to PostgreSQL database...");
-
-    // Schema initialization
-    run_psql_command(&db_user, &db_password, &db_host, &db_port, &db_name, INIT_SQL)?;
-
-    println!("Schema created successfully.");
-
-    // Seed database
-    run_psql_command(&db_user, &db_password, &db_host, &db_port, &db_name, SEED_SQL)?;
-
-    println!("Database seeded successfully.");
+    println!("Applying database migrations...");
 
-    Ok(())
-}
-
-fn run_psql_command(
-    user: &str,
-    password: &str,
-    host: &str,
-    port: &str,
-    db: &str,
-    file: &str,
-) -> io::Result<()> {
-    let status = Command::new("psql")
-        .arg("-U")
-        .arg(user)
-        .arg("-h")
-        .arg(host)
-        .arg("-p")
-        .arg(port)
-        .arg("-d")
-        .arg(db)
-        .arg("-f")
-        .arg(file)
-        .env("PGPASSWORD", password)
-        .status()?;
+    // The runner reads the DB_* settings from config/.env and skips migrations already applied
+    let status = Command::new("python3")
+        .arg(MIGRATE_SCRIPT_PATH)
+        .status()
+        .expect("Failed to execute the migration runner");
 
     if !status.success() {
-        panic!("Failed to execute SQL file: {}", file);
+        panic!("Failed to apply database migrations.");
     }
 
+    println!("Database schema is up to date.");
+
     Ok(())
 }
 
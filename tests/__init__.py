@@ -0,0 +1,16 @@
+"""
+Unit tests for the in-memory services, and integration tests against a scratch Postgres
+database.
+
+    TEST_DB_NAME=wd_test python3 -m unittest discover -s tests -t .
+
+Connection settings come from TEST_DB_HOST, TEST_DB_PORT, TEST_DB_USER, TEST_DB_PASSWORD and
+TEST_DB_NAME; without TEST_DB_NAME only the unit tests run and every DatabaseTestCase is
+skipped. Pending migrations are applied to that database, and test players use IDs from
+TEST_ID_BASE upwards.
+"""
+import sys
+from pathlib import Path
+
+# The bot's packages (services, cogs) live in scripts/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
@@ -0,0 +1,45 @@
+import os
+import unittest
+import asyncpg
+from services.database import Database
+from services.migrations import migrate
+import services.queries  # Registers the named statements
+
+TEST_ID_BASE = 800_000_000_000_000_000
+
+
+def test_database(**kwargs) -> Database:
+    return Database(
+        user=os.getenv("TEST_DB_USER", "postgres"),
+        password=os.getenv("TEST_DB_PASSWORD"),
+        database=os.getenv("TEST_DB_NAME"),
+        host=os.getenv("TEST_DB_HOST", "localhost"),
+        port=int(os.getenv("TEST_DB_PORT", "5432")),
+        **kwargs
+    )
+
+
+@unittest.skipUnless(os.getenv("TEST_DB_NAME"), "TEST_DB_NAME is not set")
+class DatabaseTestCase(unittest.IsolatedAsyncioTestCase):
+    """
+    Starts a Database (min_size=1, max_size=2) on the migrated test database and removes
+    the test players before and after each test.
+    """
+
+    async def asyncSetUp(self):
+        self.db = test_database(min_size=1, max_size=2)
+        conn = await asyncpg.connect(**self.db.connect_kwargs)
+        try:
+            await migrate(conn)
+        finally:
+            await conn.close()
+        await self.db.start()
+        await self.delete_test_players()
+
+    async def asyncTearDown(self):
+        await self.delete_test_players()
+        await self.db.close()
+
+    async def delete_test_players(self):
+        async with self.db.acquire() as conn:
+            await conn.execute("DELETE FROM players_table WHERE player_id >= $1", TEST_ID_BASE)
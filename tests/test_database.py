@@ -0,0 +1,19 @@
+from tests.support import DatabaseTestCase, TEST_ID_BASE
+from services.queries import PLAYERS_REGISTER, PLAYERS_SELECT
+
+
+class NamedStatementTests(DatabaseTestCase):
+    async def test_statement_runs_again_after_release(self):
+        # Both calls acquire and release a pool connection (the same one, with max_size=2 and no
+        # concurrency); the second must not reuse anything tied to the first acquisition
+        for _ in range(2):
+            status = await self.db.execute(PLAYERS_REGISTER, TEST_ID_BASE, 1, 2, 3, 50)
+            self.assertTrue(status.startswith("INSERT"))
+            rows = await self.db.fetch(PLAYERS_SELECT, [TEST_ID_BASE])
+            self.assertEqual([(row["guns"], row["balance"]) for row in rows], [(1, 50)])
+
+    async def test_statement_runs_on_acquired_connection(self):
+        for _ in range(2):
+            async with self.db.acquire() as conn:
+                await self.db.execute(PLAYERS_REGISTER, TEST_ID_BASE, 1, 2, 3, 50, conn=conn)
+                self.assertEqual(await self.db.fetchval(PLAYERS_SELECT, [TEST_ID_BASE], conn=conn), TEST_ID_BASE)
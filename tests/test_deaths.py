@@ -0,0 +1,32 @@
+from tests.support import DatabaseTestCase, TEST_ID_BASE
+from services.queries import PLAYERS_REGISTER, SHOOT_RESOLVE, REVIVE_USE_MEDKIT, DEATHS_PENDING, DEATHS_EXPIRE
+
+SHOOTER = TEST_ID_BASE
+VICTIM = TEST_ID_BASE + 1
+MEDIC = TEST_ID_BASE + 2
+GUILD_A = 1
+GUILD_B = 2
+
+
+class GuildDeathTests(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        for player_id in (SHOOTER, VICTIM, MEDIC):
+            await self.db.execute(PLAYERS_REGISTER, player_id, 10, 10, 0, 50)
+
+    async def pending(self) -> dict:
+        rows = await self.db.fetch(DEATHS_PENDING)
+        return {(row["guild_id"], row["player_id"]): row["died_at"] for row in rows if row["player_id"] == VICTIM}
+
+    async def test_revive_in_one_guild_keeps_death_in_another(self):
+        await self.db.fetch(SHOOT_RESOLVE, SHOOTER, VICTIM, GUILD_A)
+        await self.db.fetch(SHOOT_RESOLVE, SHOOTER, VICTIM, GUILD_B)
+        self.assertEqual(set(await self.pending()), {(GUILD_A, VICTIM), (GUILD_B, VICTIM)})
+
+        await self.db.fetch(REVIVE_USE_MEDKIT, MEDIC, VICTIM, GUILD_B)
+        deaths = await self.pending()
+        self.assertEqual(set(deaths), {(GUILD_A, VICTIM)})
+
+        rows = await self.db.fetch(DEATHS_EXPIRE, [GUILD_A], [VICTIM], [deaths[(GUILD_A, VICTIM)]])
+        self.assertEqual([(row["guild_id"], row["player_id"]) for row in rows], [(GUILD_A, VICTIM)])
+        self.assertEqual(await self.pending(), {})
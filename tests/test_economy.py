@@ -0,0 +1,87 @@
+import asyncio
+from types import SimpleNamespace
+from tests.support import DatabaseTestCase, TEST_ID_BASE
+from services.economy import EconomyTicker
+from services.ledger import Ledger
+from services.player_store import PlayerStore
+from services.queries import PLAYERS_REGISTER, PLAYERS_SELECT, SHOOT_RESOLVE
+
+A = TEST_ID_BASE
+B = TEST_ID_BASE + 1
+TICK = TEST_ID_BASE
+GUILD = TEST_ID_BASE
+
+
+class EconomyTickTests(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        for player_id in (A, B):
+            await self.db.execute(PLAYERS_REGISTER, player_id, 0, 0, 0, 0)
+        async with self.db.acquire() as conn:
+            await conn.execute("DELETE FROM economy_ticks WHERE tick_id = $1", TICK)
+            self.building_id = await conn.fetchval(
+                "INSERT INTO buildings_table (building_cash_reserve) VALUES (100) RETURNING building_id"
+            )
+            await conn.executemany(
+                "INSERT INTO building_employment_table (building_id, player_id, wage) VALUES ($1, $2, $3)",
+                [(self.building_id, A, 30), (self.building_id, B, 80)]
+            )
+        self.bot = SimpleNamespace(db=self.db)
+        self.bot.player_store = PlayerStore(self.bot)
+        self.bot.ledger = Ledger(self.bot)
+
+    async def asyncTearDown(self):
+        async with self.db.acquire() as conn:
+            await conn.execute("DELETE FROM economy_ticks WHERE tick_id = $1", TICK)
+            await conn.execute("DELETE FROM player_deaths WHERE guild_id = $1", GUILD)
+            await conn.execute("DELETE FROM transfer_parties_table WHERE building_id = $1", self.building_id)
+            await conn.execute("DELETE FROM buildings_table WHERE building_id = $1", self.building_id)
+        await super().asyncTearDown()
+
+    async def test_wages_are_paid_once_and_recorded(self):
+        ticker = EconomyTicker(self.bot)
+        results = await ticker.run_tick(TICK)
+        self.assertEqual(results["wages"][:2], (1, 30))
+        # Re-running the tick skips the steps that already ran
+        self.assertEqual(await ticker.run_tick(TICK), {})
+
+        rows = await self.db.fetch(PLAYERS_SELECT, [A, B])
+        self.assertEqual({row["player_id"]: row["balance"] for row in rows}, {A: 30, B: 0})
+        async with self.db.acquire() as conn:
+            logged = await conn.fetch("""
+                SELECT t.transfer_type, s.building_id, r.player_id, t.amount FROM transactions_table AS t
+                JOIN transfer_parties_table AS s ON s.party_id = t.sender_party_id
+                JOIN transfer_parties_table AS r ON r.party_id = t.recipient_party_id
+                WHERE s.building_id = $1
+            """, self.building_id)
+            reserve = await conn.fetchval(
+                "SELECT building_cash_reserve FROM buildings_table WHERE building_id = $1", self.building_id
+            )
+        self.assertEqual([tuple(row) for row in logged], [("wage", self.building_id, A, 30)])
+        self.assertEqual(reserve, 70)
+
+    async def test_wages_do_not_deadlock_against_shoot(self):
+        async with self.db.acquire() as conn:
+            await conn.execute(
+                "UPDATE buildings_table SET building_cash_reserve = 200 WHERE building_id = $1", self.building_id
+            )
+            await conn.execute("UPDATE players_table SET guns = 1 WHERE player_id = $1", A)
+
+        async with self.db.acquire() as shooter:
+            transaction = shooter.transaction()
+            await transaction.start()
+            # SHOOT_RESOLVE's first lock when A shoots B
+            await shooter.execute("SELECT 1 FROM players_table WHERE player_id = $1 FOR UPDATE", A)
+            tick = asyncio.create_task(EconomyTicker(self.bot).run_tick(TICK))
+            await asyncio.sleep(0.2)
+            self.assertFalse(tick.done())
+
+            # The payout waits on A before locking B, so the shot can take B and finish
+            rows = await self.db.fetch(SHOOT_RESOLVE, A, B, GUILD, conn=shooter)
+            self.assertEqual(sorted(row["side"] for row in rows), ["shooter", "victim"])
+            await transaction.commit()
+
+        results = await tick
+        self.assertEqual(results["wages"][:2], (2, 110))
+        rows = await self.db.fetch(PLAYERS_SELECT, [A, B])
+        self.assertEqual({row["player_id"]: row["balance"] for row in rows}, {A: 30, B: 80})
@@ -0,0 +1,97 @@
+import asyncio
+from types import SimpleNamespace
+from tests.support import DatabaseTestCase, TEST_ID_BASE
+from services.ledger import Ledger, InsufficientFunds, UnknownParty, player
+from services.player_store import PlayerStore
+from services.queries import LEDGER_PARTIES, LEDGER_LOCK_PLAYERS, PLAYERS_REGISTER, PLAYERS_SELECT
+
+A = TEST_ID_BASE
+B = TEST_ID_BASE + 1
+UNREGISTERED = TEST_ID_BASE + 2
+
+
+class LedgerTests(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        for player_id in (A, B):
+            await self.db.execute(PLAYERS_REGISTER, player_id, 0, 0, 0, 100)
+        self.bot = SimpleNamespace(db=self.db)
+        self.bot.player_store = PlayerStore(self.bot)
+        self.ledger = Ledger(self.bot, snapshot_interval=0)
+
+    async def balances(self) -> dict:
+        rows = await self.db.fetch(PLAYERS_SELECT, [A, B])
+        return {row["player_id"]: row["balance"] for row in rows}
+
+    async def test_transfer_matches_balance_at(self):
+        transfers = [self.ledger.transfer(player(A), player(B), 30), self.ledger.transfer(player(B), player(A), 500)]
+        await self.ledger.flush()
+        self.assertIsNone(await transfers[0])
+        with self.assertRaises(InsufficientFunds):
+            await transfers[1]
+
+        self.assertEqual(await self.balances(), {A: 70, B: 130})
+        async with self.db.acquire() as conn:
+            now = await conn.fetchval("SELECT LOCALTIMESTAMP")
+        self.assertEqual(await self.ledger.balance_at(player(A), now), 70)
+        self.assertEqual(await self.ledger.balance_at(player(B), now), 130)
+
+    async def test_balance_at_counts_transfers_started_before_a_snapshot(self):
+        async with self.db.acquire() as late:
+            transaction = late.transaction()
+            await transaction.start()
+            # Snapshots A and B while the late transaction is open but hasn't locked them yet
+            transfer = self.ledger.transfer(player(A), player(B), 30)
+            await self.ledger.flush()
+            await transfer
+            self.ledger.snapshot_interval = 3600
+
+            await self.db.fetch(LEDGER_LOCK_PLAYERS, [A, B], conn=late)
+            await late.execute("""
+                UPDATE players_table SET balance = balance + CASE WHEN player_id = $1 THEN -5 ELSE 5 END
+                WHERE player_id = ANY(ARRAY[$1, $2]::bigint[])
+            """, A, B)
+            await self.ledger.record(late, [(player(A), player(B), 5, "transfer", "late")])
+            await transaction.commit()
+
+        self.assertEqual(await self.balances(), {A: 65, B: 135})
+        async with self.db.acquire() as conn:
+            now = await conn.fetchval("SELECT LOCALTIMESTAMP")
+        self.assertEqual(await self.ledger.balance_at(player(A), now), 65)
+        self.assertEqual(await self.ledger.balance_at(player(B), now), 135)
+
+    async def test_unknown_recipient_is_rejected_alone(self):
+        transfers = [
+            self.ledger.transfer(player(A), player(UNREGISTERED), 10),
+            self.ledger.transfer(player(A), player(B), 20),
+        ]
+        await self.ledger.flush()
+        with self.assertRaises(UnknownParty):
+            await transfers[0]
+        self.assertIsNone(await transfers[1])
+        self.assertEqual(await self.balances(), {A: 80, B: 120})
+
+    async def test_record_sees_party_created_concurrently(self):
+        async with self.db.acquire() as first:
+            transaction = first.transaction()
+            await transaction.start()
+            await self.db.fetch(LEDGER_PARTIES["player"], [B], conn=first)
+
+            # The second upsert waits on the first's uncommitted party row
+            async def record():
+                async with self.db.acquire() as conn:
+                    async with conn.transaction():
+                        await self.ledger.record(conn, [(player(A), player(B), 10, "transfer", "test")])
+            second = asyncio.create_task(record())
+            await asyncio.sleep(0.2)
+            self.assertFalse(second.done())
+            await transaction.commit()
+
+        await second
+        async with self.db.acquire() as conn:
+            logged = await conn.fetchval("""
+                SELECT COUNT(*) FROM transactions_table AS t
+                JOIN transfer_parties_table AS r ON r.party_id = t.recipient_party_id
+                WHERE r.player_id = $1
+            """, B)
+        self.assertEqual(logged, 1)
@@ -0,0 +1,36 @@
+import logging
+import unittest
+from unittest import mock
+from services.logs import SamplingFilter, parse_mapping
+
+
+def record(name: str, level: int = logging.INFO) -> logging.LogRecord:
+    return logging.LogRecord(name, level, __file__, 0, "message", (), None)
+
+
+class SamplingFilterTests(unittest.TestCase):
+    def test_warnings_always_pass(self):
+        sampling = SamplingFilter({"cogs.shoot": 0.0})
+        self.assertTrue(sampling.filter(record("cogs.shoot", logging.WARNING)))
+        self.assertFalse(sampling.filter(record("cogs.shoot")))
+
+    def test_children_use_their_closest_configured_ancestor(self):
+        sampling = SamplingFilter({"cogs": 0.0, "cogs.shoot": 1.0})
+        self.assertTrue(sampling.filter(record("cogs.shoot.resolve")))
+        self.assertFalse(sampling.filter(record("cogs.revive")))
+        self.assertTrue(sampling.filter(record("services.database")))
+        self.assertTrue(sampling.filter(record("cogsx")))
+
+    def test_keeps_the_configured_fraction(self):
+        sampling = SamplingFilter({"cogs.shoot": 0.25})
+        with mock.patch("services.logs.random.random", return_value=0.2):
+            self.assertTrue(sampling.filter(record("cogs.shoot")))
+        with mock.patch("services.logs.random.random", return_value=0.3):
+            self.assertFalse(sampling.filter(record("cogs.shoot")))
+
+
+class ParseMappingTests(unittest.TestCase):
+    def test_parses_and_converts_pairs(self):
+        self.assertEqual(parse_mapping("cogs.shoot=0.1, discord=0.5", float), {"cogs.shoot": 0.1, "discord": 0.5})
+        self.assertEqual(parse_mapping("broken,=1,name="), {})
+        self.assertEqual(parse_mapping(None), {})
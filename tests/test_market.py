@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+from tests.support import DatabaseTestCase, TEST_ID_BASE
+from services.ledger import Ledger
+from services.market import Market, OrderRejected, BUY, SELL
+from services.player_store import PlayerStore
+from services.queries import PLAYERS_REGISTER, PLAYERS_SELECT
+
+BUYER = TEST_ID_BASE
+SELLER = TEST_ID_BASE + 1
+
+
+class MarketTests(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await self.db.execute(PLAYERS_REGISTER, BUYER, 0, 0, 0, 1000)
+        await self.db.execute(PLAYERS_REGISTER, SELLER, 10, 0, 0, 0)
+        self.bot = SimpleNamespace(db=self.db)
+        self.bot.player_store = PlayerStore(self.bot)
+        self.bot.ledger = Ledger(self.bot)
+        self.market = Market(self.bot)
+
+    async def players(self) -> dict:
+        rows = await self.db.fetch(PLAYERS_SELECT, [BUYER, SELLER])
+        return {row["player_id"]: row for row in rows}
+
+    async def logged(self, player_id: int) -> int:
+        """
+        The player's net balance change according to transactions_table.
+        """
+        async with self.db.acquire() as conn:
+            return await conn.fetchval("""
+                SELECT COALESCE(SUM(CASE WHEN r.player_id = $1 THEN t.amount ELSE -t.amount END), 0)
+                FROM transactions_table AS t
+                JOIN transfer_parties_table AS s ON s.party_id = t.sender_party_id
+                JOIN transfer_parties_table AS r ON r.party_id = t.recipient_party_id
+                WHERE s.player_id = $1 OR r.player_id = $1
+            """, player_id)
+
+    async def test_escrow_refund_and_settlement_are_recorded(self):
+        await self.market.place(SELLER, SELL, "guns", 3, 40)
+        cancelled, _ = await self.market.place(BUYER, BUY, "guns", 1, 10)
+        self.assertEqual(await self.market.cancel(BUYER, cancelled.order_id), 1)
+        _, trades = await self.market.place(BUYER, BUY, "guns", 2, 50)
+        self.assertEqual(len(trades), 1)
+        await self.market.flush()
+
+        players = await self.players()
+        # 2 guns at $40 from a $50 bid: $80 paid, $20 of escrow back
+        self.assertEqual((players[BUYER]["balance"], players[BUYER]["guns"]), (920, 2))
+        self.assertEqual((players[SELLER]["balance"], players[SELLER]["guns"]), (80, 7))
+        self.assertEqual(await self.logged(BUYER), -80)
+        self.assertEqual(await self.logged(SELLER), 80)
+
+    async def set_guns(self, player_id: int, guns: int):
+        # Stands in for items gained outside the market since the order was placed
+        async with self.db.acquire() as conn:
+            await conn.execute("UPDATE players_table SET guns = $2 WHERE player_id = $1", player_id, guns)
+
+    async def test_cancel_refuses_to_return_items_past_the_cap(self):
+        order, _ = await self.market.place(SELLER, SELL, "guns", 5, 40)
+        await self.set_guns(SELLER, 125)
+        with self.assertRaises(OrderRejected):
+            await self.market.cancel(SELLER, order.order_id)
+
+        self.assertEqual([o.order_id for o in self.market.open_orders(SELLER)], [order.order_id])
+        self.assertEqual((await self.players())[SELLER]["guns"], 125)
+        await self.set_guns(SELLER, 100)
+        self.assertEqual(await self.market.cancel(SELLER, order.order_id), 5)
+        self.assertEqual((await self.players())[SELLER]["guns"], 105)
+
+    async def test_failed_cancel_puts_the_order_back_on_the_book(self):
+        order, _ = await self.market.place(SELLER, SELL, "guns", 5, 40)
+        await self.set_guns(SELLER, 125)
+        book = self.market.books["guns"]
+        async with self.db.acquire() as blocker:
+            transaction = blocker.transaction()
+            await transaction.start()
+            await blocker.execute("SELECT 1 FROM market_orders WHERE order_id = $1 FOR UPDATE", order.order_id)
+            cancel = asyncio.create_task(self.market.cancel(SELLER, order.order_id))
+            await asyncio.sleep(0.2)
+            # Matching meanwhile drops the cancelled order's heap entry
+            self.assertIsNone(book.best_ask())
+            await transaction.rollback()
+
+        with self.assertRaises(OrderRejected):
+            await cancel
+        self.assertIs(book.best_ask(), order)
+        self.assertEqual(order.remaining, 5)
+
+    async def test_settlement_refunds_and_relists_what_the_buyer_cannot_hold(self):
+        await self.market.place(BUYER, BUY, "guns", 2, 50)
+        await self.set_guns(BUYER, 126)
+        _, trades = await self.market.place(SELLER, SELL, "guns", 2, 50)
+        self.assertEqual(len(trades), 1)
+        await self.market.flush()
+
+        players = await self.players()
+        self.assertEqual((players[BUYER]["balance"], players[BUYER]["guns"]), (950, 127))
+        self.assertEqual((players[SELLER]["balance"], players[SELLER]["guns"]), (50, 8))
+        self.assertEqual(await self.logged(BUYER), -50)
+        self.assertEqual(await self.logged(SELLER), 50)
+        self.assertEqual([(o.price, o.remaining) for o in self.market.open_orders(SELLER)], [(50, 1)])
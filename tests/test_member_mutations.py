@@ -0,0 +1,113 @@
+import unittest
+from types import SimpleNamespace
+from services.member_mutations import MemberMutationQueue, PendingMutation, UNCHANGED
+
+EVERYONE = SimpleNamespace(id=1)
+SHOT = SimpleNamespace(id=10)
+MUTED = SimpleNamespace(id=11)
+OTHER = SimpleNamespace(id=12)
+
+
+class FakeGuild:
+    def __init__(self, cached: dict = None, fetched: dict = None):
+        self.id = 100
+        self.cached = cached or {}
+        self.fetched = fetched or {}
+        self.fetches = 0
+
+    def get_member(self, member_id: int):
+        return self.cached.get(member_id)
+
+    async def fetch_member(self, member_id: int):
+        self.fetches += 1
+        return self.fetched[member_id]
+
+
+class FakeMember:
+    def __init__(self, guild, roles):
+        self.id = 200
+        self.guild = guild
+        self.roles = [EVERYONE] + roles
+        self.edits = []
+
+    async def edit(self, **kwargs):
+        self.edits.append(kwargs)
+
+
+def role_ids(kwargs) -> set:
+    return {role.id for role in kwargs["roles"]}
+
+
+class PendingMutationTests(unittest.TestCase):
+    def test_later_changes_win(self):
+        mutation = PendingMutation(None)
+        mutation.merge([SHOT], [], "until", "shot")
+        mutation.merge([MUTED], [SHOT], UNCHANGED, None)
+        self.assertEqual(set(mutation.add_roles), {MUTED.id})
+        self.assertEqual(set(mutation.remove_roles), {SHOT.id})
+        self.assertEqual(mutation.timed_out_until, "until")
+        self.assertEqual(mutation.reason, "shot")
+
+        mutation.merge([SHOT], [], None, "revived")
+        self.assertEqual(set(mutation.add_roles), {MUTED.id, SHOT.id})
+        self.assertEqual(mutation.remove_roles, {})
+        self.assertIsNone(mutation.timed_out_until)
+        self.assertEqual(mutation.reason, "shot; revived")
+
+    def test_reason_is_capped_at_the_audit_log_limit(self):
+        mutation = PendingMutation(None)
+        mutation.merge([], [], UNCHANGED, "x" * 600)
+        self.assertEqual(len(mutation.reason), 512)
+
+    def test_roles_are_only_sent_with_a_live_member(self):
+        mutation = PendingMutation(None)
+        mutation.merge([SHOT], [MUTED], "until", "shot")
+        self.assertEqual(mutation.edit_kwargs(), {"timed_out_until": "until", "reason": "shot"})
+
+        live = FakeMember(FakeGuild(), [MUTED, OTHER])
+        kwargs = mutation.edit_kwargs(live)
+        # @everyone stays implicit, and roles someone else gave are kept
+        self.assertEqual(role_ids(kwargs), {OTHER.id, SHOT.id})
+        self.assertEqual(kwargs["timed_out_until"], "until")
+
+    def test_unchanged_timeout_is_left_out(self):
+        mutation = PendingMutation(None)
+        mutation.merge([], [SHOT], UNCHANGED, None)
+        self.assertEqual(role_ids(mutation.edit_kwargs(FakeMember(FakeGuild(), [SHOT]))), set())
+        self.assertNotIn("timed_out_until", mutation.edit_kwargs())
+
+
+class MemberMutationQueueTests(unittest.IsolatedAsyncioTestCase):
+    async def test_uncached_member_is_fetched_and_edited_once(self):
+        guild = FakeGuild()
+        stale = FakeMember(guild, [])
+        current = guild.fetched[stale.id] = FakeMember(guild, [OTHER])
+        queue = MemberMutationQueue()
+
+        first = queue.submit(stale, add_roles=[SHOT], timed_out_until="until", reason="shot")
+        second = queue.submit(stale, add_roles=[MUTED])
+        await first
+        await second
+
+        self.assertEqual(guild.fetches, 1)
+        self.assertEqual(stale.edits, [])
+        self.assertEqual(len(current.edits), 1)
+        self.assertEqual(role_ids(current.edits[0]), {OTHER.id, SHOT.id, MUTED.id})
+        self.assertEqual(current.edits[0]["timed_out_until"], "until")
+        self.assertEqual((queue.applied, queue.coalesced), (1, 1))
+
+    async def test_cached_member_is_edited_without_a_fetch(self):
+        guild = FakeGuild()
+        live = guild.cached[200] = FakeMember(guild, [SHOT])
+        queue = MemberMutationQueue()
+
+        await queue.submit(FakeMember(guild, []), remove_roles=[SHOT], timed_out_until=None)
+        self.assertEqual(guild.fetches, 0)
+        self.assertEqual(live.edits, [{"roles": [], "timed_out_until": None}])
+
+    async def test_timeout_alone_needs_no_role_list(self):
+        guild = FakeGuild()
+        member = FakeMember(guild, [])
+        await MemberMutationQueue().submit(member, timed_out_until=None)
+        self.assertEqual(guild.fetches, 0)
+        self.assertEqual(member.edits, [{"timed_out_until": None}])
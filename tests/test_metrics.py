@@ -0,0 +1,29 @@
+import unittest
+from services.metrics import Histogram
+
+
+class HistogramTests(unittest.TestCase):
+    def test_quantile_interpolates_inside_its_bucket(self):
+        histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+        for value in (0.5, 1.5, 1.5, 3.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.counts, [1, 2, 1, 0])
+        self.assertAlmostEqual(histogram.quantile(0.25), 1.0)
+        self.assertAlmostEqual(histogram.quantile(0.5), 1.5)
+        self.assertAlmostEqual(histogram.quantile(1.0), 4.0)
+        self.assertAlmostEqual(histogram.mean, 1.625)
+
+    def test_bucket_bounds_are_inclusive(self):
+        histogram = Histogram(buckets=(1.0, 2.0))
+        histogram.observe(1.0)
+        self.assertEqual(histogram.counts, [1, 0, 0])
+
+    def test_values_past_the_last_bucket_report_its_bound(self):
+        histogram = Histogram(buckets=(1.0, 2.0))
+        histogram.observe(10.0)
+        self.assertEqual(histogram.quantile(0.5), 2.0)
+
+    def test_empty_histogram(self):
+        histogram = Histogram()
+        self.assertEqual(histogram.quantile(0.99), 0.0)
+        self.assertEqual(histogram.mean, 0.0)
@@ -0,0 +1,68 @@
+import unittest
+from services.market import OrderBook, Order, BUY, SELL, PLAYER
+
+ITEM = "guns"
+
+
+def order(order_id: int, side: str, price: int, quantity: int) -> Order:
+    return Order(order_id, ITEM, side, (PLAYER, order_id), price, quantity)
+
+
+class OrderBookTests(unittest.TestCase):
+    def setUp(self):
+        self.book = OrderBook(ITEM)
+
+    def test_best_price_matches_first_at_the_resting_price(self):
+        self.book.submit(order(1, SELL, 50, 1))
+        self.book.submit(order(2, SELL, 40, 1))
+        trades = self.book.submit(order(3, BUY, 60, 1))
+        self.assertEqual([(t.sell.order_id, t.price, t.quantity) for t in trades], [(2, 40, 1)])
+        self.assertEqual(self.book.best_ask().order_id, 1)
+
+    def test_oldest_order_matches_first_within_a_price(self):
+        for order_id in (5, 3, 4):
+            self.book.submit(order(order_id, BUY, 40, 1))
+        trades = self.book.submit(order(6, SELL, 40, 2))
+        self.assertEqual([t.buy.order_id for t in trades], [3, 4])
+        self.assertEqual(self.book.best_bid().order_id, 5)
+
+    def test_partial_fills_rest_what_is_left(self):
+        sell = order(1, SELL, 40, 5)
+        self.book.submit(sell)
+        trades = self.book.submit(order(2, BUY, 45, 3))
+        self.assertEqual([(t.quantity, t.buy_left, t.sell_left) for t in trades], [(3, 0, 2)])
+        self.assertIsNone(self.book.best_bid())
+
+        buy = order(3, BUY, 40, 4)
+        trades = self.book.submit(buy)
+        self.assertEqual([(t.quantity, t.buy_left, t.sell_left) for t in trades], [(2, 2, 0)])
+        self.assertIsNone(self.book.best_ask())
+        self.assertIs(self.book.best_bid(), buy)
+        self.assertEqual(self.book.depth(), ([(40, 2)], []))
+
+    def test_orders_that_do_not_cross_rest(self):
+        self.book.submit(order(1, SELL, 50, 2))
+        self.assertEqual(self.book.submit(order(2, BUY, 49, 3)), [])
+        self.book.submit(order(3, BUY, 45, 1))
+        self.assertEqual(self.book.depth(), ([(49, 3), (45, 1)], [(50, 2)]))
+
+    def test_restore_pushes_an_order_whose_entry_was_dropped(self):
+        sell = order(1, SELL, 40, 3)
+        self.book.submit(sell)
+        sell.remaining = 0
+        self.assertIsNone(self.book.best_ask())
+
+        self.book.restore(sell, 3)
+        self.assertIs(self.book.best_ask(), sell)
+        self.assertEqual(self.book.depth(), ([], [(40, 3)]))
+
+    def test_restore_keeps_a_single_entry_for_an_order_still_queued(self):
+        sell = order(1, SELL, 40, 3)
+        self.book.submit(sell)
+        self.book.submit(order(2, SELL, 40, 1))
+        sell.remaining = 0
+
+        self.book.restore(sell, 3)
+        self.assertEqual(self.book.depth(), ([], [(40, 4)]))
+        trades = self.book.submit(order(3, BUY, 40, 4))
+        self.assertEqual([(t.sell.order_id, t.quantity) for t in trades], [(1, 3), (2, 1)])
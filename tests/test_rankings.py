@@ -0,0 +1,58 @@
+import unittest
+from services.rankings import Ranking
+
+
+def rows(*scores):
+    return [{"player_id": player_id, "score": score} for player_id, score in scores]
+
+
+class RankingTests(unittest.TestCase):
+    def test_short_ranking_tracks_every_player(self):
+        ranking = Ranking("kills", size=3, slack=2)
+        ranking.load(rows((1, 5), (2, 9)))
+        self.assertIsNone(ranking.floor)
+
+        ranking.observe(3, 7)
+        ranking.observe(1, 10)
+        self.assertEqual(ranking.page(0, 10), [(1, 10), (2, 9), (3, 7)])
+        self.assertEqual(ranking.page(1, 1), [(2, 9)])
+        self.assertFalse(ranking.stale)
+
+    def test_full_ranking_ignores_players_at_or_below_the_floor(self):
+        ranking = Ranking("kills", size=2, slack=1)
+        ranking.load(rows((1, 30), (2, 20), (3, 10)))
+        self.assertEqual(ranking.floor, 10)
+        self.assertEqual(ranking.trusted(), 2)
+
+        ranking.observe(4, 10)
+        ranking.observe(5, 5)
+        self.assertEqual(ranking.page(0, 10), [(1, 30), (2, 20)])
+
+    def test_new_leader_pushes_the_lowest_entry_out(self):
+        ranking = Ranking("kills", size=2, slack=1)
+        ranking.load(rows((1, 30), (2, 20), (3, 10)))
+        ranking.observe(4, 40)
+        self.assertEqual(ranking.floor, 10)
+        self.assertEqual(ranking.trusted(), 3)
+        self.assertEqual(ranking.page(0, 10), [(4, 40), (1, 30)])
+
+    def test_dropping_below_the_floor_marks_the_ranking_stale(self):
+        ranking = Ranking("kills", size=2, slack=1)
+        ranking.load(rows((1, 30), (2, 20), (3, 15)))
+        ranking.observe(3, 25)
+        ranking.observe(2, 5)
+        self.assertEqual(ranking.trusted(), 2)
+        self.assertFalse(ranking.stale)
+
+        # Whoever now ranks second may be untracked
+        ranking.observe(3, 5)
+        self.assertEqual(ranking.trusted(), 1)
+        self.assertTrue(ranking.stale)
+        self.assertEqual(ranking.page(0, 10), [(1, 30)])
+
+    def test_unchanged_and_missing_scores_are_ignored(self):
+        ranking = Ranking("balance", size=2, slack=1)
+        ranking.load(rows((1, 30), (2, 20)))
+        ranking.observe(1, 30)
+        ranking.observe(2, None)
+        self.assertEqual(ranking.page(0, 10), [(1, 30), (2, 20)])
@@ -0,0 +1,111 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from tests.support import DatabaseTestCase, TEST_ID_BASE
+from services.rate_limiter import RateLimiter, Limit, USER, GUILD
+
+COMMAND = "test_rate_limit"
+INTERACTION = SimpleNamespace(user=SimpleNamespace(id=TEST_ID_BASE), guild_id=TEST_ID_BASE)
+LIMITS = (Limit(USER, 5, 10, shared=True), Limit(GUILD, 2, 60, shared=True))
+GUILD_KEY = f"{COMMAND}:guild:{TEST_ID_BASE}"
+
+
+class RateLimiterTests(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await self.delete_buckets()
+
+    async def asyncTearDown(self):
+        await self.delete_buckets()
+        await super().asyncTearDown()
+
+    async def delete_buckets(self):
+        async with self.db.acquire() as conn:
+            await conn.execute("DELETE FROM rate_limit_buckets WHERE bucket_key LIKE $1", f"{COMMAND}:%")
+
+    async def empty_guild_bucket(self, conn):
+        await conn.execute("""
+            INSERT INTO rate_limit_buckets (bucket_key, tokens, updated_at, full_at)
+            VALUES ($1, 0, now(), now() + interval '60 seconds')
+        """, GUILD_KEY)
+
+    async def test_shared_rejection_reports_its_bucket_and_refunds_local_tokens(self):
+        limiter = RateLimiter(self.db)
+        async with self.db.acquire() as conn:
+            await self.empty_guild_bucket(conn)
+
+        cooldown, retry_after = await limiter.hit(COMMAND, INTERACTION, LIMITS)
+        self.assertEqual((cooldown.rate, cooldown.per), (2, 60))
+        self.assertGreater(retry_after, 20)
+        self.assertEqual(limiter.rejected_shared, 1)
+        for tokens, _, capacity, _ in limiter._buckets.values():
+            self.assertEqual(tokens, capacity)
+
+    async def test_slow_shared_check_falls_back_to_local_buckets(self):
+        limiter = RateLimiter(self.db, shared_timeout=0.2)
+        async with self.db.acquire() as conn:
+            async with conn.transaction():
+                # Holds the bucket's row lock, so the shared check can't finish
+                await self.empty_guild_bucket(conn)
+                cooldown, _ = await limiter.hit(COMMAND, INTERACTION, LIMITS)
+
+        self.assertIsNone(cooldown)
+        self.assertEqual((limiter.allowed, limiter.shared_fallbacks), (1, 1))
+
+
+class LocalBucketTests(unittest.TestCase):
+    def setUp(self):
+        self.now = 1000.0
+        patcher = mock.patch("services.rate_limiter.time.monotonic", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.limiter = RateLimiter()
+
+    def test_hits_take_a_token_from_every_bucket_until_one_runs_out(self):
+        buckets = [("user", 2, 10, False), ("guild", 3, 30, False)]
+        self.assertEqual(self.limiter._hit_local(buckets), (None, 0.0))
+        self.assertEqual(self.limiter._hit_local(buckets), (None, 0.0))
+
+        cooldown, retry_after = self.limiter._hit_local(buckets)
+        self.assertEqual((cooldown.rate, cooldown.per), (2, 10))
+        self.assertAlmostEqual(retry_after, 5.0)
+        # The rejected hit took nothing from the guild bucket
+        self.assertEqual(self.limiter._buckets["guild"][0], 1)
+
+    def test_buckets_refill_over_time(self):
+        buckets = [("user", 1, 10, False)]
+        self.limiter._hit_local(buckets)
+        self.now += 4
+        self.assertAlmostEqual(self.limiter._hit_local(buckets)[1], 6.0)
+        self.now += 6
+        self.assertEqual(self.limiter._hit_local(buckets), (None, 0.0))
+
+    def test_refund_gives_a_token_back_up_to_capacity(self):
+        buckets = [("user", 2, 10, False)]
+        self.limiter._hit_local(buckets)
+        self.limiter._hit_local(buckets)
+        self.limiter._refund_local(buckets)
+        self.assertEqual(self.limiter._buckets["user"][0], 1)
+        self.limiter._refund_local(buckets)
+        self.limiter._refund_local(buckets)
+        self.assertEqual(self.limiter._buckets["user"][0], 2)
+
+
+class LocalLimitTests(unittest.IsolatedAsyncioTestCase):
+    async def test_limits_from_settings_and_disabled_limits(self):
+        per = {"seconds": 0}
+        limits = (Limit(USER, 1, lambda interaction: per["seconds"], shared=True), Limit(GUILD, 2, 60))
+        limiter = RateLimiter()
+        for _ in range(2):
+            self.assertEqual(await limiter.hit(COMMAND, INTERACTION, limits), (None, 0.0))
+
+        # A per of 0 turned the user limit off; the guild limit still applies
+        cooldown, _ = await limiter.hit(COMMAND, INTERACTION, limits)
+        self.assertEqual((cooldown.rate, cooldown.per), (2, 60))
+
+        per["seconds"] = 5
+        cooldown, _ = await limiter.hit("other_command", INTERACTION, limits)
+        self.assertIsNone(cooldown)
+        cooldown, _ = await limiter.hit("other_command", INTERACTION, limits)
+        self.assertEqual((cooldown.rate, cooldown.per), (1, 5))
+        self.assertEqual((limiter.allowed, limiter.rejected_local), (3, 2))
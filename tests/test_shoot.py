@@ -0,0 +1,50 @@
+import asyncio
+from tests.support import DatabaseTestCase, TEST_ID_BASE
+from services.queries import PLAYERS_REGISTER, PLAYERS_SELECT, SHOOT_RESOLVE
+
+A = TEST_ID_BASE
+B = TEST_ID_BASE + 1
+C = TEST_ID_BASE + 2
+GUILD = 1
+
+
+class ShootResolveTests(DatabaseTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        for player_id in (A, B, C):
+            await self.db.execute(PLAYERS_REGISTER, player_id, 100, 0, 0, 50)
+
+    async def players(self) -> dict:
+        rows = await self.db.fetch(PLAYERS_SELECT, [A, B, C])
+        return {row["player_id"]: row for row in rows}
+
+    async def test_concurrent_shots_kill_once(self):
+        async with self.db.acquire() as first:
+            transaction = first.transaction()
+            await transaction.start()
+            rows = await self.db.fetch(SHOOT_RESOLVE, A, C, GUILD, conn=first)
+            self.assertEqual(sorted(row["side"] for row in rows), ["shooter", "victim"])
+
+            # B's shot waits on C's row lock until A's commits
+            second = asyncio.create_task(self.db.fetch(SHOOT_RESOLVE, B, C, GUILD))
+            await asyncio.sleep(0.2)
+            self.assertFalse(second.done())
+            await transaction.commit()
+
+        rows = await second
+        self.assertEqual([row["side"] for row in rows], ["dead"])
+        players = await self.players()
+        self.assertEqual((players[A]["kills"], players[A]["guns"]), (1, 99))
+        self.assertEqual((players[B]["kills"], players[B]["guns"]), (0, 100))
+
+    async def test_crossfire_does_not_deadlock(self):
+        for _ in range(50):
+            results = await asyncio.gather(
+                self.db.fetch(SHOOT_RESOLVE, A, B, GUILD),
+                self.db.fetch(SHOOT_RESOLVE, B, A, GUILD),
+                return_exceptions=True
+            )
+            for result in results:
+                self.assertNotIsInstance(result, Exception)
+            async with self.db.acquire() as conn:
+                await conn.execute("DELETE FROM player_deaths WHERE player_id = ANY($1::bigint[])", [A, B])